@@ -0,0 +1,109 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+from typing import List
+
+from pyflex import Address, Transact
+
+
+class AccountPool:
+    """Spreads independent transactions across several sending accounts.
+
+    Each account has its own nonce sequence, so a transaction stuck in the mempool only holds up later transactions
+    from the same account. New transactions go to the account with the fewest transactions in flight. Transactions
+    sent on behalf of the same key (i.e. bids on the same auction) stay on one account while any is in flight, so a
+    bid can replace the previous one.
+
+    Attributes:
+        addresses: Sending accounts, in order of preference; the first is `--eth-from`.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, addresses: List[Address]):
+        assert isinstance(addresses, list)
+        assert len(addresses) > 0
+        assert all(isinstance(address, Address) for address in addresses)
+
+        self.addresses = list(dict.fromkeys(addresses))
+        self.in_flight = {address: 0 for address in self.addresses}
+        self.bound = {}
+        self.locks = {address: threading.Lock() for address in self.addresses}
+        self._lock = threading.Lock()
+
+    def account_for(self, key=None) -> Address:
+        """Returns the account from which to send the next transaction for `key`.
+
+        Args:
+            key: Identifies related transactions, which must be sent from the same account, or `None`
+        """
+        with self._lock:
+            if key is not None and key in self.bound:
+                return self.bound[key][0]
+            return min(self.addresses, key=lambda address: self.in_flight[address])
+
+    def lock(self, address: Address) -> threading.Lock:
+        """Returns the lock held while moving funds of `address`, such as joining system coin to the SAFE Engine"""
+        assert address in self.locks
+
+        return self.locks[address]
+
+    def transact_async(self, transact: Transact, address: Address, key=None, **kwargs):
+        """Sends `transact` from `address`, counting it in flight until it finishes.
+
+        The transaction is counted as soon as this is called, so the next `account_for` already accounts for it.
+
+        Args:
+            transact: Transaction to send
+            address: Account obtained from `account_for`
+            key: Identifies related transactions, see `account_for`
+            kwargs: Passed to `Transact.transact_async`, except `from_address`
+        """
+        assert isinstance(transact, Transact)
+        assert address in self.in_flight
+
+        self._begin(address, key)
+
+        async def send():
+            try:
+                return await transact.transact_async(from_address=address, **kwargs)
+            finally:
+                self._end(address, key)
+
+        return send()
+
+    def _begin(self, address: Address, key):
+        with self._lock:
+            self.in_flight[address] += 1
+            if key is not None:
+                bound_address, count = self.bound.get(key, (address, 0))
+                assert bound_address == address
+                self.bound[key] = (address, count + 1)
+
+    def _end(self, address: Address, key):
+        with self._lock:
+            self.in_flight[address] -= 1
+            if key is not None and key in self.bound:
+                bound_address, count = self.bound[key]
+                if count > 1:
+                    self.bound[key] = (bound_address, count - 1)
+                else:
+                    del self.bound[key]
+
+    def __len__(self):
+        return len(self.addresses)
@@ -0,0 +1,79 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from datetime import datetime
+from typing import List
+from web3 import Web3
+
+from pyflex.auctions import AuctionContract
+from pyflex.blocks import block_cache
+
+
+class AuctionHistory:
+    """Tracks ids of live auctions from auction house logs, so only new blocks need to be read each time"""
+    logger = logging.getLogger()
+    cache_lookback = 12  # for handling block reorgs
+
+    # Names of the `...Log` classes produced by `AuctionContract.parse_event`
+    live_events = {'StartAuctionLog', 'RestartAuctionLog', 'IncreaseBidSizeLog', 'DecreaseSoldAmountLog', 'BuyCollateralLog'}
+    dead_events = {'SettleAuctionLog'}
+
+    def __init__(self, web3: Web3, auction_contract: AuctionContract, from_block: int, chunk_size=20000):
+        assert isinstance(web3, Web3)
+        assert isinstance(auction_contract, AuctionContract)
+        assert isinstance(from_block, int)
+        assert chunk_size > 0
+
+        self.web3 = web3
+        self.auction_contract = auction_contract
+        self.from_block = from_block
+        self.chunk_size = chunk_size
+        self.cache_block = None
+        self.active = set()
+
+    def get_auctions(self) -> List[int]:
+        """Returns ids of auctions which have not been settled, in ascending order"""
+        start = datetime.now()
+
+        if self.cache_block is None:
+            from_block = self.from_block
+        else:
+            from_block = max(self.from_block, self.cache_block - self.cache_lookback)
+        to_block = block_cache(self.web3).block_number()
+
+        if from_block <= to_block:
+            events = self.auction_contract.past_logs_in_block_range(from_block, to_block, self.chunk_size)
+            for event in events:
+                self.apply_event(event)
+            self.logger.debug(f"Applied {len(events)} auction events from block {from_block} to {to_block} "
+                              f"in {(datetime.now()-start).seconds} seconds")
+
+        self.cache_block = to_block
+        return sorted(self.active)
+
+    def apply_event(self, event):
+        name = type(event).__name__
+        if name in self.live_events:
+            self.active.add(int(event.id))
+        elif name in self.dead_events:
+            self.active.discard(int(event.id))
+
+    def remove_auction(self, id: int):
+        """Stops tracking an auction found to be deleted or finished onchain"""
+        assert isinstance(id, int)
+        self.active.discard(id)
@@ -0,0 +1,98 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from datetime import datetime
+from typing import Dict, List
+from web3 import Web3
+
+from pyflex.blocks import block_cache
+from pyflex.gf import AccountingEngine
+from pyflex.numeric import Rad
+
+
+class DebtQueue:
+    """Mirrors `AccountingEngine.debtQueue` from queue events, so only new blocks need to be read each time.
+
+    Only `PushDebtToQueue` events are applied: they carry the resulting queue entry. `PopDebtFromQueue` carries the
+    time of the pop and the amount popped, not the popped timestamp, so popped entries are instead found by reading
+    the queue onchain before popping them.
+    """
+    logger = logging.getLogger()
+    cache_lookback = 12  # for handling block reorgs
+
+    def __init__(self, web3: Web3, accounting_engine: AccountingEngine, from_block: int, chunk_size=20000):
+        assert isinstance(web3, Web3)
+        assert isinstance(accounting_engine, AccountingEngine)
+        assert isinstance(from_block, int)
+        assert chunk_size > 0
+
+        self.web3 = web3
+        self.accounting_engine = accounting_engine
+        self.from_block = from_block
+        self.chunk_size = chunk_size
+        self.cache_block = None
+        self.queue = {}
+
+    def get_queue(self) -> Dict[int, Rad]:
+        """Returns debt queued at each block timestamp, for timestamps whose debt has not been popped"""
+        start = datetime.now()
+
+        if self.cache_block is None:
+            from_block = self.from_block
+        else:
+            from_block = max(self.from_block, self.cache_block - self.cache_lookback)
+        to_block = block_cache(self.web3).block_number()
+
+        if from_block <= to_block:
+            events = [event for event in self.accounting_engine.past_debt_queue_events(from_block, to_block,
+                                                                                      self.chunk_size)
+                      if isinstance(event, AccountingEngine.LogPushDebtToQueue)]
+            # Events carry the resulting queue entry rather than a change, so replaying them is harmless
+            for event in events:
+                self.queue[event.timestamp] = event.debt_queue_block
+            self.logger.debug(f"Applied {len(events)} debt queue events from block {from_block} to {to_block} "
+                              f"in {(datetime.now()-start).seconds} seconds")
+
+        self.cache_block = to_block
+        self.queue = {timestamp: debt for timestamp, debt in self.queue.items() if debt > Rad(0)}
+        return self.queue
+
+    def poppable(self, pop_debt_delay: int, now: int) -> List[int]:
+        """Returns timestamps of queued debt which has aged past `pop_debt_delay` and is still queued onchain,
+        oldest first"""
+        assert isinstance(pop_debt_delay, int)
+        assert isinstance(now, int)
+
+        aged = sorted(timestamp for timestamp in self.get_queue() if timestamp + pop_debt_delay <= now)
+        return [timestamp for timestamp in aged if self.confirm(timestamp)]
+
+    def confirm(self, timestamp: int) -> bool:
+        """Reads the queue entry at `timestamp` onchain, and stops tracking it if it has been popped or its push
+        was reorged out"""
+        assert isinstance(timestamp, int)
+
+        if self.accounting_engine.debt_queue_of(timestamp) > Rad(0):
+            return True
+        self.logger.debug(f"Debt queued at {timestamp} is no longer queued onchain")
+        self.remove(timestamp)
+        return False
+
+    def remove(self, timestamp: int):
+        """Stops tracking debt found to be popped onchain"""
+        assert isinstance(timestamp, int)
+        self.queue.pop(timestamp, None)
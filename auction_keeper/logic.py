@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import functools
 import logging
 from typing import Optional
 
@@ -32,6 +33,9 @@ class Auction:
 
         self.model = model
         self.output = None
+        # Digest and block time of the last status sent to the model
+        self.status = None
+        self.status_block_time = None
 
         self.price = None
         self.gas_price = None
@@ -49,10 +53,26 @@ class Auction:
         else:
             return None
 
-    def feed_model(self, input: Status):
+    def feed_model(self, input: Status, heartbeat: Optional[int] = None) -> bool:
+        """Sends a status to the model, unless it only differs from the last one sent by its block time.
+
+        Args:
+            input: Current auction status
+            heartbeat: Number of seconds after which an unchanged status is sent anyway, or `None` to never send it
+        Returns:
+            Whether the status was sent
+        """
         assert isinstance(input, Status)
+        assert isinstance(heartbeat, int) or heartbeat is None
+
+        if input.same_state(self.status) and \
+                (heartbeat is None or input.block_time - self.status_block_time < heartbeat):
+            return False
 
         self.model.send_status(input)
+        self.status = input
+        self.status_block_time = input.block_time
+        return True
 
     def model_output(self) -> Optional[Stance]:
         return self.model.get_stance()
@@ -109,6 +129,8 @@ class Auctions:
         self.debt_auction_house = debt_auction_house
         self.staked_token_auction_house = staked_token_auction_house
         self.model_factory = model_factory
+        # Called with the auction id whenever a model outputs a new stance
+        self.stance_callback = None
 
     # TODO by passing `bid_amount` and `amount_to_sell` to this method it can actually check if the auction under this id hasn't changed,
     # TODO and restart the model if so.
@@ -129,6 +151,8 @@ class Auctions:
 
             # Start the model
             model = self.model_factory.create_model(model_parameters)
+            if self.stance_callback is not None:
+                model.on_stance(functools.partial(self.stance_callback, id))
 
             # Register new auction
             self.auctions[id] = Auction(id, model)
@@ -157,6 +181,7 @@ class Auctions:
             except AssertionError:
                 pass
         del self.auctions
+        self.model_factory.terminate()
         self.logger.debug(f"Removed {count} auctions on shutdown")
 
 
@@ -22,29 +22,38 @@ import logging
 import time
 import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pformat
 
 from datetime import datetime
 from requests.exceptions import RequestException
-from typing import Optional
+from typing import Dict, List, Optional
 from web3 import Web3
 
 from pyflex import Address, get_pending_transactions, web3_via_http 
+from pyflex.blocks import block_cache
 from pyflex.deployment import GfDeployment
 from pyflex.keys import register_keys
 from pyflex.lifecycle import Lifecycle
 from pyflex.model import Token
 from pyflex.numeric import Wad, Ray, Rad
+from pyflex.gf import CollateralType, SAFE
+from pyflex.transactional import TxManager
+from pyflex.util import async_executor, run_blocking, synchronize
 from pyflex.auctions import IncreasingDiscountCollateralAuctionHouse, FixedDiscountCollateralAuctionHouse, StakedTokenAuctionHouse
 from pyflex import Transact
 #Transact.gas_estimate_for_bad_txs = 1000000
 
+from auction_keeper.accounts import AccountPool
 from auction_keeper.gas import DynamicGasPrice, UpdatableGasPrice
 from auction_keeper.logic import Auction, Auctions, Reservoir
-from auction_keeper.model import ModelFactory, Stance
+from auction_keeper.model import ModelFactory, MultiplexedModelFactory, PluginModelFactory, Stance, Status
 from auction_keeper.strategy import SurplusAuctionStrategy, DebtAuctionStrategy, StakedTokenAuctionStrategy
 from auction_keeper.strategy import IncreasingDiscountCollateralAuctionStrategy, FixedDiscountCollateralAuctionStrategy
 from auction_keeper.safe_history import SAFEHistory
+from auction_keeper.safe_index import SAFEIndex
+from auction_keeper.auction_history import AuctionHistory
+from auction_keeper.debt_queue import DebtQueue
 
 from pyexchange.uniswapv2 import UniswapV2
 
@@ -65,6 +74,9 @@ class AuctionKeeper:
                             help="Ethereum account from which to send transactions")
         parser.add_argument("--eth-key", type=str, nargs='*',
                             help="Ethereum private key(s) to use (e.g. 'key_file=aaa.json,pass_file=aaa.pass')")
+        parser.add_argument("--bid-accounts", type=str, nargs='+',
+                            help="Additional accounts, with keys passed to --eth-key, from which to send bids, "
+                                 "liquidations and settlements alongside --eth-from")
         parser.add_argument('--type', type=str, choices=['collateral', 'surplus', 'debt', 'debt_staked'], default='collateral',
                             help="Auction type in which to participate")
         parser.add_argument('--system', type=str, default='tai',
@@ -88,6 +100,9 @@ class AuctionKeeper:
                             help="Period of timer [in seconds] used to check bidding models for changes")
         parser.add_argument('--bid-delay', type=float, default=0.0,
                             help="Seconds to wait between bids, used to manage OS and hardware limitations")
+        parser.add_argument('--learned-gas-limits', dest='learned_gas_limits', action='store_true',
+                            help="Send bids with gas limits learned from the receipts of earlier bids, "
+                                 "instead of estimating gas for each bid")
         parser.add_argument('--block-check-interval', type=float, default=1.0,
                             help="Period of timer [in seconds] used to check for new blocks. If using Infura free-tier, you must "
                             "increase this value")
@@ -103,8 +118,22 @@ class AuctionKeeper:
                             help="If last block seen is older than this, use the graph for fetching data. Otherwise, use the node. "
                                  "This allows the keeper to use the graph when fetching historical data, but use a node for "
                                  " recent blocks, which should be updated faster than the graph")
+        parser.add_argument('--safe-batch-size', type=int, default=500,
+                            help="Number of safes read from the node per batched request when refreshing safe history")
+        parser.add_argument('--safe-batch-parallelism', type=int, default=4,
+                            help="Maximum number of batched safe requests sent to the node at once")
+        parser.add_argument('--safe-history-refresh', type=str, choices=['incremental', 'full'], default='incremental',
+                            help="Whether to take safe state from SAFEEngine events and read only safes the events do not "
+                                 "describe (incremental), or to read every known safe each block (full)")
+        parser.add_argument('--safe-index', type=str, default=None,
+                            help="Optional SQLite file in which to keep safe state, so a restarted keeper resumes "
+                                 "from its last processed block")
+        parser.add_argument('--tx-manager', type=str, default=None,
+                            help="Address of a TxManager owned by --eth-from, used to liquidate many safes per transaction")
+        parser.add_argument('--liquidation-batch-size', type=int, default=10,
+                            help="Maximum number of safes liquidated, or auctions settled, in one TxManager transaction")
         parser.add_argument('--from-block', type=int, default=None,
-                            help="Starting block from which to find vaults to liquidation or debt to queue "
+                            help="Starting block from which to find vaults to liquidation, debt to queue or auctions to bid on "
                                  "(If not configured, this is set to the block where GEB was deployed)")
         parser.add_argument('--safe-engine-system-coin-target', type=str, default='ALL',
                             help="Amount of system coin to keep in the SAFEEngine contract or 'ALL' to join entire token balance")
@@ -124,6 +153,13 @@ class AuctionKeeper:
                             help="Comma-delimited list of Uniswap pools to try in order when doing flash swaps")
         parser.add_argument("--model", type=str, nargs='+',
                             help="Commandline to use in order to start the bidding model")
+        parser.add_argument("--model-heartbeat", type=int, default=None,
+                            help="Seconds after which an unchanged auction status is sent to its model again; "
+                                 "by default, only changes are sent")
+        parser.add_argument("--model-processes", type=int, default=0,
+                            help="Number of --model processes shared by all auctions, instead of one process per auction")
+        parser.add_argument("--model-module", type=str,
+                            help="Python bidding model to run inside the keeper instead of --model, as package.module:callable")
 
         gas_group = parser.add_mutually_exclusive_group()
         gas_group.add_argument("--ethgasstation-api-key", type=str, default=None, help="ethgasstation API key")
@@ -163,6 +199,8 @@ class AuctionKeeper:
         self.web3.eth.defaultAccount = self.arguments.eth_from
         register_keys(self.web3, self.arguments.eth_key)
         self.our_address = Address(self.arguments.eth_from)
+        # Accounts sending transactions which do not depend on each other, each with its own nonce sequence
+        self.accounts = AccountPool([self.our_address] + [Address(account) for account in self.arguments.bid_accounts or []])
 
         if self.arguments.type == 'collateral' and not self.arguments.collateral_type:
             raise RuntimeError("--collateral-type must be supplied when configuring a collateral keeper")
@@ -211,6 +249,14 @@ class AuctionKeeper:
             # disable rebalancing when using flash swaps
             self.arguments.safe_engine_system_coin_target = 0
 
+        self.tx_manager = None
+        if self.arguments.tx_manager:
+            if self.arguments.liquidation_batch_size < 1:
+                raise RuntimeError("--liquidation-batch-size must be at least 1")
+            self.tx_manager = TxManager(self.web3, Address(self.arguments.tx_manager))
+            if self.tx_manager.owner() != self.our_address:
+                raise RuntimeError(f"TxManager {self.tx_manager.address} passed to --tx-manager is not owned by {self.our_address}")
+
         # Configure auction contracts
         self.collateral_auction_house = self.collateral.collateral_auction_house if self.arguments.type == 'collateral' else None
         self.surplus_auction_house = self.geb.surplus_auction_house if self.arguments.type == 'surplus' else None
@@ -222,11 +268,16 @@ class AuctionKeeper:
             self.strategy = IncreasingDiscountCollateralAuctionStrategy(self.collateral_auction_house,
                                                                    self.min_collateral_lot,
                                                                    self.geb, self.our_address)
-            self.arguments.model = ['../models/collateral_model.sh']
+            if not self.arguments.model_module:
+                self.arguments.model = ['../models/collateral_model.sh']
 
             if self.arguments.create_auctions:
+                safe_index = SAFEIndex(self.arguments.safe_index, self.web3.eth.chainId, self.geb.safe_engine.address,
+                                       self.collateral_type) if self.arguments.safe_index else None
                 self.safe_history = SAFEHistory(self.web3, self.geb, self.collateral_type, self.from_block,
-                                                self.graph_endpoints, self.arguments.graph_block_threshold)
+                                                self.graph_endpoints, self.arguments.graph_block_threshold,
+                                                self.arguments.safe_batch_size, self.arguments.safe_batch_parallelism,
+                                                self.arguments.safe_history_refresh, safe_index)
         elif self.surplus_auction_house:
             self.strategy = SurplusAuctionStrategy(self.surplus_auction_house, self.prot.address, self.geb)
         elif self.debt_auction_house:
@@ -236,24 +287,42 @@ class AuctionKeeper:
         else:
             raise RuntimeError("Please specify auction type")
 
+        # Track live auctions from auction house logs rather than polling every auction id
+        self.auction_history = AuctionHistory(self.web3, self.strategy.contract, self.from_block)
+        self.debt_queue = DebtQueue(self.web3, self.accounting_engine, self.from_block)
+
         # Create the collection used to manage auctions relevant to this keeper
-        if self.arguments.model:
-            model_command = ' '.join(self.arguments.model)
+        if self.arguments.model_module:
+            if self.arguments.model:
+                raise RuntimeError("--model and --model-module cannot be used together")
+            model_factory = PluginModelFactory(self.arguments.model_module)
+        elif self.arguments.model and self.arguments.model_processes > 0:
+            model_factory = MultiplexedModelFactory(' '.join(self.arguments.model), self.arguments.model_processes)
+        elif self.arguments.model:
+            model_factory = ModelFactory(' '.join(self.arguments.model))
         else:
             if self.arguments.bid_on_auctions:
-                raise RuntimeError("--model must be specified to bid on auctions")
+                raise RuntimeError("--model or --model-module must be specified to bid on auctions")
             else:
-                model_command = ":"
+                model_factory = ModelFactory(":")
         self.auctions = Auctions(collateral_auction_house=self.collateral_auction_house.address if self.collateral_auction_house else None,
                                  surplus_auction_house=self.surplus_auction_house.address if self.surplus_auction_house else None,
                                  debt_auction_house=self.debt_auction_house.address if self.debt_auction_house else None,
                                  staked_token_auction_house=self.staked_token_auction_house.address if self.staked_token_auction_house else None,
-                                 model_factory=ModelFactory(model_command))
+                                 model_factory=model_factory)
         self.auctions_lock = threading.Lock()
-        # Since we don't want periodically-polled bidding threads to back up, use a flag instead of a lock.
-        self.is_joining_system_coin = False
+        # Auctions whose models output a stance since they were last bid on, and the thread bidding on them
+        self.bids_pending = set()
+        self.bids_pending_lock = threading.Lock()
+        self.bidding_thread = None
+        if self.arguments.bid_on_auctions:
+            self.auctions.stance_callback = self.bid_on_stance
         self.dead_since = {}
         self.lifecycle = None
+        # Finished auctions waiting to be settled or restarted, and those with transactions in flight
+        self.settlement_queue = {}
+        self.settlements_in_flight = set()
+        self.settlement_lock = threading.Lock()
 
 
         # Create gas strategy used for non-bids and bids which do not supply gas price
@@ -264,7 +333,7 @@ class AuctionKeeper:
         self.settle_auctions_for = set()
         if self.arguments.type != 'collateral': # collateral auctions are not settled
             if self.arguments.settle_auctions_for is None:
-                self.settle_auctions_for.add(self.our_address)
+                self.settle_auctions_for.update(self.accounts.addresses)
             elif len(self.arguments.settle_auctions_for) == 1 and self.arguments.settle_auctions_for[0].upper() in ["ALL", "NONE"]:
                 if self.arguments.settle_auctions_for[0].upper() == "ALL":
                     self.settle_all = True
@@ -329,9 +398,10 @@ class AuctionKeeper:
 
     def startup(self):
         self.approve()
-        self.rebalance_system_coin()
-        if self.surplus_auction_house:
-            self.logger.info(f"Prot balance is {self.prot.balance_of(self.our_address)}")
+        for account in self.accounts.addresses:
+            self.rebalance_system_coin(account)
+            if self.surplus_auction_house:
+                self.logger.info(f"Prot balance of {account} is {self.prot.balance_of(account)}")
 
         notice_string = []
         if not self.arguments.create_auctions:
@@ -358,8 +428,8 @@ class AuctionKeeper:
             [logging.info(line) for line in notice_string]
 
             if self.collateral_auction_house and self.collateral_type:# and self.collateral_type.name == "ETH-A":
-                logging.info("*** When Keeper is settling/bidding, the initial evaluation of auctions will likely take > 45 minutes without setting a lower boundary via '--min-auction' ***")
-                logging.info("*** When Keeper is starting auctions, initializing safe history may take > 30 minutes without using Graph via `--graph-endpoints` ***")
+                logging.info(f"*** When Keeper is settling/bidding, the initial evaluation of auctions reads auction logs from block {self.from_block}; use '--from-block' to shorten it ***")
+                logging.info("*** When Keeper is starting auctions, initializing safe history may take > 30 minutes without using Graph via `--graph-endpoints`; use '--safe-index' to resume from the last run ***")
         else:
             logging.info("Keeper is currently inactive. Consider re-running the startup script with --bid-only or --kick-only")
 
@@ -372,26 +442,33 @@ class AuctionKeeper:
             self.syscoin_eth_uniswap.approve(self.token_syscoin)
             self.syscoin_eth_uniswap.approve(self.token_weth)
 
-        self.strategy.approve(gas_price=self.gas_price)
+        # Every account bids, so every account needs the auction house and adapters to move its funds
+        for account in self.accounts.addresses:
+            self.approve_account(account)
+
+    def approve_account(self, account: Address):
+        assert isinstance(account, Address)
+
+        self.strategy.approve(gas_price=self.gas_price, from_address=account)
         time.sleep(1)
         if self.system_coin_join:
-            if self.geb.system_coin.allowance_of(self.our_address, self.system_coin_join.address) > Wad.from_number(2**50):
+            if self.geb.system_coin.allowance_of(account, self.system_coin_join.address) > Wad.from_number(2**50):
                 return
             else:
-                self.geb.approve_system_coin(self.our_address, gas_price=self.gas_price)
+                self.geb.approve_system_coin(account, gas_price=self.gas_price)
         time.sleep(1)
         if self.collateral:
-            self.collateral.approve(self.our_address, gas_price=self.gas_price)
+            self.collateral.approve(account, gas_price=self.gas_price)
 
     def plunge(self):
-        pending_txes = get_pending_transactions(self.web3)
-        if len(pending_txes) > 0:
+        for account in self.accounts.addresses:
+            pending_txes = get_pending_transactions(self.web3, account)
             while len(pending_txes) > 0:
-                logging.warning(f"Cancelling first of {len(pending_txes)} pending transactions")
+                logging.warning(f"Cancelling first of {len(pending_txes)} pending transactions from {account}")
                 pending_txes[0].cancel(gas_price=self.gas_price)
                 # After the synchronous cancel, wait to see if subsequent transactions get mined
                 time.sleep(28)
-                pending_txes = get_pending_transactions(self.web3)
+                pending_txes = get_pending_transactions(self.web3, account)
 
     def shutdown(self):
         with self.auctions_lock:
@@ -406,10 +483,17 @@ class AuctionKeeper:
 
     def exit_system_coin_on_shutdown(self):
         # Unlike rebalance_system_coin(), this doesn't join, and intentionally doesn't check debt_floor
-        safe_engine_balance = Wad(self.safe_engine.coin_balance(self.our_address))
-        if safe_engine_balance > Wad(0):
-            self.logger.info(f"Exiting {str(safe_engine_balance)} system coin from the SAFE Engine before shutdown")
-            assert self.system_coin_join.exit(self.our_address, safe_engine_balance).transact(gas_price=self.gas_price)
+        for account in self.accounts.addresses:
+            safe_engine_balance = Wad(self.safe_engine.coin_balance(account))
+            if safe_engine_balance > Wad(0):
+                self.logger.info(f"Exiting {str(safe_engine_balance)} system coin of {account} from the SAFE Engine before shutdown")
+                assert self.system_coin_join.exit(account, safe_engine_balance).transact(from_address=account,
+                                                                                          gas_price=self.gas_price)
+
+    def available_system_coin(self) -> Wad:
+        """Returns the system coin all sending accounts hold, as tokens or in the SAFE Engine"""
+        return sum((self.geb.system_coin.balance_of(account) + Wad(self.safe_engine.coin_balance(account))
+                    for account in self.accounts.addresses), Wad(0))
 
 
     def auction_handled_by_this_shard(self, id: int) -> bool:
@@ -425,53 +509,153 @@ class AuctionKeeper:
         collateral_type = self.safe_engine.collateral_type(self.collateral_type.name)
         rate = collateral_type.accumulated_rate
 
-        available_system_coin = self.geb.system_coin.balance_of(self.our_address) + Wad(self.safe_engine.coin_balance(self.our_address))
+        available_system_coin = self.available_system_coin()
 
         # Look for critical safes and liquidate them
         safes = self.safe_history.get_safes()
-        self.logger.debug(f"Evaluating {len(safes)} {self.collateral_type} safes to be liquidated if any are critical")
+        candidates = self.safe_history.critical_safes(collateral_type)
+        self.logger.debug(f"Evaluating {len(candidates)} of {len(safes)} {self.collateral_type} safes "
+                          f"to be liquidated if any are critical")
 
-        for safe in safes.values():
+        # Safes to liquidate without a flash swap, paired with the gas buffer for their transaction
+        liquidations = []
+        for safe, _, _ in self.liquidation_engine.can_liquidate_many(collateral_type, candidates, False):
             if self.is_shutting_down():
                 return
 
-            if self.liquidation_engine.can_liquidate(collateral_type, safe, False):
-                # If flash swap enabled, use flash proxy to liquidate and settle
-                if self.arguments.flash_swap and self.arguments.bid_on_auctions:
-                    saviour = self.liquidation_engine.safe_saviours(collateral_type, safe.address)
-
-                    if saviour != Address('0x0000000000000000000000000000000000000000'):
-                        self.logger.warning(f"Can't use flash swap to liquidate and settle safe {safe.address} "
-                                            "because it has a saviour {saviour}. Only liquidating.")
-                        self.liquidation_engine.liquidate_safe(collateral_type, safe).transact(gas_price=self.gas_price, gas_buffer=300000)
-                        continue
-
-                    for pool in self.arguments.flash_swap_pools:
-                        self.logger.info(f"Using {pool} flash swap to liquidate and settle safe {safe.address}")
-                        
-                        receipt = self.collateral_flash_swap_pools[pool].liquidate_and_settle_safe(safe).\
-                                    transact(gas=2000000, gas_price=self.gas_price)
-
-                        if not receipt:
-                            self.logger.warning(f"flash swap liquidate and settle with pool {pool} failed.")
-                            continue 
-                        break
-        
-                elif self.arguments.bid_on_auctions and available_system_coin == Wad(0):
-                    self.logger.warning(f"Skipping opportunity to liquidate safe {safe.address} "
-                                        "because there is no system coin to bid")
-                    break
-
-                elif safe.locked_collateral < self.min_collateral_lot:
-                    self.logger.info(f"Ignoring safe {safe.address.address} with locked_collateral={safe.locked_collateral} < "
-                                     f"min_lot={self.min_collateral_lot}")
+            # If flash swap enabled, use flash proxy to liquidate and settle
+            if self.arguments.flash_swap and self.arguments.bid_on_auctions:
+                saviour = self.liquidation_engine.safe_saviours(collateral_type, safe.address)
+
+                if saviour != Address('0x0000000000000000000000000000000000000000'):
+                    self.logger.warning(f"Can't use flash swap to liquidate and settle safe {safe.address} "
+                                        "because it has a saviour {saviour}. Only liquidating.")
+                    liquidations.append((safe, 300000))
                     continue
-                else:
-                    self.liquidation_engine.liquidate_safe(collateral_type, safe).transact(gas_price=self.gas_price)
+
+                self.flash_swap(f"liquidate and settle safe {safe.address}",
+                                {pool: proxy.liquidate_and_settle_safe(safe)
+                                 for pool, proxy in self.collateral_flash_swap_pools.items()})
+    
+            elif self.arguments.bid_on_auctions and available_system_coin == Wad(0):
+                self.logger.warning(f"Skipping opportunity to liquidate safe {safe.address} "
+                                    "because there is no system coin to bid")
+                break
+
+            elif safe.locked_collateral < self.min_collateral_lot:
+                self.logger.info(f"Ignoring safe {safe.address.address} with locked_collateral={safe.locked_collateral} < "
+                                 f"min_lot={self.min_collateral_lot}")
+                continue
+            else:
+                liquidations.append((safe, None))
+
+        self.liquidate_safes(collateral_type, liquidations)
 
         self.logger.info(f"Checked {len(safes)} safes in {(datetime.now()-started).seconds} seconds")
         # LiquidationEngine.liquidate implicitly starts the collateral auction; no further action needed.
 
+    def liquidate_safes(self, collateral_type: CollateralType, liquidations: List[tuple]):
+        """Sends liquidation transactions for all safes at once, with consecutive nonces, and waits for them together.
+
+        With `--tx-manager`, safes using the default gas buffer are liquidated `--liquidation-batch-size` at a time
+        in `TxManager` transactions.
+
+        Args:
+            collateral_type: Collateral type of the safes
+            liquidations: Safes paired with the gas buffer for their transaction, or `None` for the default buffer
+        """
+        if len(liquidations) == 0:
+            return
+
+        async def liquidate(safe: SAFE, gas_buffer: Optional[int]) -> list:
+            # A failure to send one transaction must not cancel the others
+            try:
+                transact = self.liquidation_engine.liquidate_safe(collateral_type, safe)
+                account = self.accounts.account_for()
+                if gas_buffer is None:
+                    return [(safe, await self.accounts.transact_async(transact, account, gas_price=self.gas_price))]
+                return [(safe, await self.accounts.transact_async(transact, account, gas_price=self.gas_price,
+                                                                  gas_buffer=gas_buffer))]
+            except Exception as e:
+                self.logger.warning(f"Error liquidating safe {safe.address}: {e}")
+                return [(safe, None)]
+
+        async def liquidate_batch(safes: List[SAFE]) -> list:
+            # Leave out calls which would revert, as a single failing call reverts the whole TxManager transaction
+            outcomes = []
+            batch = []
+            for safe in safes:
+                transact = self.liquidation_engine.liquidate_safe(collateral_type, safe)
+                try:
+                    await run_blocking(transact.estimated_gas, self.tx_manager.address)
+                    batch.append((safe, transact.invocation()))
+                except Exception as e:
+                    self.logger.warning(f"Leaving safe {safe.address} out of batched liquidation: {e}")
+                    outcomes.append((safe, None))
+            if len(batch) == 0:
+                return outcomes
+
+            try:
+                receipt = await self.tx_manager.execute([], [invocation for _, invocation in batch]).\
+                    transact_async(gas_price=self.gas_price)
+            except Exception as e:
+                self.logger.warning(f"Error sending batched liquidation: {e}")
+                receipt = None
+
+            if receipt is not None and receipt.successful:
+                return outcomes + [(safe, receipt) for safe, _ in batch]
+
+            # State changed after the calls were checked; isolate the failure by liquidating one by one
+            self.logger.warning(f"Batched liquidation of {len(batch)} safes failed; liquidating them individually")
+            results = await asyncio.gather(*[liquidate(safe, None) for safe, _ in batch])
+            return outcomes + [outcome for result in results for outcome in result]
+
+        futures = []
+        if self.tx_manager is not None:
+            batched = [safe for safe, gas_buffer in liquidations if gas_buffer is None]
+            liquidations = [(safe, gas_buffer) for safe, gas_buffer in liquidations if gas_buffer is not None]
+            batch_size = self.arguments.liquidation_batch_size
+            futures += [liquidate_batch(batched[start:start+batch_size]) for start in range(0, len(batched), batch_size)]
+        futures += [liquidate(safe, gas_buffer) for safe, gas_buffer in liquidations]
+
+        self.logger.info(f"Liquidating {collateral_type.name} safes in {len(futures)} transactions")
+        outcomes = [outcome for result in synchronize(futures) for outcome in result]
+
+        for safe, receipt in outcomes:
+            if receipt is not None and receipt.successful:
+                self.logger.info(f"Liquidated safe {safe.address} in block {receipt.raw_receipt['blockNumber']}")
+            else:
+                self.logger.warning(f"Failed to liquidate safe {safe.address}")
+
+    def flash_swap(self, action: str, transacts: dict) -> bool:
+        """Simulates a flash swap through every pool in `--flash-swap-pools` at once, then sends it through the first
+        pool, in the configured order, whose simulation succeeded.
+
+        Args:
+            action: Description of the flash swap, for logging
+            transacts: Flash swap transaction for each pool
+        """
+        pools = [pool for pool in self.arguments.flash_swap_pools if pool in transacts]
+
+        def simulate(pool: str) -> bool:
+            try:
+                transacts[pool].call(self.our_address, 'pending')
+                return True
+            except Exception as e:
+                self.logger.info(f"Flash swap to {action} with pool {pool} would fail ({e})")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(len(pools), 1)) as executor:
+            viable = [pool for pool, ok in zip(pools, executor.map(simulate, pools)) if ok]
+
+        for pool in viable:
+            self.logger.info(f"Using {pool} flash swap to {action}")
+            if transacts[pool].transact(gas=2000000, gas_price=self.gas_price):
+                return True
+            self.logger.warning(f"Flash swap to {action} with pool {pool} failed")
+
+        return False
+
     def check_surplus(self):
         # Check if Accounting Engine has a surplus of system coin compared to bad debt
         total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
@@ -485,7 +669,8 @@ class AuctionKeeper:
             # Check if Accounting Engine has enough system coin surplus to start an auction and that we have enough prot balance
             if (total_surplus - total_debt) >= (surplus_auction_amount_to_sell + surplus_buffer):
 
-                if self.arguments.bid_on_auctions and self.prot.balance_of(self.our_address) == Wad(0):
+                if self.arguments.bid_on_auctions and all(self.prot.balance_of(account) == Wad(0)
+                                                          for account in self.accounts.addresses):
                     self.logger.warning("Skipping opportunity to start surplus auction as there is no prot to bid")
                     return
 
@@ -532,7 +717,7 @@ class AuctionKeeper:
         if unqueued_unauctioned_debt + debt_queue >= debt_auction_bid_size:
             # We need to bring accounting engine system coin balance to 0 and unqueued_unauctioned_debt to at least debt_auction_bid_size
 
-            available_system_coin = self.geb.system_coin.balance_of(self.our_address) + Wad(self.safe_engine.coin_balance(self.our_address))
+            available_system_coin = self.available_system_coin()
             if self.arguments.bid_on_auctions and available_system_coin == Wad(0):
                 self.logger.warning("Skipping opportunity to pop_debt_from_queue and settle debt because there is no system coin to bid")
                 return
@@ -543,20 +728,19 @@ class AuctionKeeper:
                 self.reconcile_debt(total_surplus, total_on_auction_debt, unqueued_unauctioned_debt)
 
             # Convert enough debt in unqueued_unauctioned_debt to have unqueued_unauctioned_debt >= debt_auction_bid_size + total_surplus
-            if unqueued_unauctioned_debt < (debt_auction_bid_size + total_surplus) and self.liquidation_engine is not None:
-                past_blocks = self.web3.eth.blockNumber - self.from_block
-                for liquidation_event in self.liquidation_engine.past_liquidations(past_blocks):  # TODO: cache ?
-                    block_time = liquidation_event.block_time(self.web3)
-                    now = self.web3.eth.getBlock('latest')['timestamp']
-                    debt_queue = self.accounting_engine.debt_queue_of(block_time)
-                    # If the liquidation hasn't already been popped from queue and has aged past the `pop_debt_delay`
-                    if debt_queue > Rad(0) and block_time + pop_debt_delay <= now:
-                        self.accounting_engine.pop_debt_from_queue(block_time).transact(gas_price=self.gas_price)
-
-                        # pop debt from queue until unqueued_unauctioned_debt is above debt_auction_bid_size + total_surplus
-                        total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
-                        if self.accounting_engine.unqueued_unauctioned_debt() - total_surplus >= debt_auction_bid_size:
-                            break
+            if unqueued_unauctioned_debt < (debt_auction_bid_size + total_surplus):
+                now = block_cache(self.web3).block_time()
+                # Pop queued debt which has aged past the `pop_debt_delay`
+                for block_time in self.debt_queue.poppable(pop_debt_delay, now):
+                    if self.accounting_engine.pop_debt_from_queue(block_time).transact(gas_price=self.gas_price):
+                        self.debt_queue.remove(block_time)
+                    else:
+                        self.debt_queue.confirm(block_time)
+
+                    # pop debt from queue until unqueued_unauctioned_debt is above debt_auction_bid_size + total_surplus
+                    total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
+                    if self.accounting_engine.unqueued_unauctioned_debt() - total_surplus >= debt_auction_bid_size:
+                        break
 
             # Reduce on-auction debt and reconcile remaining total_surplus
             total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
@@ -593,7 +777,7 @@ class AuctionKeeper:
         #if self.geb_staking.can_auction_tokens():
             # We need to bring accounting engine system coin balance to 0 and unqueued_unauctioned_debt to at least debt_auction_bid_size
 
-            available_system_coin = self.geb.system_coin.balance_of(self.our_address) + Wad(self.safe_engine.coin_balance(self.our_address))
+            available_system_coin = self.available_system_coin()
             if self.arguments.bid_on_auctions and available_system_coin == Wad(0):
                 self.logger.warning("Skipping opportunity to pop_debt_from_queue and settle debt because there is no system coin to bid")
                 return
@@ -604,20 +788,19 @@ class AuctionKeeper:
                 self.reconcile_debt(total_surplus, total_on_auction_debt, unqueued_unauctioned_debt)
 
             # Convert enough debt in unqueued_unauctioned_debt to have unqueued_unauctioned_debt >= debt_auction_bid_size + total_surplus
-            if unqueued_unauctioned_debt < (debt_auction_bid_size + total_surplus) and self.liquidation_engine is not None:
-                past_blocks = self.web3.eth.blockNumber - self.from_block
-                for liquidation_event in self.liquidation_engine.past_liquidations(past_blocks):  # TODO: cache ?
-                    block_time = liquidation_event.block_time(self.web3)
-                    now = self.web3.eth.getBlock('latest')['timestamp']
-                    debt_queue = self.accounting_engine.debt_queue_of(block_time)
-                    # If the liquidation hasn't already been popped from queue and has aged past the `pop_debt_delay`
-                    if debt_queue > Rad(0) and block_time + pop_debt_delay <= now:
-                        self.accounting_engine.pop_debt_from_queue(block_time).transact(gas_price=self.gas_price)
-
-                        # pop debt from queue until unqueued_unauctioned_debt is above debt_auction_bid_size + total_surplus
-                        total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
-                        if self.accounting_engine.unqueued_unauctioned_debt() - total_surplus >= debt_auction_bid_size:
-                            break
+            if unqueued_unauctioned_debt < (debt_auction_bid_size + total_surplus):
+                now = block_cache(self.web3).block_time()
+                # Pop queued debt which has aged past the `pop_debt_delay`
+                for block_time in self.debt_queue.poppable(pop_debt_delay, now):
+                    if self.accounting_engine.pop_debt_from_queue(block_time).transact(gas_price=self.gas_price):
+                        self.debt_queue.remove(block_time)
+                    else:
+                        self.debt_queue.confirm(block_time)
+
+                    # pop debt from queue until unqueued_unauctioned_debt is above debt_auction_bid_size + total_surplus
+                    total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
+                    if self.accounting_engine.unqueued_unauctioned_debt() - total_surplus >= debt_auction_bid_size:
+                        break
 
             # Reduce on-auction debt and reconcile remaining total_surplus
             total_surplus = self.safe_engine.coin_balance(self.accounting_engine.address)
@@ -649,16 +832,19 @@ class AuctionKeeper:
         started = datetime.now()
         ignored_auctions = []
 
-        for id in range(self.arguments.min_auction, self.strategy.auctions_started() + 1):
-            if not self.auction_handled_by_this_shard(id):
-                continue
+        auction_ids = [id for id in self.auction_history.get_auctions()
+                       if id >= self.arguments.min_auction and self.auction_handled_by_this_shard(id)]
+        # Read the state of all auctions in as few requests as possible
+        inputs = self.strategy.get_inputs(auction_ids)
+
+        for id in auction_ids:
             with self.auctions_lock:
                 # If we're exiting, release the lock around checking auctions
                 if self.is_shutting_down():
                     return
 
                 # Check whether auction needs to be handled; settle the auction if appropriate
-                if not self.check_auction(id):
+                if not self.check_auction(id, inputs[id]):
                     continue
 
                 # If we're not bidding, don't produce a price model for the auction
@@ -667,71 +853,111 @@ class AuctionKeeper:
              
                 # use flash proxy to settle auction
                 if self.arguments.type == 'collateral' and self.arguments.flash_swap:
-                    self.logger.info(f"Using flash swap to settle auction {id}")
-
-                    for pool in self.arguments.flash_swap_pools:
-                        self.logger.info(f"Using {pool} flash swap to settle auction {id}")
-                        receipt = self.collateral_flash_swap_pools[pool].settle_auction(id).\
-                                    transact(gas=2000000, gas_price=self.gas_price)
-                        if not receipt:
-                            self.logger.warning(f"flash swap settle auction with pool {pool} failed.")
-                            continue 
-                        break
+                    self.queue_settlement(id, 'flash')
 
                 # Prevent growing the auctions collection beyond the configured size
                 if len(self.auctions.auctions) < self.arguments.max_auctions:
-                    self.feed_model(id)
+                    self.feed_model(id, inputs[id])
                 elif id not in self.auctions.auctions.keys():
                     ignored_auctions.append(id)
 
         if len(ignored_auctions) > 0:
             logging.warning(f"Processing auctions {list(self.auctions.auctions.keys())}; ignoring {ignored_auctions}")
 
-        self.logger.info(f"Checked auctions {self.arguments.min_auction} to {self.strategy.auctions_started()} in " 
-                         f"{(datetime.now() - started).seconds} seconds")
+        self.submit_settlements()
+
+        self.logger.info(f"Checked {len(auction_ids)} active auctions in {(datetime.now() - started).seconds} seconds")
+
+    def bid_on_stance(self, id: int):
+        """Bids on an auction as soon as its model outputs a stance, rather than at the next `check_for_bids`."""
+        assert isinstance(id, int)
+
+        with self.bids_pending_lock:
+            self.bids_pending.add(id)
+            if self.bidding_thread is None:
+                self.bidding_thread = threading.Thread(target=self.bid_pending, daemon=True)
+                self.bidding_thread.start()
+
+    def bid_pending(self):
+        while True:
+            with self.bids_pending_lock:
+                auction_ids = sorted(self.bids_pending)
+                self.bids_pending.clear()
+                if len(auction_ids) == 0:
+                    self.bidding_thread = None
+                    return
+
+            try:
+                self.check_for_bids(auction_ids)
+            except Exception:
+                self.logger.exception(f"Error bidding on auctions {auction_ids}")
+
+    def check_for_bids(self, auction_ids: Optional[List[int]] = None):
+        """Bids on auctions whose models output a price.
+
+        Args:
+            auction_ids: Auctions to bid on, or `None` for every auction handled by this keeper
+        """
+        assert isinstance(auction_ids, list) or auction_ids is None
 
-    def check_for_bids(self):
-        # Initialize the reservoir with system coin/prot balance for this round of bid submissions.
+        # Initialize the reservoir of each account with its system coin/prot balance for this round of bid submissions.
         # This isn't a perfect solution as it omits the cost of bids submitted from the last round.
         # Recreating the reservoir preserves the stateless design of this keeper.
-        if self.collateral_auction_house or self.debt_auction_house or self.staked_token_auction_house:
-            reservoir = Reservoir(self.safe_engine.coin_balance(self.our_address))
-        elif self.surplus_auction_house:
-            reservoir = Reservoir(Rad(self.prot.balance_of(self.our_address)))
-        else:
-            raise RuntimeError("Unsupported auction type")
-        
+        reservoirs = {}
+
+        def reservoir_of(account: Address) -> Reservoir:
+            if account not in reservoirs:
+                if self.collateral_auction_house or self.debt_auction_house or self.staked_token_auction_house:
+                    reservoirs[account] = Reservoir(self.safe_engine.coin_balance(account))
+                elif self.surplus_auction_house:
+                    reservoirs[account] = Reservoir(Rad(self.prot.balance_of(account)))
+                else:
+                    raise RuntimeError("Unsupported auction type")
+            return reservoirs[account]
+
         with self.auctions_lock:
-            for id, auction in self.auctions.auctions.items():
+            if auction_ids is None:
+                auction_ids = list(self.auctions.auctions.keys())
+            auction_ids = [id for id in auction_ids
+                           if id in self.auctions.auctions and self.auction_handled_by_this_shard(id)]
+            # Read the state of all auctions in as few requests as possible, unless already read in this block
+            bids = self.strategy.snapshot(auction_ids).bids
+
+            for id in auction_ids:
+                auction = self.auctions.auctions[id]
                 # If we're exiting, release the lock around checking price models
                 if self.is_shutting_down():
                     return
 
-                if not self.auction_handled_by_this_shard(id):
-                    continue
-
+                # Bids on an auction stay on one account while one is in flight, so they can replace each other
+                account = self.accounts.account_for(id)
                 if isinstance(self.collateral_auction_house, FixedDiscountCollateralAuctionHouse):
-                    self.handle_discount_bid(id=id, auction=auction, reservoir=reservoir)
+                    self.handle_discount_bid(id=id, auction=auction, reservoir=reservoir_of(account), bid=bids[id],
+                                             account=account)
                 elif isinstance(self.collateral_auction_house, IncreasingDiscountCollateralAuctionHouse):
-                    self.handle_discount_bid(id=id, auction=auction, reservoir=reservoir)
+                    self.handle_discount_bid(id=id, auction=auction, reservoir=reservoir_of(account), bid=bids[id],
+                                             account=account)
                 else:
-                    self.handle_bid(id=id, auction=auction, reservoir=reservoir)
+                    self.handle_bid(id=id, auction=auction, reservoir=reservoir_of(account), bid=bids[id], account=account)
 
     # TODO if we will introduce multithreading here, proper locking should be introduced as well
     #     locking should not happen on `auction.lock`, but on auction.id here. as sometimes we will
     #     intend to lock on auction id but not create `Auction` object for it (as the auction is already finished
     #     for example).
-    def check_auction(self, id: int) -> bool:
+    def check_auction(self, id: int, input: Optional[Status] = None) -> bool:
         assert isinstance(id, int)
-        current_block = self.web3.eth.blockNumber
+        assert isinstance(input, Status) or input is None
+        current_block = block_cache(self.web3).block_number()
         assert isinstance(current_block, int)
 
         # Improves performance by avoiding an onchain call to check auctions we know have completed.
-        if id in self.dead_since and current_block - self.dead_since[id] > 10:
+        if id in self.dead_since and current_block - self.dead_since[id] > self.dead_after:
+            self.auction_history.remove_auction(id)
             return False
 
-        # Read auction information from the chain
-        input = self.strategy.get_input(id)
+        # Read auction information from the chain, unless the caller already did
+        if input is None:
+            input = self.strategy.get_input(id)
         logging.info(f"Input for auction {id}: {input.to_dict()}")
         auction_deleted = (input.auction_deadline == 0)
         logging.info(f"Auction {id} deleted: {auction_deleted}")
@@ -755,20 +981,16 @@ class AuctionKeeper:
             logging.debug(f"Stopped tracking auction {id}")
             return False
 
-        # Check if the auction is finished.  If so configured, `restart_auction` or `settle_auction` the auction synchronously.
+        # Check if the auction is finished.  If so configured, queue the auction to be restarted or settled.
         # only for debt and surplus auctions
         elif auction_finished:
             if input.bid_expiry == 0:
                 if self.arguments.create_auctions:
                     logging.info(f"Auction {id} ended without bids; resurrecting auction")
-                    self.strategy.restart_auction(id).transact(gas_price=self.gas_price)
+                    self.queue_settlement(id, 'restart')
                     return True
             elif self.settle_all or input.high_bidder in self.settle_auctions_for:
-                self.strategy.settle_auction(id).transact(gas_price=self.gas_price)
-
-                # Upon winning a collateral or debt auction, we may need to replenish system coin to the SAFE Engine.
-                # Upon winning a surplus auction, we may want to withdraw won system coin from the SAFE Engine.
-                self.rebalance_system_coin()
+                self.queue_settlement(id, 'settle')
             else:
                 logging.debug(f"Not settling {id} with high_bidder={input.high_bidder}")
 
@@ -782,33 +1004,162 @@ class AuctionKeeper:
         else:
             return True
 
-    def feed_model(self, id: int):
+    def queue_settlement(self, id: int, action: str):
+        """Queues an auction to be settled or restarted by `submit_settlements`.
+
+        Args:
+            id: Auction id
+            action: `settle` or `restart` the auction, or `flash` to settle it through a flash swap
+        """
+        assert isinstance(id, int)
+        assert action in ['settle', 'restart', 'flash']
+
+        with self.settlement_lock:
+            if id not in self.settlements_in_flight:
+                self.settlement_queue[id] = action
+
+    def submit_settlements(self):
+        """Sends all queued settlements from a worker thread, so neither the auction sweep nor bidding wait on them."""
+        with self.settlement_lock:
+            settlements = self.settlement_queue
+            self.settlement_queue = {}
+            self.settlements_in_flight.update(settlements.keys())
+        if len(settlements) == 0:
+            return
+
+        def worker():
+            try:
+                self.settle(settlements)
+            except Exception as e:
+                self.logger.exception(f"Error settling auctions {list(settlements.keys())}: {e}")
+            finally:
+                with self.settlement_lock:
+                    self.settlements_in_flight.difference_update(settlements.keys())
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+
+    def settle(self, settlements: Dict[int, str]):
+        """Settles and restarts auctions, batching them into as few transactions as possible.
+
+        Flash swap settlements go through the `settleAuction(uint256[])` overload of the flash proxies. With
+        `--tx-manager`, other settlements and restarts are sent `--liquidation-batch-size` at a time in `TxManager`
+        transactions.
+
+        Args:
+            settlements: Action queued for each auction, see `queue_settlement`
+        """
+        assert isinstance(settlements, dict)
+
+        def flash_settle(auction_id) -> bool:
+            return self.flash_swap(f"settle auction {auction_id}",
+                                   {pool: proxy.settle_auction(auction_id)
+                                    for pool, proxy in self.collateral_flash_swap_pools.items()})
+
+        flash_ids = sorted(id for id, action in settlements.items() if action == 'flash')
+        if len(flash_ids) == 1:
+            flash_settle(flash_ids[0])
+        elif len(flash_ids) > 1 and not flash_settle(flash_ids):
+            self.logger.warning(f"Batched flash swap settlement of auctions {flash_ids} failed; settling individually")
+            for id in flash_ids:
+                flash_settle(id)
+
+        transacts = [(id, action, self.strategy.restart_auction(id) if action == 'restart' else self.strategy.settle_auction(id))
+                     for id, action in sorted(settlements.items()) if action != 'flash']
+        if len(transacts) == 0:
+            return
+
+        async def send(id: int, action: str, transact) -> list:
+            try:
+                return [(id, action, await self.accounts.transact_async(transact, self.accounts.account_for(),
+                                                                        gas_price=self.gas_price))]
+            except Exception as e:
+                self.logger.warning(f"Error sending {action} of auction {id}: {e}")
+                return [(id, action, None)]
+
+        async def send_batch(batch: list) -> list:
+            # Leave out calls which would revert, as a single failing call reverts the whole TxManager transaction
+            outcomes = []
+            invocations = []
+            for id, action, transact in batch:
+                try:
+                    await run_blocking(transact.estimated_gas, self.tx_manager.address)
+                    invocations.append((id, action, transact))
+                except Exception as e:
+                    self.logger.warning(f"Leaving auction {id} out of batched {action}: {e}")
+                    outcomes.append((id, action, None))
+            if len(invocations) == 0:
+                return outcomes
+
+            try:
+                receipt = await self.tx_manager.execute([], [transact.invocation() for _, _, transact in invocations]).\
+                    transact_async(gas_price=self.gas_price)
+            except Exception as e:
+                self.logger.warning(f"Error sending batched settlement: {e}")
+                receipt = None
+
+            if receipt is not None and receipt.successful:
+                return outcomes + [(id, action, receipt) for id, action, _ in invocations]
+
+            self.logger.warning(f"Batched settlement of {len(invocations)} auctions failed; sending them individually")
+            results = await asyncio.gather(*[send(*invocation) for invocation in invocations])
+            return outcomes + [outcome for result in results for outcome in result]
+
+        if self.tx_manager is not None and len(transacts) > 1:
+            batch_size = self.arguments.liquidation_batch_size
+            futures = [send_batch(transacts[start:start+batch_size]) for start in range(0, len(transacts), batch_size)]
+        else:
+            futures = [send(*transact) for transact in transacts]
+        outcomes = [outcome for result in synchronize(futures) for outcome in result]
+
+        settled = False
+        for id, action, receipt in outcomes:
+            if receipt is not None and receipt.successful:
+                self.logger.info(f"Sent {action} of auction {id} in block {receipt.raw_receipt['blockNumber']}")
+                settled = settled or action == 'settle'
+            else:
+                self.logger.warning(f"Failed to {action} auction {id}")
+
+        if settled:
+            # Upon winning a collateral or debt auction, we may need to replenish system coin to the SAFE Engine.
+            # Upon winning a surplus auction, we may want to withdraw won system coin from the SAFE Engine.
+            for account in self.accounts.addresses:
+                self.rebalance_system_coin(account)
+
+    def feed_model(self, id: int, input: Optional[Status] = None):
         assert isinstance(id, int)
+        assert isinstance(input, Status) or input is None
 
         # Create or get the price model associated with the auction
         auction = self.auctions.get_auction(id)
 
-        # Read auction state from the chain
-        input = self.strategy.get_input(id)
+        # Read auction state from the chain, unless the caller already did
+        if input is None:
+            input = self.strategy.get_input(id)
 
-        logging.info(f"Feeding auction {id} model input {input.to_dict()}")
-        # Feed the model with current state
-        auction.feed_model(input)
+        # Feed the model with current state, if it changed
+        if auction.feed_model(input, self.arguments.model_heartbeat):
+            logging.info(f"Fed auction {id} model input {input.to_dict()}")
 
-    def handle_discount_bid(self, id: int, auction: Auction, reservoir: Reservoir):
+    def handle_discount_bid(self, id: int, auction: Auction, reservoir: Reservoir, bid=None,
+                            account: Optional[Address] = None):
         assert isinstance(id, int)
         assert isinstance(auction, Auction)
+        assert isinstance(account, Address) or account is None
 
+        account = account if account is not None else self.our_address
         output = auction.model_output()
         if output is None:
             return
 
-        self.rebalance_system_coin()
-        
-        bid_price, bid_transact, cost = self.strategy.bid(id)
+        rebalanced = self.rebalance_system_coin(account)
+        if rebalanced is not None and rebalanced != Wad(0):
+            self.strategy.snapshot([]).forget(f'coin_balance {account}')
+
+        bid_price, bid_transact, cost = self.strategy.bid(id, bid=bid, bidder=account)
 
         if cost is not None:
-            if not self.check_bid_cost(id, cost, reservoir, already_rebalanced=True):
+            if not self.check_bid_cost(id, cost, reservoir, already_rebalanced=True, account=account):
                 return
 
         if bid_price is not None and bid_transact is not None:
@@ -830,7 +1181,8 @@ class AuctionKeeper:
                 auction.register_transaction(bid_transact)
 
                 # ...submit a new transaction and wait the delay period (if so configured)
-                self._run_future(bid_transact.transact_async(gas_price=auction.gas_price))
+                self._run_future(self.accounts.transact_async(bid_transact, account, id, gas_price=auction.gas_price,
+                                                              learned_gas=self.arguments.learned_gas_limits))
                 if self.arguments.bid_delay:
                     logging.debug(f"Waiting {self.arguments.bid_delay}s")
                     time.sleep(self.arguments.bid_delay)
@@ -849,25 +1201,28 @@ class AuctionKeeper:
                 auction.register_transaction(bid_transact)
 
                 # ...ask pyflex to replace the transaction
-                self._run_future(bid_transact.transact_async(replace=transaction_in_progress,
-                                                             gas_price=auction.gas_price))
+                self._run_future(self.accounts.transact_async(bid_transact, account, id, replace=transaction_in_progress,
+                                                              gas_price=auction.gas_price,
+                                                              learned_gas=self.arguments.learned_gas_limits))
 
-    def handle_bid(self, id: int, auction: Auction, reservoir: Reservoir):
+    def handle_bid(self, id: int, auction: Auction, reservoir: Reservoir, bid=None, account: Optional[Address] = None):
         assert isinstance(id, int)
         assert isinstance(auction, Auction)
         assert isinstance(reservoir, Reservoir)
+        assert isinstance(account, Address) or account is None
 
+        account = account if account is not None else self.our_address
         output = auction.model_output()
         if output is None:
             self.logger.debug(f"No model output for auction {id}")
             return
 
-        bid_price, bid_transact, cost = self.strategy.bid(id, output.price)
+        bid_price, bid_transact, cost = self.strategy.bid(id, output.price, bid=bid)
 
         # If we can't afford the bid, log a warning/error and back out.
         # By continuing, we'll burn through gas fees while the keeper pointlessly retries the bid.
         if cost is not None:
-            if not self.check_bid_cost(id, cost, reservoir):
+            if not self.check_bid_cost(id, cost, reservoir, account=account):
                 self.logger.info(f"check_bid_cost() is false for auction {id}")
                 return
 
@@ -890,7 +1245,8 @@ class AuctionKeeper:
                 auction.register_transaction(bid_transact)
 
                 # ...submit a new transaction and wait the delay period (if so configured)
-                self._run_future(bid_transact.transact_async(gas_price=auction.gas_price))
+                self._run_future(self.accounts.transact_async(bid_transact, account, id, gas_price=auction.gas_price,
+                                                              learned_gas=self.arguments.learned_gas_limits))
                 if self.arguments.bid_delay:
                     logging.debug(f"Waiting {self.arguments.bid_delay}s")
                     time.sleep(self.arguments.bid_delay)
@@ -907,8 +1263,9 @@ class AuctionKeeper:
                 auction.register_transaction(bid_transact)
 
                 # ...ask pyflex to replace the transaction
-                self._run_future(bid_transact.transact_async(replace=transaction_in_progress,
-                                                             gas_price=auction.gas_price))
+                self._run_future(self.accounts.transact_async(bid_transact, account, id, replace=transaction_in_progress,
+                                                              gas_price=auction.gas_price,
+                                                              learned_gas=self.arguments.learned_gas_limits))
 
             # if model has been providing a gas price, and only that changed...
             elif fixed_gas_price_changed:
@@ -924,52 +1281,69 @@ class AuctionKeeper:
                 auction.register_transaction(bid_transact)
 
                 # ...ask pyflex to replace the transaction
-                self._run_future(bid_transact.transact_async(replace=transaction_in_progress,
-                                                             gas_price=auction.gas_price))
+                self._run_future(self.accounts.transact_async(bid_transact, account, id, replace=transaction_in_progress,
+                                                              gas_price=auction.gas_price,
+                                                              learned_gas=self.arguments.learned_gas_limits))
 
-    def check_bid_cost(self, id: int, cost: Rad, reservoir: Reservoir, already_rebalanced=False) -> bool:
+    def check_bid_cost(self, id: int, cost: Rad, reservoir: Reservoir, already_rebalanced=False,
+                       account: Optional[Address] = None) -> bool:
         assert isinstance(id, int)
         assert isinstance(cost, Rad)
+        assert isinstance(account, Address) or account is None
 
+        account = account if account is not None else self.our_address
         # If this is an auction where we bid with system coin...
         if self.collateral_auction_house or self.debt_auction_house or self.staked_token_auction_house:
             if not reservoir.check_bid_cost(id, cost):
                 if not already_rebalanced:
                     # Try to synchronously join system coin the SAFE Engine
-                    if self.is_joining_system_coin:
+                    if self.accounts.lock(account).locked():
                         self.logger.info(f"Bid cost {str(cost)} exceeds reservoir level of {reservoir.level}; "
                                           "waiting for system coin to rebalance")
                         return False
                     else:
-                        rebalanced = self.rebalance_system_coin()
+                        rebalanced = self.rebalance_system_coin(account)
                         if rebalanced and rebalanced > Wad(0):
                             self.logger.info(f"Refilling reservoir with {Rad(rebalanced)} system coin.")
                             reservoir.refill(Rad(rebalanced))
-                            return self.check_bid_cost(id, cost, reservoir, already_rebalanced=True)
+                            return self.check_bid_cost(id, cost, reservoir, already_rebalanced=True, account=account)
 
                 self.logger.info(f"Bid cost {str(cost)} exceeds reservoir level of {reservoir.level}; "
                                   "bid will not be submitted")
                 return False
         # If this is an auction where we bid with prot...
         elif self.surplus_auction_house:
-            prot_balance = self.prot.balance_of(self.our_address)
+            prot_balance = self.prot.balance_of(account)
             if cost > Rad(prot_balance):
                 self.logger.info(f"Bid cost {str(cost)} exceeds reservoir level of {reservoir.level}; "
                                   "bid will not be submitted")
                 return False
         return True
 
-    def rebalance_system_coin(self) -> Optional[Wad]:
+    def rebalance_system_coin(self, account: Optional[Address] = None) -> Optional[Wad]:
         # Returns amount joined (positive) or exited (negative) as a result of rebalancing towards safe_engine_system_coin_target
+        assert isinstance(account, Address) or account is None
+
+        account = account if account is not None else self.our_address
         if self.arguments.safe_engine_system_coin_target == 0:
             return Wad(0)
 
         if self.arguments.type == 'surplus':
             return Wad(0)
 
+        # Since we don't want periodically-polled bidding threads to back up, don't wait for another rebalance
+        lock = self.accounts.lock(account)
+        if not lock.acquire(blocking=False):
+            return None
+        try:
+            return self._rebalance_system_coin(account)
+        finally:
+            lock.release()
+
+    def _rebalance_system_coin(self, account: Address) -> Optional[Wad]:
         logging.debug(f"Checking if internal system coin balance needs to be rebalanced")
         system_coin = self.system_coin_join.system_coin()
-        token_balance = system_coin.balance_of(self.our_address)  # Wad
+        token_balance = system_coin.balance_of(account)  # Wad
         # Prevent spending gas on small rebalances
         debt_floor = Wad.from_number(1);
         #if self.collateral_type:
@@ -990,7 +1364,7 @@ class AuctionKeeper:
                 if system_coin_target < debt_floor:
                     self.logger.warning(f"Dust cutoff of {debt_floor} exceeds system coin target {system_coin_target}; "
                                         "please adjust configuration accordingly")
-                safe_engine_balance = Wad(self.safe_engine.coin_balance(self.our_address))
+                safe_engine_balance = Wad(self.safe_engine.coin_balance(account))
                 if safe_engine_balance < system_coin_target:
                     system_coin_to_join = system_coin_target - safe_engine_balance
                 elif safe_engine_balance > system_coin_target:
@@ -1002,44 +1376,51 @@ class AuctionKeeper:
             # Join tokens to the safe_engine
             if token_balance >= system_coin_to_join:
                 self.logger.info(f"Joining {str(system_coin_to_join)} system coin to the SAFE Engine")
-                return self.join_system_coin(system_coin_to_join)
+                return self.join_system_coin(system_coin_to_join, account)
             elif token_balance > Wad(0):
                 self.logger.warning(f"Insufficient balance to maintain system coin target; joining {str(token_balance)} "
                                     "system coin to the SAFE Engine")
-                return self.join_system_coin(token_balance)
+                return self.join_system_coin(token_balance, account)
             else:
                 self.logger.warning("Insufficient system coin is available to join to SAFE Engine; cannot maintain system coin target")
                 return Wad(0)
         elif system_coin_to_exit > debt_floor:
             # Exit system_coin from the safe_engine
             self.logger.info(f"Exiting {str(system_coin_to_exit)} system coin from the SAFE Engine")
-            assert self.system_coin_join.exit(self.our_address, system_coin_to_exit).transact(gas_price=self.gas_price)
+            assert self.system_coin_join.exit(account, system_coin_to_exit).transact(from_address=account,
+                                                                                     gas_price=self.gas_price)
             return system_coin_to_exit * -1
-        self.logger.debug(f"system coin token balance: {str(system_coin.balance_of(self.our_address))}, "
-                         f"SAFE Engine balance: {self.safe_engine.coin_balance(self.our_address)}")
+        self.logger.debug(f"system coin token balance: {str(system_coin.balance_of(account))}, "
+                         f"SAFE Engine balance: {self.safe_engine.coin_balance(account)}")
 
-    def join_system_coin(self, amount: Wad):
+    def join_system_coin(self, amount: Wad, account: Optional[Address] = None):
         assert isinstance(amount, Wad)
-        assert not self.is_joining_system_coin
-        try:
-            self.is_joining_system_coin = True
-            assert self.system_coin_join.join(self.our_address, amount).transact(gas_price=self.gas_price)
-        finally:
-            self.is_joining_system_coin = False
+        assert isinstance(account, Address) or account is None
+
+        account = account if account is not None else self.our_address
+        assert self.system_coin_join.join(account, amount).transact(from_address=account, gas_price=self.gas_price)
         return amount
 
     def exit_collateral(self, swap: bool):
         if not self.collateral:
             return
 
+        # Collateral won by other accounts is exited to their wallets; only --eth-from swaps it on Uniswap
         token = Token(self.collateral.collateral_type.name.split('-')[0], self.collateral.collateral.address, self.collateral.adapter.decimals())
-        safe_engine_balance = self.safe_engine.token_collateral(self.collateral_type, self.our_address)
+        for account in self.accounts.addresses:
+            self.exit_collateral_of(account, token, swap and account == self.our_address)
+
+    def exit_collateral_of(self, account: Address, token: Token, swap: bool):
+        assert isinstance(account, Address)
+        assert isinstance(token, Token)
+
+        safe_engine_balance = self.safe_engine.token_collateral(self.collateral_type, account)
         if safe_engine_balance <= token.min_amount:
             return
 
         collateral_amount = token.unnormalize_amount(safe_engine_balance)
-        self.logger.info(f"Exiting {str(safe_engine_balance)} {self.collateral_type.name} from the SAFE Engine")
-        assert self.collateral_join.exit(self.our_address, collateral_amount).transact(gas_price=self.gas_price)
+        self.logger.info(f"Exiting {str(safe_engine_balance)} {self.collateral_type.name} of {account} from the SAFE Engine")
+        assert self.collateral_join.exit(account, collateral_amount).transact(from_address=account, gas_price=self.gas_price)
 
         if not swap:
             return
@@ -1051,18 +1432,13 @@ class AuctionKeeper:
         if not self.syscoin_eth_uniswap.swap_exact_eth_for_tokens(collateral_amount, min_amount_out, self.weth_syscoin_path).transact():
             self.logger.warn(f"Unable to swap collateral for syscoin with less than {self.arguments.max_swap_slippage} slippage")
 
-    @staticmethod
-    def _run_future(future):
-        def worker():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                asyncio.get_event_loop().run_until_complete(future)
-            finally:
-                loop.close()
+    def _run_future(self, future):
+        """Runs a transaction on the shared event loop, without waiting for it"""
+        def log_failure(result):
+            if not result.cancelled() and result.exception() is not None:
+                self.logger.error("Error running transaction", exc_info=result.exception())
 
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
+        async_executor.submit(future).add_done_callback(log_failure)
 
 if __name__ == '__main__':
     AuctionKeeper(sys.argv[1:]).main()
@@ -15,9 +15,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import importlib
 import logging
+import threading
 from pprint import pformat
-from typing import Optional
+from typing import Callable, Optional
 
 from auction_keeper.process import Process
 from pyflex import Address
@@ -124,9 +126,11 @@ class Status():
                self.surplus_auction_house == other.surplus_auction_house and \
                self.debt_auction_house == other.debt_auction_house and \
                self.staked_token_auction_house == other.staked_token_auction_house and \
-               self.bid == other.bid and \
+               self.bid_amount == other.bid_amount and \
                self.amount_to_sell == other.amount_to_sell and \
                self.amount_to_raise == other.amount_to_raise and \
+               self.sold_amount == other.sold_amount and \
+               self.raised_amount == other.raised_amount and \
                self.bid_increase == other.bid_increase and \
                self.bid_decrease == other.bid_decrease and \
                self.high_bidder == other.high_bidder and \
@@ -136,21 +140,37 @@ class Status():
                self.price == other.price
 
     def __hash__(self):
-        return hash((self.id,
-                     self.collateral_auction_house,
-                     self.surplus_auction_house,
-                     self.debt_auction_house,
-                     self.staked_token_auction_house,
-                     self.bid,
-                     self.amount_to_sell,
-                     self.amount_to_raise,
-                     self.bid_increase,
-                     self.bid_decrease,
-                     self.high_bidder,
-                     self.block_time,
-                     self.bid_expiry,
-                     self.auction_deadline,
-                     self.price))
+        return hash((self.state(), self.block_time))
+
+    def state(self) -> tuple:
+        """State of the auction, leaving out the time at which it was read"""
+        return (self.id,
+                self.collateral_auction_house,
+                self.surplus_auction_house,
+                self.debt_auction_house,
+                self.staked_token_auction_house,
+                self.bid_amount,
+                self.amount_to_sell,
+                self.amount_to_raise,
+                self.sold_amount,
+                self.raised_amount,
+                self.bid_increase,
+                self.bid_decrease,
+                self.high_bidder,
+                self.bid_expiry,
+                self.auction_deadline,
+                self.price)
+
+    def same_state(self, other) -> bool:
+        """Tells whether `other` describes the same auction state, whatever the time each status was read"""
+        assert isinstance(other, Status) or other is None
+
+        if other is None:
+            return False
+        # Numeric types refuse to be compared with other types, i.e. with `None`
+        return all(type(mine) is type(theirs) and (mine is None or mine == theirs)
+                   for mine, theirs in zip(self.state(), other.state()))
+
     def to_dict(self):
 
         record = {
@@ -208,6 +228,11 @@ class Stance:
     def __hash__(self):
         return hash((self.price, self.gas_price))
 
+    @staticmethod
+    def from_dict(data: dict):
+        return Stance(price=Wad.from_number(data['price']) if 'price' in data else None,
+                      gas_price=int(data['gasPrice']) if 'gasPrice' in data else None)
+
     def __repr__(self):
         return pformat(vars(self))
 
@@ -226,6 +251,7 @@ class Model:
         self._arguments += f" --debt_auction_house {parameters.debt_auction_house}" if parameters.debt_auction_house is not None else ""
         self._arguments += f" --staked_token_auction_house {parameters.staked_token_auction_house}" if parameters.staked_token_auction_house is not None else ""
         self._last_output = None
+        self._last_record = None
 
         self.logger.info(f"Instantiated model using process '{self._command} {self._arguments}'")
 
@@ -237,6 +263,9 @@ class Model:
             self.logger.warning(f"Process '{self._command} {self._arguments}' is down, restarting it")
 
             self._process.start()
+            # Statuses are only sent when they change, so the restarted process needs the last one
+            if self._last_record is not None:
+                self._process.write(self._last_record)
 
     def send_status(self, input: Status):
         assert isinstance(input, Status)
@@ -246,6 +275,7 @@ class Model:
         record = input.to_dict()
 
         self._process.write(record)
+        self._last_record = record
 
     def get_stance(self) -> Optional[Stance]:
         self._ensure_process_running()
@@ -254,20 +284,75 @@ class Model:
             data = self._process.read()
 
             if data is not None:
-                self._last_output = Stance(price=Wad.from_number(data['price']) if 'price' in data else None,
-                                           gas_price=int(data['gasPrice']) if 'gasPrice' in data else None)
+                self._last_output = Stance.from_dict(data)
 
             else:
                 break
 
         return self._last_output
 
+    def on_stance(self, callback: Callable[[], None]):
+        """Registers a function called as soon as the model outputs a new stance, which it must not block on"""
+        assert callable(callback)
+
+        self._process.on_output(lambda data: callback())
+
     def terminate(self):
         self.logger.info(f"Terminating model using process '{self._command} {self._arguments}'")
 
         self._process.stop()
 
 
+class PluginModel(Model):
+    """Bidding model running inside the keeper, as a function from `Status` to `Stance`.
+
+    The function is called with each status as it is sent, and its latest `Stance` is returned by `get_stance`.
+    Returning `None` keeps the previous stance, as a model process which prints nothing would.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, name: str, function: Callable[[Status], Optional[Stance]], parameters: Parameters):
+        assert isinstance(name, str)
+        assert callable(function)
+        assert isinstance(parameters, Parameters)
+
+        self._name = name
+        self._function = function
+        self._id = parameters.id
+        self._last_output = None
+        self._on_stance = None
+
+        self.logger.info(f"Instantiated model using module '{self._name}' for auction {self._id}")
+
+    def send_status(self, input: Status):
+        assert isinstance(input, Status)
+
+        try:
+            output = self._function(input)
+        except Exception:
+            self.logger.exception(f"Model '{self._name}' failed to handle status of auction {self._id}")
+            return
+
+        if output is not None:
+            assert isinstance(output, Stance)
+            self._last_output = output
+            if self._on_stance is not None:
+                self._on_stance()
+
+    def get_stance(self) -> Optional[Stance]:
+        return self._last_output
+
+    def on_stance(self, callback: Callable[[], None]):
+        assert callable(callback)
+
+        self._on_stance = callback
+
+    def terminate(self):
+        self.logger.info(f"Terminating model using module '{self._name}' for auction {self._id}")
+
+        self._function = lambda input: None
+
+
 class ModelFactory:
     def __init__(self, command: str):
         assert isinstance(command, str)
@@ -276,3 +361,183 @@ class ModelFactory:
 
     def create_model(self, parameters: Parameters) -> Model:
         return Model(self.command, parameters)
+
+    def terminate(self):
+        pass
+
+
+class MultiplexedModel(Model):
+    """Bidding model for one auction, served by a model process shared with other auctions"""
+    def __init__(self, factory: 'MultiplexedModelFactory', parameters: Parameters):
+        assert isinstance(factory, MultiplexedModelFactory)
+        assert isinstance(parameters, Parameters)
+
+        self._factory = factory
+        self._id = parameters.id
+
+    def send_status(self, input: Status):
+        assert isinstance(input, Status)
+
+        self._factory.send(self._id, input.to_dict())
+
+    def get_stance(self) -> Optional[Stance]:
+        return self._factory.stance(self._id)
+
+    def on_stance(self, callback: Callable[[], None]):
+        assert callable(callback)
+
+        self._factory.on_stance(self._id, callback)
+
+    def terminate(self):
+        self._factory.release(self._id)
+
+
+class MultiplexedModelFactory(ModelFactory):
+    """Serves all auctions from a pool of long-lived model processes.
+
+    Each process is started once, with the auction house arguments but without `--id`, and is sent the status of
+    every auction assigned to it. It must include the auction `id` in each output, so the output can be routed back
+    to the auction, and is sent `{"id": ..., "terminate": true}` when an auction is no longer tracked.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, command: str, processes: int):
+        assert isinstance(command, str)
+        assert isinstance(processes, int)
+        assert processes > 0
+
+        self.command = command
+        self._processes = [None] * processes
+        self._stances = {}
+        self._records = {}
+        self._callbacks = {}
+        self._lock = threading.RLock()
+
+    def create_model(self, parameters: Parameters) -> Model:
+        with self._lock:
+            self._stances[parameters.id] = None
+            index = parameters.id % len(self._processes)
+            if self._processes[index] is None:
+                arguments = f"{self.command}"
+                arguments += f" --collateral_auction_house {parameters.collateral_auction_house}" if parameters.collateral_auction_house is not None else ""
+                arguments += f" --surplus_auction_house {parameters.surplus_auction_house}" if parameters.surplus_auction_house is not None else ""
+                arguments += f" --debt_auction_house {parameters.debt_auction_house}" if parameters.debt_auction_house is not None else ""
+                arguments += f" --staked_token_auction_house {parameters.staked_token_auction_house}" if parameters.staked_token_auction_house is not None else ""
+
+                self.logger.info(f"Instantiated shared model #{index} using process '{arguments}'")
+                self._processes[index] = Process(arguments)
+                self._processes[index].on_output(self._output)
+                self._processes[index].start()
+
+        return MultiplexedModel(self, parameters)
+
+    def send(self, id: int, record: dict):
+        assert isinstance(id, int)
+        assert isinstance(record, dict)
+
+        with self._lock:
+            if id in self._stances:
+                self._records[id] = record
+            process = self._process(id)
+        if process is not None:
+            process.write(record)
+
+    def stance(self, id: int) -> Optional[Stance]:
+        assert isinstance(id, int)
+
+        with self._lock:
+            self._collect()
+            return self._stances.get(id)
+
+    def release(self, id: int):
+        assert isinstance(id, int)
+
+        with self._lock:
+            if id not in self._stances:
+                return
+            del self._stances[id]
+            self._records.pop(id, None)
+            self._callbacks.pop(id, None)
+            process = self._processes[id % len(self._processes)]
+        # A process which is down holds no state for the auction, so it is not restarted just to be told so
+        if process is not None and process.running:
+            process.write({'id': str(id), 'terminate': True})
+
+    def on_stance(self, id: int, callback: Callable[[], None]):
+        assert isinstance(id, int)
+        assert callable(callback)
+
+        with self._lock:
+            if id in self._stances:
+                self._callbacks[id] = callback
+
+    def terminate(self):
+        with self._lock:
+            for process in filter(None, self._processes):
+                if process.running:
+                    process.stop()
+            self._processes = [None] * len(self._processes)
+
+    def _process(self, id: int) -> Optional[Process]:
+        with self._lock:
+            index = id % len(self._processes)
+            process = self._processes[index]
+            if process is not None and not process.running:
+                self.logger.warning(f"Process '{process.command_with_arguments}' is down, restarting it")
+                process.start()
+                # Statuses are only sent when they change, so the restarted process needs the last ones
+                for record_id, record in self._records.items():
+                    if record_id % len(self._processes) == index:
+                        process.write(record)
+            return process
+
+    def _output(self, data: dict):
+        # Called by the process driver; the output itself is routed by `_collect` when the stance is read
+        try:
+            callback = self._callbacks.get(int(data['id']))
+        except (KeyError, TypeError, ValueError):
+            return
+        if callback is not None:
+            callback()
+
+    def _collect(self):
+        # Route everything the processes have output so far to the auctions it belongs to
+        for process in filter(None, self._processes):
+            while True:
+                data = process.read()
+                if data is None:
+                    break
+
+                try:
+                    id = int(data['id'])
+                except (KeyError, TypeError, ValueError):
+                    self.logger.warning(f"Ignoring output without auction id from model '{process.command_with_arguments}'")
+                    continue
+                if id in self._stances:
+                    self._stances[id] = Stance.from_dict(data)
+
+
+class PluginModelFactory(ModelFactory):
+    """Creates models from a `package.module:callable` spec.
+
+    The callable is called once per auction with its `Parameters`, and returns the function mapping that auction's
+    `Status` to a `Stance`.
+    """
+    def __init__(self, spec: str):
+        assert isinstance(spec, str)
+
+        module_name, separator, attribute = spec.partition(':')
+        if not separator or not module_name or not attribute:
+            raise RuntimeError(f"--model-module must be formatted as package.module:callable, not '{spec}'")
+
+        factory = importlib.import_module(module_name)
+        for name in attribute.split('.'):
+            factory = getattr(factory, name)
+        if not callable(factory):
+            raise RuntimeError(f"{spec} passed to --model-module is not callable")
+
+        self.command = spec
+        self.factory = factory
+
+    def create_model(self, parameters: Parameters) -> Model:
+        return PluginModel(self.command, self.factory(parameters), parameters)
@@ -17,121 +17,357 @@
 
 import json
 import logging
+import os
+import selectors
 import threading
 import time
-from fcntl import fcntl, F_SETFL, F_GETFL
+from collections import deque
 from json import JSONDecodeError
-from os import O_NONBLOCK, read
 from subprocess import Popen, PIPE
-from typing import Optional
+from typing import Callable, Optional
 
 
-class Process:
+class _Pipes:
+    """State of the pipes of one process, owned by the driver thread"""
+
+    def __init__(self, process: 'Process', popen: Popen):
+        self.process = process
+        self.popen = popen
+        self.partial = {'stdout': bytearray(), 'stderr': bytearray()}
+        self.open = {'stdout', 'stderr'}
+        self.pending_write = bytearray()
+        self.writing = False
+        self.stdin_open = True
+
+
+class ProcessDriver:
+    """Moves data through the pipes of all model processes from a single thread.
+
+    The thread sleeps in a selector until a pipe becomes readable or writable, or until another thread asks it to
+    do something, and checks once a second whether processes which closed their pipes have exited. It exits
+    whenever no process is running, and is started again by the next `Process.start`.
+    """
     logger = logging.getLogger()
+    liveness_interval = 1.0
 
-    def __init__(self, command_with_arguments: str):
-        self.command_with_arguments = command_with_arguments
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = []
         self._thread = None
-        self._terminate = False
-        self._read_lock = threading.RLock()
-        self._read_queue = []
-        self._write_lock = threading.RLock()
-        self._write_queue = []
+        self._selector = selectors.DefaultSelector()
+        self._pipes = {}
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ, None)
+
+    def register(self, process: 'Process', popen: Popen):
+        self._command(('register', process, popen))
+
+    def write(self, process: 'Process', data: bytes):
+        self._command(('write', process, data))
+
+    def kill(self, process: 'Process'):
+        self._command(('kill', process, None))
+
+    def _command(self, command: tuple):
+        with self._lock:
+            self._commands.append(command)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except BlockingIOError:
+            pass  # the driver has been woken up already
 
     def _run(self):
         try:
-            process = Popen(self.command_with_arguments.split(' '), stdin=PIPE, stdout=PIPE, stderr=PIPE, shell=False)
-            self._set_nonblock(process.stdout)
-            self._set_nonblock(process.stderr)
+            self._loop()
+        finally:
+            # Should the loop itself fail, start a new thread for the processes and commands it leaves behind
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                    if len(self._commands) > 0 or len(self._pipes) > 0:
+                        self._thread = threading.Thread(target=self._run, daemon=True)
+                        self._thread.start()
 
-            self.logger.info(f"Process '{self.command_with_arguments}' (pid #{process.pid}) started")
-        except:
-            self.logger.exception(f"Failed to start process '{self.command_with_arguments}'")
+    def _loop(self):
+        last_liveness_check = time.monotonic()
+        while True:
+            with self._lock:
+                commands = self._commands
+                self._commands = []
+                if len(commands) == 0 and len(self._pipes) == 0:
+                    self._thread = None
+                    return
+
+            # A failure handling one process must not silence the others, which share this thread
+            for action, process, argument in commands:
+                try:
+                    if action == 'register':
+                        self._register(process, argument)
+                    elif process in self._pipes:
+                        if action == 'write':
+                            self._queue_write(self._pipes[process], argument)
+                        elif action == 'kill':
+                            self.logger.debug(f"Killing pid #{self._pipes[process].popen.pid}")
+                            self._finish(self._pipes[process], kill=True)
+                except Exception:
+                    self.logger.exception(f"Error handling {action} of model process '{process.command_with_arguments}'")
+                    if action == 'register' and process not in self._pipes:
+                        self._discard(process, argument)
+                    else:
+                        self._abandon(process)
+
+            for key, events in self._selector.select(timeout=self.liveness_interval):
+                if key.data is None:
+                    self._drain_wakeups()
+                    continue
+
+                pipes, stream = key.data
+                if not self._owns(pipes):
+                    continue
+                try:
+                    if stream == 'stdin':
+                        self._write(pipes)
+                    else:
+                        self._read(pipes, stream)
+                except Exception:
+                    self.logger.exception(f"Error handling {stream} of model process #{pipes.popen.pid}")
+                    self._abandon(pipes.process)
+
+            if time.monotonic() - last_liveness_check >= self.liveness_interval:
+                last_liveness_check = time.monotonic()
+                for pipes in list(self._pipes.values()):
+                    try:
+                        if pipes.popen.poll() is not None:
+                            # Output may still be held open by a child of the exited process
+                            for stream in list(pipes.open):
+                                if self._owns(pipes):
+                                    self._read(pipes, stream)
+                            if self._owns(pipes):
+                                self._finish(pipes)
+                    except Exception:
+                        self.logger.exception(f"Error checking model process #{pipes.popen.pid}")
+                        self._abandon(pipes.process)
+
+    def _abandon(self, process: 'Process'):
+        # Kill a process whose pipes could not be handled, so it is started again rather than retried forever
+        if process not in self._pipes:
             return
+        try:
+            self._finish(self._pipes[process], kill=True)
+        except Exception:
+            self.logger.exception(f"Error killing model process '{process.command_with_arguments}'")
+            self._discard(process, self._pipes.pop(process).popen)
 
-        while process.poll() is None:
-            if self._terminate:
-                self.logger.debug(f"Killing pid #{process.pid}")
-                process.kill()
-                break
+    def _discard(self, process: 'Process', popen: Popen):
+        # Last resort when a process could not be registered or finished: forget its pipes and kill it
+        for stream in ['stdin', 'stdout', 'stderr']:
+            try:
+                self._selector.unregister(getattr(popen, stream))
+            except (KeyError, ValueError):
+                pass
+        try:
+            popen.kill()
+        except OSError:
+            pass
+        process._terminated(popen.pid)
+
+    def _owns(self, pipes: _Pipes) -> bool:
+        # Pipes of a process which has since finished, and perhaps been started again, are stale
+        return self._pipes.get(pipes.process) is pipes
 
-            # Read from stdout
+    def _register(self, process: 'Process', popen: Popen):
+        pipes = _Pipes(process, popen)
+        for stream in ['stdin', 'stdout', 'stderr']:
+            os.set_blocking(getattr(popen, stream).fileno(), False)
+        self._selector.register(popen.stdout, selectors.EVENT_READ, (pipes, 'stdout'))
+        self._selector.register(popen.stderr, selectors.EVENT_READ, (pipes, 'stderr'))
+        self._pipes[process] = pipes
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _read(self, pipes: _Pipes, stream: str):
+        pipe = getattr(pipes.popen, stream)
+        while True:
             try:
-                lines = read(process.stdout.fileno(), 102400).decode('utf-8').splitlines()
+                data = os.read(pipe.fileno(), 65536)
+            except BlockingIOError:
+                if stream == 'stdout' and self._is_document(pipes.partial[stream]):
+                    # Nothing more to read for now, and what came so far is a whole document missing its newline
+                    self._line(pipes, stream, bytes(pipes.partial[stream]))
+                    pipes.partial[stream].clear()
+                return
 
-                with self._read_lock:
-                    for line in lines:
-                        self.logger.debug(f"Model process #{process.pid} read: {line}")
+            if len(data) == 0:
+                # A line not terminated by a newline is still a line
+                if len(pipes.partial[stream]) > 0:
+                    self._line(pipes, stream, bytes(pipes.partial[stream]))
+                    pipes.partial[stream].clear()
+                self._selector.unregister(pipe)
+                pipes.open.discard(stream)
+                if len(pipes.open) == 0 and pipes.popen.poll() is not None:
+                    self._finish(pipes)
+                return
 
-                        try:
-                            self._read_queue.append(json.loads(line))
-                        except JSONDecodeError:
-                            self.logger.exception(f"Incorrect JSON message received from model #{process.pid} process")
-            except OSError:
-                pass  # the os throws an exception if there is no data
+            # Lines may be split across reads, so only complete lines are passed on
+            buffer = pipes.partial[stream]
+            buffer += data
+            *lines, remainder = buffer.split(b'\n')
+            pipes.partial[stream] = bytearray(remainder)
+            for line in lines:
+                self._line(pipes, stream, bytes(line))
+
+    @staticmethod
+    def _is_document(data: bytearray) -> bool:
+        try:
+            return isinstance(json.loads(data.decode('utf-8')), (dict, list))
+        except (UnicodeDecodeError, JSONDecodeError):
+            return False
+
+    def _line(self, pipes: _Pipes, stream: str, line: bytes):
+        pid = pipes.popen.pid
+        line = line.decode('utf-8', errors='replace').rstrip('\r')
+        if stream == 'stderr':
+            self.logger.info(f"Model process #{pid} output: {line}")
+            return
 
-            # Read from stderr
+        self.logger.debug(f"Model process #{pid} read: {line}")
+        if len(line.strip()) == 0:
+            return
+        try:
+            data = json.loads(line)
+        except JSONDecodeError:
+            self.logger.exception(f"Incorrect JSON message received from model #{pid} process")
+            return
+        try:
+            pipes.process._received(data)
+        except Exception:
+            self.logger.exception(f"Error handling output of model #{pid} process")
+
+    def _queue_write(self, pipes: _Pipes, data: bytes):
+        if not pipes.stdin_open:
+            return
+
+        pipes.pending_write += data
+        if not pipes.writing:
+            self._selector.register(pipes.popen.stdin, selectors.EVENT_WRITE, (pipes, 'stdin'))
+            pipes.writing = True
+
+    def _write(self, pipes: _Pipes):
+        try:
+            written = os.write(pipes.popen.stdin.fileno(), pipes.pending_write)
+            del pipes.pending_write[:written]
+        except BlockingIOError:
+            return
+        except BrokenPipeError:
+            self.logger.exception(f"Model process #{pipes.popen.pid} caused broken pipe, terminating the process")
+            self._finish(pipes, kill=True)
+            return
+
+        if len(pipes.pending_write) == 0:
+            self._selector.unregister(pipes.popen.stdin)
+            pipes.writing = False
+
+    def _finish(self, pipes: _Pipes, kill: bool = False):
+        popen = pipes.popen
+        if kill and popen.poll() is None:
+            popen.kill()
+
+        for stream in list(pipes.open) + (['stdin'] if pipes.writing else []):
+            self._selector.unregister(getattr(popen, stream))
+        for pipe in [popen.stdin, popen.stdout, popen.stderr]:
             try:
-                lines = read(process.stderr.fileno(), 102400).decode('utf-8').splitlines()
-                for line in lines:
-                    self.logger.info(f"Model process #{process.pid} output: {line}")
+                pipe.close()
             except OSError:
-                pass  # the os throws an exception if there is no data
+                pass
+        popen.wait()
 
-            # Write to stdin
-            while True:
-                with self._write_lock:
-                    if len(self._write_queue) == 0:
-                        break
+        del self._pipes[pipes.process]
+        pipes.process._terminated(popen.pid)
 
-                    line = self._write_queue.pop(0)
 
-                self.logger.debug(f"Model process #{process.pid} write: {line}")
+driver = ProcessDriver()
 
-                try:
-                    process.stdin.write((line + '\n').encode('ascii'))
-                    process.stdin.flush()
-                except BrokenPipeError:
-                    self.logger.exception(f"Model process #{process.pid} caused broken pipe, terminating the process")
-                    self._terminate = True
-
-                    break
 
-            time.sleep(0.01)
+class Process:
+    logger = logging.getLogger()
 
-        self.logger.info(f"Process '{self.command_with_arguments}' (pid #{process.pid}) terminated")
+    def __init__(self, command_with_arguments: str, driver: ProcessDriver = driver):
+        assert isinstance(driver, ProcessDriver)
 
-    @staticmethod
-    def _set_nonblock(pipe):
-        flags = fcntl(pipe, F_GETFL)  # get current p.stdout flags
-        fcntl(pipe, F_SETFL, flags | O_NONBLOCK)
+        self.command_with_arguments = command_with_arguments
+        self._driver = driver
+        self._running = False
+        self._read_lock = threading.RLock()
+        self._read_queue = deque()
+        self._on_output = None
 
     @property
     def running(self):
-        return self._thread and \
-               self._thread.is_alive()
+        return self._running
 
     def start(self):
         assert not self.running
 
-        self._terminate = False
-        self._read_queue.clear()
-        self._write_queue.clear()
+        with self._read_lock:
+            self._read_queue.clear()
+
+        try:
+            popen = Popen(self.command_with_arguments.split(' '), stdin=PIPE, stdout=PIPE, stderr=PIPE, shell=False)
+            self.logger.info(f"Process '{self.command_with_arguments}' (pid #{popen.pid}) started")
+        except:
+            self.logger.exception(f"Failed to start process '{self.command_with_arguments}'")
+            return
 
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        self._running = True
+        self._driver.register(self, popen)
 
     def read(self) -> Optional[dict]:
         with self._read_lock:
-            return self._read_queue.pop(0) if len(self._read_queue) > 0 else None
+            return self._read_queue.popleft() if len(self._read_queue) > 0 else None
 
     def write(self, data: dict):
         assert isinstance(data, dict)
 
-        with self._write_lock:
-            self._write_queue.append(json.dumps(data, indent=None))
+        line = json.dumps(data, indent=None)
+        self.logger.debug(f"Model process '{self.command_with_arguments}' write: {line}")
+        if self.running:
+            self._driver.write(self, (line + '\n').encode('ascii'))
 
     def stop(self):
         assert self.running
 
-        self._terminate = True
+        self._driver.kill(self)
+
+    def on_output(self, callback: Optional[Callable[[dict], None]]):
+        """Registers a function called with each document the process outputs, as soon as it arrives.
+
+        The document is still returned by `read`. The function is called from the thread driving all processes,
+        so it must return quickly.
+        """
+        assert callable(callback) or callback is None
+
+        self._on_output = callback
+
+    def _received(self, data: dict):
+        with self._read_lock:
+            self._read_queue.append(data)
+
+        if self._on_output is not None:
+            try:
+                self._on_output(data)
+            except Exception:
+                self.logger.exception(f"Error handling output of process '{self.command_with_arguments}'")
+
+    def _terminated(self, pid: int):
+        self._running = False
+        self.logger.info(f"Process '{self.command_with_arguments}' (pid #{pid}) terminated")
@@ -18,14 +18,19 @@
 import json
 import logging
 import requests
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+from hexbytes import HexBytes
 from web3 import Web3
+from web3.exceptions import BlockNotFound
 
+from auction_keeper.safe_index import SAFEIndex
 from pyflex import Address, Wad
+from pyflex.blocks import block_cache
 from pyflex.deployment import GfDeployment
-from pyflex.gf import CollateralType, SAFE
+from pyflex.gf import CollateralType, SAFE, SAFEEngine
 
 from gql import gql, Client, AIOHTTPTransport
 from retry import retry
@@ -33,15 +38,22 @@ from retry import retry
 class SAFEHistory:
     logger = logging.getLogger()
     cache_lookback = 12  # for handling block reorgs
+    screen_tolerance = 1e-9  # relative; far wider than the float64 rounding error of liquidation keys
+    reorder_threshold = 1/16  # share of safes changed in one refresh above which the order is rebuilt by sorting
 
     def __init__(self, web3: Web3, geb: GfDeployment, collateral_type: CollateralType, from_block: Optional[int],
-                 graph_endpoints: Optional[list], graph_block_threshold=20):
+                 graph_endpoints: Optional[list], graph_block_threshold=20, batch_size=500, parallelism=4,
+                 refresh: str = 'incremental', index: Optional[SAFEIndex] = None):
         assert isinstance(web3, Web3)
         assert isinstance(geb, GfDeployment)
         assert isinstance(collateral_type, CollateralType)
         assert isinstance(from_block, int) or from_block is None
         assert isinstance(graph_endpoints, list) or graph_endpoints is None
         assert isinstance(graph_block_threshold, int)
+        assert isinstance(batch_size, int)
+        assert isinstance(parallelism, int)
+        assert refresh in ['incremental', 'full']
+        assert isinstance(index, SAFEIndex) or index is None
         assert from_block or graph_endpoints
 
         self.web3 = web3
@@ -50,22 +62,98 @@ class SAFEHistory:
         self.from_block = from_block
         self.graph_endpoints = graph_endpoints
         self.graph_block_threshold = graph_block_threshold
+        self.batch_size = batch_size
+        self.parallelism = parallelism
+        self.refresh = refresh
         #used for endpoint failover
         self.graph_endpoint_idx = 0
         self.cache_block = from_block
         self.cache = {}
+        self.index = index
+        self.resumed = False
+        # Safes touched by events of each block in the lookback window, along with the hash of the block
+        self.touched_blocks = {}
+        # Safes with debt, ordered by the ratio of liquidation price to accumulated rate below which they are critical
+        self.liquidation_keys = {}
+        self.ordered_keys = []
+        self.ordered_safes = []
+
+        if index is not None:
+            checkpoint = index.load(self._block_hash_at)
+            if checkpoint is not None:
+                self.cache_block, self.cache = checkpoint
+                self.resumed = True
+                self._update_order(self.cache.keys())
 
     def get_safes(self) -> Dict[Address, SAFE]:
         """Returns a list of safes indexed by address"""
         return self._get_safes(use_graph=self.graph_endpoints is not None)
 
+    def critical_safes(self, collateral_type: CollateralType) -> List[SAFE]:
+        """Returns cached safes which may be critical given the accumulated rate and liquidation price of
+        `collateral_type`, found by bisecting the safes ordered by the price at which they become critical.
+
+        Ordering keys are floating point, and the bisection point is lowered by `screen_tolerance`, so no critical
+        safe is missed but a safe right at the boundary may be returned; `LiquidationEngine.can_liquidate` makes
+        the exact check.
+        """
+        assert isinstance(collateral_type, CollateralType)
+
+        # locked_collateral * liquidation_price < generated_debt * accumulated_rate
+        threshold = float(collateral_type.liquidation_price.value) / float(collateral_type.accumulated_rate.value)
+        start = bisect_right(self.ordered_keys, threshold * (1 - self.screen_tolerance))
+
+        return [self.cache[address] for address in self.ordered_safes[start:]]
+
+    @staticmethod
+    def _liquidation_key(safe: SAFE) -> Optional[float]:
+        if safe.generated_debt.value == 0:
+            return None
+        if safe.locked_collateral.value == 0:
+            return float('inf')
+        return float(safe.generated_debt.value) / float(safe.locked_collateral.value)
+
+    def _update_order(self, addresses):
+        """Moves safes whose cached state changed to their new place in the liquidation order"""
+        if len(addresses) > len(self.ordered_keys) * self.reorder_threshold:
+            self.liquidation_keys = {address: self._liquidation_key(safe) for address, safe in self.cache.items()}
+            ordered = sorted((key, address) for address, key in self.liquidation_keys.items() if key is not None)
+            self.ordered_keys = [key for key, _ in ordered]
+            self.ordered_safes = [address for _, address in ordered]
+            return
+
+        for address in addresses:
+            key = self.liquidation_keys.get(address)
+            if key is not None:
+                i = bisect_left(self.ordered_keys, key)
+                while self.ordered_safes[i] != address:
+                    i += 1
+                del self.ordered_keys[i]
+                del self.ordered_safes[i]
+
+            key = self._liquidation_key(self.cache[address])
+            self.liquidation_keys[address] = key
+            if key is not None:
+                i = bisect_right(self.ordered_keys, key)
+                self.ordered_keys.insert(i, key)
+                self.ordered_safes.insert(i, address)
+
     def _get_safes(self, use_graph: bool = True) -> Dict[Address, SAFE]:
+        """Brings the cache up to date with the current block.
+
+        In `incremental` mode, state carried by node events is applied to the cache directly, and only safes whose
+        state the events do not carry (confiscations, graph results) are read from the chain.  In `full` mode, every
+        known safe is read from the chain on each call.
+        """
         start = datetime.now()
         safe_addresses = set()
         mods = []
+        # Events from a reorg shorter than the lookback may have been indexed before the keeper stopped
+        read_all = self.refresh == 'full' or self.resumed
+        updated = set()
 
         from_block = max(0, self.cache_block - self.cache_lookback)
-        to_block = self.web3.eth.blockNumber
+        to_block = block_cache(self.web3).block_number()
         # If graph is enabled and last block is old enough, use graph. Otherwise, use node.
         if use_graph and to_block - from_block > self.graph_block_threshold:
             fetched_graph = False
@@ -82,36 +170,120 @@ class SAFEHistory:
                     # Try another graph endpoint
                     self.graph_endpoint_idx += 1
                     # update latest block
-                    to_block = self.web3.eth.blockNumber
+                    to_block = block_cache(self.web3).block_number()
             if not fetched_graph:
                 self.logger.warn(f"Unable to fetch graph data from any graph endpoints {self.graph_endpoints}")
                 # If all endpoints have been tried, start from beginning next time
                 if self.graph_endpoint_idx == len(self.graph_endpoints):
                     self.graph_endpoint_idx = 0
+                # Without graph results, the only way to keep known safes current is to read them all
+                read_all = True
 
             self.logger.debug(f"Retrieved {len(mods)} past safe mods from graph")
 
+            for mod in mods:
+                safe_addresses.add(mod.safe)
+
+        elif self.refresh == 'incremental':
+            reorged = self._reorged_safes()
+            events = self.geb.safe_engine.past_safe_events(from_block=from_block, to_block=to_block,
+                                                           collateral_type=self.collateral_type)
+            self.logger.debug(f"Retrieved {len(events)} past safe events from node")
+            updated, safe_addresses = self._apply_events(events)
+            # Events of the replaced blocks may have left state which is no longer on the chain
+            safe_addresses |= reorged
+
         else:
             mods = self.geb.safe_engine.past_safe_modifications(from_block=from_block, to_block=to_block,
                                                                 collateral_type=self.collateral_type)
             self.logger.debug(f"Retrieved {len(mods)} past safe mods from node")
+            for mod in mods:
+                safe_addresses.add(mod.safe)
 
-        for mod in mods:
-            safe_addresses.add(mod.safe)
-
-        # Update state of already-cached safes
-        for address, safe in self.cache.items():
-            self.cache[address] = self.geb.safe_engine.safe(self.collateral_type, address)
-
-        # Cache state of newly discovered safes
-        for address in safe_addresses:
-            if address not in self.cache:
-                self.cache[address] = self.geb.safe_engine.safe(self.collateral_type, address)
+        if read_all:
+            # Update state of already-cached safes and cache state of newly discovered safes
+            addresses = list(self.cache.keys() | safe_addresses)
+        else:
+            # Read only safes whose state could not be taken from the events
+            addresses = list(safe_addresses)
+        for safe in self.geb.safe_engine.safes_batch(self.collateral_type, addresses,
+                                                     batch_size=self.batch_size, parallelism=self.parallelism):
+            self.cache[safe.address] = safe
+            updated.add(safe.address)
 
         self.logger.debug(f"Updated {len(self.cache)} safes in {(datetime.now()-start).seconds} seconds")
         self.cache_block = to_block
+        self.resumed = False
+        for number in [number for number in self.touched_blocks if number < to_block - self.cache_lookback]:
+            del self.touched_blocks[number]
+        self._update_order(updated)
+
+        if self.index is not None:
+            anchor_block = max(0, to_block - self.cache_lookback)
+            self.index.save(to_block, anchor_block, self._block_hash_at(anchor_block),
+                            [self.cache[address] for address in updated])
         return self.cache
 
+    def _block_hash_at(self, block_number: int) -> Optional[str]:
+        try:
+            return block_cache(self.web3).get_block(block_number)['hash'].hex()
+        except BlockNotFound:
+            return None
+
+    def _reorged_safes(self) -> set:
+        """Returns addresses of safes touched by events of blocks which have since been replaced by a reorg.
+
+        The block cache drops headers replaced by a reorg as soon as the block watcher observes the new head,
+        so a different hash for a block number means the events read from it earlier are gone.
+        """
+        reorged = set()
+        for number, (block_hash, addresses) in list(self.touched_blocks.items()):
+            try:
+                current_hash = HexBytes(block_cache(self.web3).get_block(number)['hash'])
+            except BlockNotFound:
+                current_hash = None
+            if current_hash != block_hash:
+                self.logger.info(f"Block #{number} was replaced by a reorg; reading {len(addresses)} safes again")
+                reorged |= addresses
+                del self.touched_blocks[number]
+        return reorged
+
+    def _touch(self, event, addresses: list):
+        number = event.raw['blockNumber']
+        block_hash = HexBytes(event.raw['blockHash'])
+        touched = self.touched_blocks.get(number)
+        if touched is None or touched[0] != block_hash:
+            touched = self.touched_blocks[number] = (block_hash, set())
+        touched[1].update(addresses)
+
+    def _apply_events(self, events: list) -> Tuple[set, set]:
+        """Applies safe state from events to the cache, returning addresses of safes which were updated and of safes
+        which must be read instead"""
+        updated = set()
+        stale = set()
+        for event in events:
+            if isinstance(event, SAFEEngine.LogTransferSAFECollateralAndDebt):
+                self._touch(event, [event.src, event.dst])
+            else:
+                self._touch(event, [event.safe])
+            if isinstance(event, SAFEEngine.LogModifySAFECollateralization):
+                self.cache[event.safe] = SAFE(event.safe, self.collateral_type,
+                                              event.locked_collateral, event.generated_debt)
+                updated.add(event.safe)
+                stale.discard(event.safe)
+            elif isinstance(event, SAFEEngine.LogTransferSAFECollateralAndDebt):
+                self.cache[event.src] = SAFE(event.src, self.collateral_type,
+                                             event.src_locked_collateral, event.src_generated_debt)
+                self.cache[event.dst] = SAFE(event.dst, self.collateral_type,
+                                             event.dst_locked_collateral, event.dst_generated_debt)
+                updated.update([event.src, event.dst])
+                stale.discard(event.src)
+                stale.discard(event.dst)
+            elif isinstance(event, SAFEEngine.LogConfiscateSAFECollateralAndDebt):
+                # Confiscations only carry deltas, which cannot be replayed safely over the reorg lookback
+                stale.add(event.safe)
+        return updated, stale
+
     @retry(exceptions=Exception, tries=10, delay=0, max_delay=None, backoff=1, jitter=0)
     def fetch_safe_mods(self, graph_endpoint, from_block, to_block, page_size=1000):
 
@@ -152,7 +324,7 @@ class SAFEHistory:
 
     def get_past_safe_mods_from_graph(self, endpoint, from_block:int, to_block: int, collateral_type: CollateralType = None):
         Mod = namedtuple("Mod", "safe")
-        current_block = self.web3.eth.blockNumber
+        current_block = block_cache(self.web3).block_number()
         assert isinstance(from_block, int)
         assert from_block < current_block
         if to_block is None:
@@ -0,0 +1,113 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from pyflex import Address, Wad
+from pyflex.gf import CollateralType, SAFE
+
+
+class SAFEIndex:
+    """SQLite store of SAFE state for one collateral type, checkpointed at the last processed block.
+
+    The index is tied to a chain, a `SAFEEngine` and a collateral type; an index written for anything else, or whose
+    checkpoint is not on the current chain, is discarded rather than resumed from.
+    """
+    logger = logging.getLogger()
+    schema_version = 1
+
+    def __init__(self, path: str, chain_id: int, safe_engine: Address, collateral_type: CollateralType):
+        assert isinstance(path, str)
+        assert isinstance(chain_id, int)
+        assert isinstance(safe_engine, Address)
+        assert isinstance(collateral_type, CollateralType)
+
+        self.path = path
+        self.collateral_type = collateral_type
+        self.identity = {'schema_version': str(self.schema_version),
+                         'chain_id': str(chain_id),
+                         'safe_engine': safe_engine.address.lower(),
+                         'collateral_type': collateral_type.name}
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS safes (address TEXT PRIMARY KEY, "
+                                    "locked_collateral TEXT NOT NULL, generated_debt TEXT NOT NULL)")
+
+    def load(self, block_hash_at: callable) -> Optional[Tuple[int, Dict[Address, SAFE]]]:
+        """Returns the checkpoint block and indexed safes, or `None` if there is no usable index.
+
+        Args:
+            block_hash_at: Returns the hash of a block number on the current chain, or `None` if there is no such block.
+        """
+        assert callable(block_hash_at)
+
+        meta = dict(self.connection.execute("SELECT key, value FROM meta").fetchall())
+        if 'block_number' not in meta:
+            self.logger.info(f"SAFE index {self.path} is empty")
+            return None
+
+        for key, value in self.identity.items():
+            if meta.get(key) != value:
+                self.logger.warning(f"Discarding SAFE index {self.path}: {key} is {meta.get(key)}, expected {value}")
+                self.clear()
+                return None
+
+        block_number = int(meta['block_number'])
+        anchor_block = int(meta['anchor_block'])
+        if block_hash_at(anchor_block) != meta['anchor_hash']:
+            self.logger.warning(f"Discarding SAFE index {self.path}: block {anchor_block} is no longer on chain")
+            self.clear()
+            return None
+
+        safes = {}
+        for address, locked_collateral, generated_debt in self.connection.execute("SELECT * FROM safes"):
+            safe = SAFE(Address(address), self.collateral_type, Wad(int(locked_collateral)), Wad(int(generated_debt)))
+            safes[safe.address] = safe
+
+        self.logger.info(f"Loaded {len(safes)} safes from SAFE index {self.path} at block {block_number}")
+        return block_number, safes
+
+    def save(self, block_number: int, anchor_block: int, anchor_hash: str, safes: List[SAFE]):
+        """Stores `safes` and moves the checkpoint to `block_number` in a single transaction.
+
+        Args:
+            block_number: Last block the safes were brought up to date with.
+            anchor_block: Block far enough behind `block_number` that replaying from it covers any reorg.
+            anchor_hash: Hash of `anchor_block`, used to verify the index still belongs to the chain when loading.
+            safes: Safes which changed since the previous checkpoint.
+        """
+        assert isinstance(block_number, int)
+        assert isinstance(anchor_block, int)
+        assert isinstance(anchor_hash, str)
+        assert isinstance(safes, list)
+
+        meta = dict(self.identity, block_number=str(block_number), anchor_block=str(anchor_block),
+                    anchor_hash=anchor_hash)
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO safes VALUES (?, ?, ?)",
+                                        [(safe.address.address, str(safe.locked_collateral.value),
+                                          str(safe.generated_debt.value)) for safe in safes])
+            self.connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM safes")
+            self.connection.execute("DELETE FROM meta")
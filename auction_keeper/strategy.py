@@ -16,7 +16,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Optional, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
 from web3 import Web3
 
 from auction_keeper.model import Status
@@ -25,13 +26,46 @@ from pyflex.approval import directly, approve_safe_modification_directly
 from pyflex.auctions import AuctionContract, PreSettlementSurplusAuctionHouse, DebtAuctionHouse
 from pyflex.auctions import StakedTokenAuctionHouse
 from pyflex.auctions import FixedDiscountCollateralAuctionHouse, IncreasingDiscountCollateralAuctionHouse
+from pyflex.blocks import block_cache
 from pyflex.gas import GasPrice
 from pyflex.numeric import Wad, Ray, Rad
 from pyflex.deployment import GfDeployment
 
 
 def block_time(web3: Web3):
-    return web3.eth.getBlock('latest')['timestamp']
+    return block_cache(web3).block_time()
+
+def _from(address: Optional[Address]) -> dict:
+    # Transaction keyword arguments sending from `address`, or from the default account
+    return {'from_address': address} if address is not None else {}
+
+class AuctionSnapshot:
+    """State of auctions and related values read at one block, shared by everything handling auctions in that block"""
+    def __init__(self, block):
+        self.block_number = block['number']
+        self.block_hash = block['hash']
+        self.block_time = block['timestamp']
+        self.bids = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def value(self, name: str, read: callable):
+        """Returns a value read once per block, such as the redemption price or our balance"""
+        assert isinstance(name, str)
+        assert callable(read)
+
+        with self._lock:
+            if name in self._values:
+                return self._values[name]
+        value = read()
+        with self._lock:
+            return self._values.setdefault(name, value)
+
+    def forget(self, name: str):
+        """Drops a value known to have changed within the block, such as our balance after a rebalance"""
+        with self._lock:
+            self._values.pop(name, None)
+
 
 class Strategy:
     logger = logging.getLogger()
@@ -39,11 +73,49 @@ class Strategy:
     def __init__(self, contract: AuctionContract):
         assert isinstance(contract, AuctionContract)
         self.contract = contract
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
 
-    def approve(self, gas_price: GasPrice):
+    def approve(self, gas_price: GasPrice, from_address: Optional[Address] = None):
+        """Approves the auction house to move funds of `from_address`, or of the default account"""
         raise NotImplementedError
 
-    def get_input(self, id: int):
+    def get_input(self, id: int) -> Status:
+        assert isinstance(id, int)
+
+        return self.get_inputs([id])[id]
+
+    def get_inputs(self, ids: List[int]) -> Dict[int, Status]:
+        """Reads the state of several auctions from the same block, batching the `bids` calls"""
+        assert isinstance(ids, list)
+        if len(ids) == 0:
+            return {}
+
+        snapshot = self.snapshot(ids)
+        redemption_price = snapshot.value('redemption_price', self._redemption_price)
+
+        return {id: self._status(snapshot.bids[id], snapshot.block_time, redemption_price) for id in ids}
+
+    def snapshot(self, ids: List[int]) -> AuctionSnapshot:
+        """Returns the snapshot of the latest block, after reading any of `ids` which it does not hold yet"""
+        assert isinstance(ids, list)
+
+        block = block_cache(self.contract.web3).get_block('latest')
+        with self._snapshot_lock:
+            if self._snapshot is None or self._snapshot.block_hash != block['hash']:
+                self._snapshot = AuctionSnapshot(block)
+            snapshot = self._snapshot
+            missing = [id for id in ids if id not in snapshot.bids]
+
+        if len(missing) > 0:
+            for bid in self.contract.bids_batch(missing, block_identifier=snapshot.block_number):
+                snapshot.bids[bid.id] = bid
+        return snapshot
+
+    def _redemption_price(self) -> Optional[Ray]:
+        return None
+
+    def _status(self, bid, block_time: int, redemption_price: Optional[Ray]) -> Status:
         raise NotImplementedError
 
     def settle_auction(self, id: int) -> Transact:
@@ -68,22 +140,18 @@ class FixedDiscountCollateralAuctionStrategy(Strategy):
         self.our_address = our_address
         #self.last_redemption_price = Wad(0)
 
-    def approve(self, gas_price: GasPrice):
+    def approve(self, gas_price: GasPrice, from_address: Optional[Address] = None):
         assert isinstance(gas_price, GasPrice)
         #self.collateral_auction_house.approve(self.collateral_auction_house.safe_engine(), approve_safe_modification_directly(gas_price=gas_price))
-        self.collateral_auction_house.approve(self.collateral_auction_house.safe_engine(), approve_safe_modification_directly())
+        self.collateral_auction_house.approve(self.collateral_auction_house.safe_engine(),
+                                              approve_safe_modification_directly(**_from(from_address)))
 
     def auctions_started(self) -> int:
         return self.collateral_auction_house.auctions_started()
 
-    def get_input(self, id: int) -> Status:
-        assert isinstance(id, int)
-
-        # Read auction state
-        bid = self.collateral_auction_house.bids(id)
-
+    def _status(self, bid: FixedDiscountCollateralAuctionHouse.Bid, block_time: int, redemption_price: Optional[Ray]) -> Status:
         # Prepare the model input from auction state
-        return Status(id=id,
+        return Status(id=bid.id,
                       collateral_auction_house=self.collateral_auction_house.address,
                       surplus_auction_house=None,
                       debt_auction_house=None,
@@ -96,15 +164,20 @@ class FixedDiscountCollateralAuctionStrategy(Strategy):
                       bid_increase=None,
                       bid_decrease=None,
                       high_bidder=None,
-                      block_time=block_time(self.collateral_auction_house.web3),
+                      block_time=block_time,
                       bid_expiry=None,
                       auction_deadline=bid.auction_deadline,
                       price=None)
 
-    def bid(self, id: int) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
+    def bid(self, id: int, bid=None, bidder: Optional[Address] = None) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
         assert isinstance(id, int)
+        assert isinstance(bidder, Address) or bidder is None
+
+        bidder = bidder if bidder is not None else self.our_address
 
-        bid = self.collateral_auction_house.bids(id)
+        snapshot = self.snapshot([id])
+        if bid is None:
+            bid = snapshot.bids[id]
         remaining_to_raise = bid.amount_to_raise - bid.raised_amount
         remaining_to_sell = bid.amount_to_sell - bid.sold_amount
 
@@ -113,8 +186,8 @@ class FixedDiscountCollateralAuctionStrategy(Strategy):
             return None, None, None
 
         # Always bid our entire balance.  If auction amount_to_raise is less, FixedDiscountCollateralAuctionHouse will reduce it.
-        our_bid = Wad(self.geb.safe_engine.coin_balance(self.our_address)) 
-        if our_bid <= self.collateral_auction_house.minimum_bid():
+        our_bid = Wad(snapshot.value(f'coin_balance {bidder}', lambda: self.geb.safe_engine.coin_balance(bidder)))
+        if our_bid <= snapshot.value('minimum_bid', self.collateral_auction_house.minimum_bid):
             self.logger.info(f"Our system coin balance is less than FixedDiscountCollateralAuctionHouse.minimum_bid(). Not bidding")
             return None, None, None
 
@@ -142,21 +215,17 @@ class IncreasingDiscountCollateralAuctionStrategy(Strategy):
         self.geb = geb
         self.our_address = our_address
 
-    def approve(self, gas_price: GasPrice):
+    def approve(self, gas_price: GasPrice, from_address: Optional[Address] = None):
         assert isinstance(gas_price, GasPrice)
-        self.collateral_auction_house.approve(self.collateral_auction_house.safe_engine(), approve_safe_modification_directly())
+        self.collateral_auction_house.approve(self.collateral_auction_house.safe_engine(),
+                                              approve_safe_modification_directly(**_from(from_address)))
 
     def auctions_started(self) -> int:
         return self.collateral_auction_house.auctions_started()
 
-    def get_input(self, id: int) -> Status:
-        assert isinstance(id, int)
-
-        # Read auction state
-        bid = self.collateral_auction_house.bids(id)
-
+    def _status(self, bid: IncreasingDiscountCollateralAuctionHouse.Bid, block_time: int, redemption_price: Optional[Ray]) -> Status:
         # Prepare the model input from auction state
-        return Status(id=id,
+        return Status(id=bid.id,
                       collateral_auction_house=self.collateral_auction_house.address,
                       surplus_auction_house=None,
                       debt_auction_house=None,
@@ -167,15 +236,20 @@ class IncreasingDiscountCollateralAuctionStrategy(Strategy):
                       bid_increase=None,
                       bid_decrease=None,
                       high_bidder=None,
-                      block_time=block_time(self.collateral_auction_house.web3),
+                      block_time=block_time,
                       bid_expiry=None,
                       auction_deadline=-1,
                       price=None)
 
-    def bid(self, id: int) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
+    def bid(self, id: int, bid=None, bidder: Optional[Address] = None) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
         assert isinstance(id, int)
+        assert isinstance(bidder, Address) or bidder is None
+
+        bidder = bidder if bidder is not None else self.our_address
 
-        bid = self.collateral_auction_house.bids(id)
+        snapshot = self.snapshot([id])
+        if bid is None:
+            bid = snapshot.bids[id]
         #remaining_to_raise = bid.amount_to_raise - bid.raised_amount
         #remaining_to_sell = bid.amount_to_sell - bid.sold_amount
 
@@ -189,10 +263,9 @@ class IncreasingDiscountCollateralAuctionStrategy(Strategy):
             return None, None, None
 
         # Always bid our entire balance.  If auction amount_to_raise is less, IncreasingDiscountCollateralAuctionHouse will reduce it.
-        our_bid = Wad(self.geb.safe_engine.coin_balance(self.our_address)) 
+        our_bid = Wad(snapshot.value(f'coin_balance {bidder}', lambda: self.geb.safe_engine.coin_balance(bidder)))
         #our_bid = Wad(bid.amount_to_raise) + Wad(1)
-        print(our_bid, self.collateral_auction_house.minimum_bid())
-        if our_bid <= self.collateral_auction_house.minimum_bid():
+        if our_bid <= snapshot.value('minimum_bid', self.collateral_auction_house.minimum_bid):
             self.logger.info(f"Our system coin balance is less than IncreasingDiscountCollateralAuctionHouse.minimum_bid(). Not bidding")
             return None, None, None
 
@@ -217,23 +290,18 @@ class SurplusAuctionStrategy(Strategy):
         self.prot = prot
         self.geb = geb
 
-    def approve(self, gas_price: GasPrice):
-        self.surplus_auction_house.approve(self.prot, directly(gas_price=gas_price))
+    def approve(self, gas_price: GasPrice, from_address: Optional[Address] = None):
+        self.surplus_auction_house.approve(self.prot, directly(gas_price=gas_price, **_from(from_address)))
 
     def auctions_started(self) -> int:
         return self.surplus_auction_house.auctions_started()
 
-    def get_input(self, id: int) -> Status:
-        assert isinstance(id, int)
-
-        # Read auction state
-        bid = self.surplus_auction_house.bids(id)
-
-        # get latest redemption price
-        redemption_price = self.geb.oracle_relayer.redemption_price()
+    def _redemption_price(self) -> Optional[Ray]:
+        return self.geb.oracle_relayer.redemption_price()
 
+    def _status(self, bid: PreSettlementSurplusAuctionHouse.Bid, block_time: int, redemption_price: Optional[Ray]) -> Status:
         # Prepare the model input from auction state
-        return Status(id=id,
+        return Status(id=bid.id,
                       collateral_auction_house=None,
                       surplus_auction_house=self.surplus_auction_house.address,
                       debt_auction_house=None,
@@ -246,17 +314,19 @@ class SurplusAuctionStrategy(Strategy):
                       bid_increase=self.bid_increase,
                       bid_decrease=None,
                       high_bidder=bid.high_bidder,
-                      block_time=block_time(self.surplus_auction_house.web3),
+                      block_time=block_time,
                       bid_expiry=bid.bid_expiry,
                       auction_deadline=bid.auction_deadline,
                       price=Wad(bid.amount_to_sell * Rad(redemption_price) / Rad(bid.bid_amount)) if bid.bid_amount > Wad.from_number(0.000001) else None)
 
-    def bid(self, id: int, price: Wad) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
+    def bid(self, id: int, price: Wad, bid=None) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
         assert isinstance(id, int)
         assert isinstance(price, Wad)
 
-        bid = self.surplus_auction_house.bids(id)
-        redemption_price = self.geb.oracle_relayer.redemption_price()
+        snapshot = self.snapshot([id])
+        if bid is None:
+            bid = snapshot.bids[id]
+        redemption_price = snapshot.value('redemption_price', self._redemption_price)
         our_bid = bid.amount_to_sell * Rad(redemption_price) / Rad(price)
 
         if our_bid >= Rad(bid.bid_amount) * Rad(self.bid_increase) and our_bid > Rad(bid.bid_amount):
@@ -275,23 +345,19 @@ class DebtAuctionStrategy(Strategy):
         self.bid_decrease = debt_auction_house.bid_decrease()
         self.geb = geb
 
-    def approve(self, gas_price: GasPrice):
-        self.debt_auction_house.approve(self.debt_auction_house.safe_engine(), approve_safe_modification_directly(gas_price=gas_price))
+    def approve(self, gas_price: GasPrice, from_address: Optional[Address] = None):
+        self.debt_auction_house.approve(self.debt_auction_house.safe_engine(),
+                                        approve_safe_modification_directly(gas_price=gas_price, **_from(from_address)))
 
     def auctions_started(self) -> int:
         return self.debt_auction_house.auctions_started()
 
-    def get_input(self, id: int) -> Status:
-        assert isinstance(id, int)
-
-        # Read auction state
-        bid = self.debt_auction_house.bids(id)
-
-        # get latest redemption price
-        redemption_price = self.geb.oracle_relayer.redemption_price()
+    def _redemption_price(self) -> Optional[Ray]:
+        return self.geb.oracle_relayer.redemption_price()
 
+    def _status(self, bid: DebtAuctionHouse.Bid, block_time: int, redemption_price: Optional[Ray]) -> Status:
         # Prepare the model input from auction state
-        return Status(id=id,
+        return Status(id=bid.id,
                       collateral_auction_house=None,
                       surplus_auction_house=None,
                       debt_auction_house=self.debt_auction_house.address,
@@ -304,17 +370,19 @@ class DebtAuctionStrategy(Strategy):
                       bid_increase=None,
                       bid_decrease=self.bid_decrease,
                       high_bidder=bid.high_bidder,
-                      block_time=block_time(self.debt_auction_house.web3),
+                      block_time=block_time,
                       bid_expiry=bid.bid_expiry,
                       auction_deadline=bid.auction_deadline,
                       price=Wad(bid.bid_amount * Rad(redemption_price) / Rad(bid.amount_to_sell)) if Wad(bid.bid_amount) != Wad(0) else None)
 
-    def bid(self, id: int, price: Wad) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
+    def bid(self, id: int, price: Wad, bid=None) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
         assert isinstance(id, int)
         assert isinstance(price, Wad)
 
-        bid = self.debt_auction_house.bids(id)
-        redemption_price = self.geb.oracle_relayer.redemption_price()
+        snapshot = self.snapshot([id])
+        if bid is None:
+            bid = snapshot.bids[id]
+        redemption_price = snapshot.value('redemption_price', self._redemption_price)
         our_amount = bid.bid_amount * redemption_price / Rad(price)
 
         if Ray(our_amount) * self.bid_decrease <= Ray(bid.amount_to_sell) and our_amount < Rad(bid.amount_to_sell):
@@ -332,23 +400,19 @@ class StakedTokenAuctionStrategy(Strategy):
         self.bid_increase = staked_token_auction_house.bid_increase()
         self.geb = geb
 
-    def approve(self, gas_price: GasPrice):
-        self.staked_token_auction_house.approve(self.staked_token_auction_house.safe_engine(), approve_safe_modification_directly(gas_price=gas_price))
+    def approve(self, gas_price: GasPrice, from_address: Optional[Address] = None):
+        self.staked_token_auction_house.approve(self.staked_token_auction_house.safe_engine(),
+                                                approve_safe_modification_directly(gas_price=gas_price, **_from(from_address)))
 
     def auctions_started(self) -> int:
         return self.staked_token_auction_house.auctions_started()
 
-    def get_input(self, id: int) -> Status:
-        assert isinstance(id, int)
-
-        # Read auction state
-        bid = self.staked_token_auction_house.bids(id)
-
-        # get latest redemption price
-        redemption_price = self.geb.oracle_relayer.redemption_price()
+    def _redemption_price(self) -> Optional[Ray]:
+        return self.geb.oracle_relayer.redemption_price()
 
+    def _status(self, bid: StakedTokenAuctionHouse.Bid, block_time: int, redemption_price: Optional[Ray]) -> Status:
         # Prepare the model input from auction state
-        return Status(id=id,
+        return Status(id=bid.id,
                       collateral_auction_house=None,
                       surplus_auction_house=None,
                       debt_auction_house=None,
@@ -361,17 +425,19 @@ class StakedTokenAuctionStrategy(Strategy):
                       bid_increase=self.bid_increase,
                       bid_decrease=None,
                       high_bidder=bid.high_bidder,
-                      block_time=block_time(self.staked_token_auction_house.web3),
+                      block_time=block_time,
                       bid_expiry=bid.bid_expiry,
                       auction_deadline=bid.auction_deadline,
                       price=Wad(bid.bid_amount * Rad(redemption_price) / Rad(bid.amount_to_sell)) if Rad(bid.amount_to_sell) != Rad(0) else None)
 
-    def bid(self, id: int, price: Wad) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
+    def bid(self, id: int, price: Wad, bid=None) -> Tuple[Optional[Wad], Optional[Transact], Optional[Rad]]:
         assert isinstance(id, int)
         assert isinstance(price, Wad)
 
-        bid = self.staked_token_auction_house.bids(id)
-        redemption_price = self.geb.oracle_relayer.redemption_price()
+        snapshot = self.snapshot([id])
+        if bid is None:
+            bid = snapshot.bids[id]
+        redemption_price = snapshot.value('redemption_price', self._redemption_price)
 
         our_bid = Rad(price) * Rad(bid.amount_to_sell) / Rad(redemption_price)
 
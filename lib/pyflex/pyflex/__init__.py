@@ -24,7 +24,6 @@ import requests
 import time
 from enum import Enum, auto
 from functools import total_ordering, wraps
-from threading import Lock
 from typing import Optional
 from weakref import WeakKeyDictionary
 
@@ -33,22 +32,23 @@ import pkg_resources
 from hexbytes import HexBytes
 
 from web3 import HTTPProvider, Web3
+from web3._utils.abi import get_abi_output_types
 from web3._utils.contracts import get_function_info, encode_abi
 from web3._utils.events import get_event_data
+from web3._utils.request import make_post_request
 from web3.exceptions import TransactionNotFound
 
 from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 from eth_abi import decode_single
 
-from pyflex.gas import DefaultGasPrice, GasPrice
+from pyflex.gas import DefaultGasPrice, GasLimits, GasPrice
 from pyflex.numeric import Wad
-from pyflex.util import synchronize, bytes_to_hexstring, is_contract_at
+from pyflex.util import run_blocking, synchronize, bytes_to_hexstring, is_contract_at
+from pyflex.tracker import nonce_manager, transaction_tracker
 
 filter_threads = []
 nonce_calc = WeakKeyDictionary()
-next_nonce = {}
-transaction_lock = Lock()
 logger = logging.getLogger()
 
 def web3_via_http(endpoint_uri: str, timeout=60, http_pool_size=20):
@@ -90,6 +90,12 @@ def _get_nonce_calc(web3: Web3) -> NonceCalculation:
         logger.debug(f"node clientVersion={web3.clientVersion}, will use {nonce_calc[web3]}")
     return nonce_calc[web3]
 
+def _get_next_nonce(web3: Web3, account: str) -> int:
+    """Reads the next nonce of `account` from the node, including transactions waiting in its mempool"""
+    if _get_nonce_calc(web3) in (NonceCalculation.PARITY_NEXTNONCE, NonceCalculation.PARITY_SERIAL):
+        return int(web3.manager.request_blocking("parity_nextNonce", [account]), 16)
+    return web3.eth.getTransactionCount(account, block_identifier='pending')
+
 def register_filter_thread(filter_thread):
     filter_threads.append(filter_thread)
 
@@ -130,6 +136,9 @@ def _track_status(f):
             return await f(*args, **kwds)
         finally:
             args[0].status = TransactStatus.FINISHED
+            if args[0].nonce_account is not None:
+                nonce_manager(args[0].web3).release(args[0].nonce_account, args[0].nonce)
+            transaction_tracker(args[0].web3).forget(list(args[0].tx_hashes))
 
     return wrapper
 
@@ -202,6 +211,70 @@ class Contract:
 
         return web3.eth.contract(abi=abi)(address=address.address)
 
+    def _batch_call(self, contract, function_name: str, args_list: list, block_identifier='latest',
+                    batch_size=100) -> list:
+        """Calls a constant function once for each set of arguments in `args_list`.
+
+        Calls are sent as JSON-RPC batches of `batch_size` when using an HTTP provider which accepts them, and
+        one at a time otherwise.
+
+        Returns:
+            Decoded results in the same order as `args_list`, shaped as `contract.functions.<name>().call()` would.
+        """
+        assert(isinstance(function_name, str))
+        assert(isinstance(args_list, list))
+        assert(isinstance(batch_size, int))
+        assert(batch_size > 0)
+
+        web3 = contract.web3
+        fn_abi = next(member for member in contract.abi
+                      if member.get('type') == 'function' and member.get('name') == function_name)
+        output_types = get_abi_output_types(fn_abi)
+        if isinstance(block_identifier, int):
+            block_identifier = hex(block_identifier)
+
+        def decode(data) -> list:
+            result = web3.codec.decode_abi(output_types, HexBytes(data))
+            return result[0] if len(output_types) == 1 else list(result)
+
+        def call_one_by_one(calls: list) -> list:
+            return [decode(web3.eth.call(call, block_identifier)) for call in calls]
+
+        def call_batch(calls: list) -> Optional[list]:
+            provider = web3.manager.provider
+            if not isinstance(provider, HTTPProvider):
+                return None
+
+            payload = [{'jsonrpc': '2.0', 'method': 'eth_call', 'params': [call, block_identifier], 'id': index}
+                       for index, call in enumerate(calls)]
+            response = json.loads(make_post_request(provider.endpoint_uri, json.dumps(payload).encode('utf-8'),
+                                                    **dict(provider.get_request_kwargs())))
+            if not isinstance(response, list):
+                self.logger.debug(f"Node rejected JSON-RPC batch: {response}")
+                return None
+
+            # Responses may come in any order; calls the node failed or left out are made again on their own,
+            # so they either succeed or raise the node's own error
+            results = {item.get('id'): item for item in response}
+            failed = [index for index in range(len(calls)) if 'result' not in results.get(index, {})]
+            if len(failed) > 0:
+                self.logger.debug(f"Batched call of {function_name} failed for {len(failed)} of {len(calls)} calls: "
+                                  f"{[item.get('error') for item in response if 'error' in item]}")
+            retried = dict(zip(failed, call_one_by_one([calls[index] for index in failed])))
+
+            return [retried[index] if index in retried else decode(results[index]['result'])
+                    for index in range(len(calls))]
+
+        calls = [{'to': contract.address, 'data': contract.encodeABI(fn_name=function_name, args=args)}
+                 for args in args_list]
+        retval = []
+        for start in range(0, len(calls), batch_size):
+            chunk = calls[start:start+batch_size]
+            results = call_batch(chunk)
+            retval.extend(results if results is not None else call_one_by_one(chunk))
+
+        return retval
+
     def _past_events(self, contract, event, cls, number_of_past_blocks, event_filter) -> list:
         block_number = contract.web3.eth.blockNumber
         return self._past_events_in_block_range(contract, event, cls, max(block_number-number_of_past_blocks, 0),
@@ -417,6 +490,7 @@ class Transact:
 
     logger = logging.getLogger()
     gas_estimate_for_bad_txs = None
+    gas_limits = GasLimits()
 
     def __init__(self,
                  origin: Optional[object],
@@ -450,15 +524,16 @@ class Transact:
         self.initial_time = None
         self.status = TransactStatus.NEW
         self.nonce = None
+        self.nonce_account = None
         self.replaced = False
         self.gas_price = None
         self.gas_price_last = 0
         self.tx_hashes = []
 
 
-    def _get_receipt(self, transaction_hash: str) -> Optional[Receipt]:
+    def _get_receipt(self, transaction_hash: str, refresh: bool = False) -> Optional[Receipt]:
         try:
-            raw_receipt = self.web3.eth.getTransactionReceipt(transaction_hash)
+            raw_receipt = transaction_tracker(self.web3).receipt(transaction_hash, refresh)
 
             if raw_receipt is not None and raw_receipt['blockNumber'] is not None:
                 receipt = Receipt(raw_receipt)
@@ -506,6 +581,17 @@ class Transact:
         else:
             return self.web3.eth.sendTransaction({**transaction_params, **{'to': self.address.address}})
 
+    def _gas_key(self) -> Optional[tuple]:
+        # Gas limits are learned for each contract function, told apart by address and selector
+        if self.contract is None:
+            return None
+        try:
+            data = self.parameters[0] if self.function_name is None else self._contract_function()._encode_transaction_data()
+        except Exception:
+            # Leave reporting bad calls to gas estimation
+            return None
+        return self.address, (data if isinstance(data, str) else bytes_to_hexstring(data))[:10]
+
     def _contract_function(self):
         if '(' in self.function_name:
             function_factory = self.contract.get_function_by_signature(self.function_name)
@@ -535,6 +621,26 @@ class Transact:
 
         return name if self.extra is None else name + f" with {self.extra}"
 
+    def call(self, from_address: Address, block_identifier='latest'):
+        """Simulates this Ethereum transaction with `eth_call`, without sending it.
+
+        Args:
+            from_address: Address to simulate sending the transaction from.
+            block_identifier: Block on top of which the transaction is simulated, e.g. `pending`.
+
+        Returns:
+            Value returned by the contract method, or raw return data if there is no contract method.
+            Raises an exception if the transaction would fail.
+        """
+        assert(isinstance(from_address, Address))
+
+        transaction_params = {**self._as_dict(self.extra), **{'from': from_address.address}}
+        if self.contract is not None and self.function_name is not None:
+            return self._contract_function().call(transaction_params, block_identifier=block_identifier)
+
+        data = {'data': self.parameters[0]} if self.contract is not None else {}
+        return self.web3.eth.call({**transaction_params, **{'to': self.address.address}, **data}, block_identifier)
+
     def estimated_gas(self, from_address: Address) -> int:
         """Return an estimated amount of gas which will get consumed by this Ethereum transaction.
 
@@ -618,45 +724,57 @@ class Transact:
 
         Out-of-gas exceptions are automatically recognized as transaction failures.
 
-        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`.
+        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`, `learned_gas`.
         `gas_price` needs to be an instance of a class inheriting from :py:class:`pyflex.gas.GasPrice`.
 
         The `gas` keyword argument is the gas limit for the transaction, whereas `gas_buffer`
         specifies how much gas should be added to the estimate. They can not be present
         at the same time. If none of them are present, a default buffer is added to the estimate.
 
+        If `learned_gas` is true and neither `gas` nor `gas_buffer` is present, the gas limit learned from
+        past receipts of the same contract function (see :py:class:`pyflex.gas.GasLimits`) is used when
+        there is one, and gas is not estimated. Such a transaction is sent even if it would fail.
+
         Returns:
             A future value of either a :py:class:`pyflex.Receipt` object if the transaction
             invocation was successful, or `None` if it failed.
         """
-        global next_nonce
         self.initial_time = time.time()
-        unknown_kwargs = set(kwargs.keys()) - {'from_address', 'replace', 'gas', 'gas_buffer', 'gas_price'}
+        unknown_kwargs = set(kwargs.keys()) - {'from_address', 'replace', 'gas', 'gas_buffer', 'gas_price', 'learned_gas'}
         if len(unknown_kwargs) > 0:
             raise ValueError(f"Unknown kwargs: {unknown_kwargs}")
 
-        # Get the from account. Initialize the first nonce for the account.
+        # Get the from account.
         from_account = kwargs['from_address'].address if ('from_address' in kwargs) else self.web3.eth.defaultAccount
-        if not next_nonce or from_account not in next_nonce:
-            next_nonce[from_account] = self.web3.eth.getTransactionCount(from_account, block_identifier='pending')
 
-        # First we try to estimate the gas usage of the transaction. If gas estimation fails
+        # If asked to, use the gas limit learned from past transactions calling the same function.
+        gas_key = self._gas_key()
+        gas = None
+        if kwargs.get('learned_gas') and 'gas' not in kwargs and 'gas_buffer' not in kwargs and gas_key is not None:
+            gas = Transact.gas_limits.limit(gas_key)
+            if gas is not None:
+                self.logger.debug(f"Using learned gas limit {gas} for {self.name()}, skipping gas estimation")
+
+        # Otherwise we try to estimate the gas usage of the transaction. If gas estimation fails
         # it means there is no point in sending the transaction, thus we fail instantly and
         # do not increment the nonce. If the estimation is successful, we pass the calculated
         # gas value (plus some `gas_buffer`) to the subsequent `transact` calls so it does not
         # try to estimate it again.
-        try:
-            gas_estimate = self.estimated_gas(Address(from_account))
-        except:
-            if Transact.gas_estimate_for_bad_txs:
-                self.logger.warning(f"Transaction {self.name()} will fail, submitting anyway")
-                gas_estimate = Transact.gas_estimate_for_bad_txs
-            else:
-                self.logger.warning(f"Transaction {self.name()} will fail, refusing to send ({sys.exc_info()[1]})")
-                return None
+        if gas is None:
+            try:
+                gas_estimate = await run_blocking(self.estimated_gas, Address(from_account))
+            except:
+                if Transact.gas_estimate_for_bad_txs:
+                    self.logger.warning(f"Transaction {self.name()} will fail, submitting anyway")
+                    gas_estimate = Transact.gas_estimate_for_bad_txs
+                else:
+                    self.logger.warning(f"Transaction {self.name()} will fail, refusing to send ({sys.exc_info()[1]})")
+                    return None
 
-        # Get or calculate `gas`. Get `gas_price`, which in fact refers to a gas pricing algorithm.
-        gas = self._gas(gas_estimate, **kwargs)
+            # Get or calculate `gas`.
+            gas = self._gas(gas_estimate, **kwargs)
+
+        # Get `gas_price`, which in fact refers to a gas pricing algorithm.
         self.gas_price = kwargs['gas_price'] if ('gas_price' in kwargs) else DefaultGasPrice()
         assert(isinstance(self.gas_price, GasPrice))
 
@@ -669,6 +787,9 @@ class Transact:
 
             replaced_tx.replaced = True
             self.nonce = replaced_tx.nonce
+            if self.nonce is not None:
+                nonce_manager(self.web3).hold(from_account, self.nonce)
+                self.nonce_account = from_account
             # Gas should be calculated from the original time of submission
             self.initial_time = replaced_tx.initial_time if replaced_tx.initial_time else time.time()
             # Use gas strategy from the original transaction if one was not provided
@@ -683,7 +804,8 @@ class Transact:
         while True:
             seconds_elapsed = int(time.time() - self.initial_time)
 
-            if self.nonce is not None and self.web3.eth.getTransactionCount(from_account) > self.nonce:
+            if self.nonce is not None and \
+                    await run_blocking(transaction_tracker(self.web3).transaction_count, from_account) > self.nonce:
                 # Check if any transaction sent so far has been mined (has a receipt).
                 # If it has, we return either the receipt (if if was successful) or `None`.
                 for attempt in range(1, 11):
@@ -692,18 +814,24 @@ class Transact:
                         return None
 
                     for tx_hash in self.tx_hashes:
-                        receipt = self._get_receipt(tx_hash)
+                        receipt = await run_blocking(self._get_receipt, tx_hash, refresh=attempt > 1)
                         if receipt:
                             if receipt.successful:
                                 self.logger.info(f"Transaction {self.name()} was successful (tx_hash={bytes_to_hexstring(tx_hash)})")
+                                if gas_key is not None:
+                                    Transact.gas_limits.learn(gas_key, receipt.gas_used)
                                 return receipt
                             else:
                                 self.logger.warning(f"Transaction {self.name()} status is '0x0'."
                                                     f" Assuming it has failed (tx_hash={bytes_to_hexstring(tx_hash)})")
+                                # Failed or ran out of gas, so estimate gas again until the function is learned anew
+                                if gas_key is not None:
+                                    Transact.gas_limits.forget(gas_key)
                                 return None
 
+                    transaction_count = await run_blocking(transaction_tracker(self.web3).transaction_count, from_account)
                     self.logger.debug(f"No receipt found in attempt #{attempt}/10 (nonce={self.nonce},"
-                                      f" getTransactionCount={self.web3.eth.getTransactionCount(from_account)})")
+                                      f" getTransactionCount={transaction_count})")
 
                     await asyncio.sleep(0.5)
 
@@ -718,6 +846,15 @@ class Transact:
                 self.logger.info(f"Transaction {self.name()} with nonce={self.nonce} is being replaced")
                 return None
 
+            # The node may evict a transaction from its mempool, i.e. when it is underpriced; send it again if so
+            if self.nonce is not None and \
+                    await run_blocking(nonce_manager(self.web3).dropped, from_account, self.nonce, list(self.tx_hashes)):
+                self.logger.warning(f"Transaction {self.name()} with nonce={self.nonce} was dropped, sending it again")
+                transaction_tracker(self.web3).forget(list(self.tx_hashes))
+                self.tx_hashes.clear()
+                # Nothing is left in the mempool for a replacement to outbid
+                replaced_tx = None
+
             # Send a transaction if:
             # - no transaction has been sent yet, or
             # - the requested gas price has changed enough since the last transaction has been sent
@@ -730,31 +867,19 @@ class Transact:
                 self.gas_price_last = gas_price_value
 
                 try:
-                    # We need the lock in order to not try to send two transactions with the same nonce.
-                    with transaction_lock:
-                        if self.nonce is None:
-                            nonce_calculation = _get_nonce_calc(self.web3)
-                            if nonce_calculation == NonceCalculation.PARITY_NEXTNONCE:
-                                self.nonce = int(self.web3.manager.request_blocking("parity_nextNonce", [from_account]), 16)
-                            elif nonce_calculation == NonceCalculation.TX_COUNT:
-                                self.nonce = self.web3.eth.getTransactionCount(from_account, block_identifier='pending')
-                            elif nonce_calculation == NonceCalculation.SERIAL:
-                                tx_count = self.web3.eth.getTransactionCount(from_account, block_identifier='pending')
-                                next_serial = next_nonce[from_account]
-                                self.nonce = max(tx_count, next_serial)
-                            elif nonce_calculation == NonceCalculation.PARITY_SERIAL:
-                                tx_count = int(self.web3.manager.request_blocking("parity_nextNonce", [from_account]), 16)
-                                next_serial = next_nonce[from_account]
-                                self.nonce = max(tx_count, next_serial)
-                            next_nonce[from_account] = self.nonce + 1
-
-                        # Trap replacement while original is holding the lock awaiting nonce assignment
-                        if self.replaced:
-                            self.logger.info(f"Transaction {self.name()} with nonce={self.nonce} was replaced")
-                            return None
-
-                        tx_hash = self._func(from_account, gas, gas_price_value, self.nonce)
-                        self.tx_hashes.append(tx_hash)
+                    # Nonces are allocated locally, so two transactions never get the same one.
+                    if self.nonce is None:
+                        self.nonce = await run_blocking(nonce_manager(self.web3).allocate, from_account,
+                                                        lambda: _get_next_nonce(self.web3, from_account))
+                        self.nonce_account = from_account
+
+                    # Trap replacement while original is awaiting nonce assignment
+                    if self.replaced:
+                        self.logger.info(f"Transaction {self.name()} with nonce={self.nonce} was replaced")
+                        return None
+
+                    tx_hash = await run_blocking(self._func, from_account, gas, gas_price_value, self.nonce)
+                    self.tx_hashes.append(tx_hash)
 
                     self.logger.info(f"Sent transaction {self.name()} with nonce={self.nonce}, gas={gas},"
                                      f" gas_price={gas_price_value if gas_price_value is not None else 'default'}"
@@ -764,6 +889,10 @@ class Transact:
                                         f" gas_price={gas_price_value if gas_price_value is not None else 'default'}"
                                         f" ({e})")
 
+                    # The node knows of a transaction with this nonce we have not sent, so read nonces from it again
+                    if 'nonce' in str(e).lower() and len(self.tx_hashes) == 0:
+                        nonce_manager(self.web3).reset(from_account)
+
                     if len(self.tx_hashes) == 0:
                         raise
 
@@ -831,19 +960,21 @@ class RecoveredTransact(Transact):
             if gas_price_value > self.gas_price_last * 1.125:
                 self.gas_price_last = gas_price_value
                 # Transaction lock isn't needed here, as we are replacing an existing nonce
-                tx_hash = bytes_to_hexstring(self.web3.eth.sendTransaction({'from': self.address.address,
-                                                                            'to': self.address.address,
-                                                                            'gasPrice': gas_price_value,
-                                                                            'nonce': self.nonce,
-                                                                            'value': 0}))
+                tx_hash = bytes_to_hexstring(await run_blocking(self.web3.eth.sendTransaction,
+                                                                {'from': self.address.address,
+                                                                 'to': self.address.address,
+                                                                 'gasPrice': gas_price_value,
+                                                                 'nonce': self.nonce,
+                                                                 'value': 0}))
                 self.tx_hashes.append(tx_hash)
                 self.logger.info(f"Attempting to cancel recovered tx with nonce={self.nonce}, "
                                  f"gas_price={gas_price_value} (tx_hash={tx_hash})")
 
             for tx_hash in self.tx_hashes:
-                receipt = self._get_receipt(tx_hash)
+                receipt = await run_blocking(self._get_receipt, tx_hash)
                 if receipt:
                     self.logger.info(f"{self.name()} was cancelled (tx_hash={tx_hash})")
+                    transaction_tracker(self.web3).forget(list(self.tx_hashes))
                     return
 
             await asyncio.sleep(0.75)
@@ -59,6 +59,8 @@ class AuctionContract(Contract):
                 self.start_auction_abi = member
             elif member.get('name') == 'SettleAuction':
                 self.settle_auction_abi = member
+            elif member.get('name') == 'RestartAuction':
+                self.restart_auction_abi = member
 
     def safe_engine(self) -> Address:
         """Returns the `safeEngine` address.
@@ -113,6 +115,25 @@ class AuctionContract(Contract):
         """
         return int(self._contract.functions.auctionsStarted().call())
 
+    def bids_batch(self, ids: List[int], block_identifier='latest', batch_size=100) -> List:
+        """Returns the auction details for several auctions, read in as few requests as the node allows.
+
+        Args:
+            ids: Auction identifiers.
+            block_identifier: Block at which the auctions should be read, so all details are consistent.
+            batch_size: Number of auctions to read per request.
+
+        Returns:
+            The auction details, in the order of `ids`.
+        """
+        assert(isinstance(ids, list))
+
+        arrays = self._batch_call(self._contract, 'bids', [[id] for id in ids], block_identifier, batch_size)
+        return [self._bid_from_array(id, array) for id, array in zip(ids, arrays)]
+
+    def _bid_from_array(self, id: int, array: list):
+        raise NotImplementedError()
+
     def settle_auction(self, id: int) -> Transact:
         assert(isinstance(id, int))
 
@@ -133,6 +154,37 @@ class AuctionContract(Contract):
 
         return list(filter(lambda l: l is not None, events))
 
+    def past_logs_in_block_range(self, from_block: int, to_block: int, chunk_size=20000) -> List:
+        """Synchronously retrieve parsed auction events, oldest first.
+
+        Args:
+            from_block: Oldest Ethereum block to retrieve the events from.
+            to_block: Newest Ethereum block to retrieve the events from.
+            chunk_size: Number of blocks to fetch from chain at one time, for performance tuning
+        Returns:
+            List of events represented by the `...Log` classes of the auction contract.
+        """
+        assert isinstance(from_block, int)
+        assert isinstance(to_block, int)
+        assert from_block <= to_block
+        assert chunk_size > 0
+
+        start = from_block
+        events = []
+        while start <= to_block:
+            end = min(to_block, start + chunk_size)
+            filter_params = {
+                'address': self.address.address,
+                'fromBlock': start,
+                'toBlock': end
+            }
+
+            logs = self.web3.eth.getLogs(filter_params)
+            events.extend(map(lambda l: self.parse_event(l), logs))
+            start = end + 1
+
+        return list(filter(lambda l: l is not None, events))
+
     def parse_event(self, event):
         raise NotImplemented()
 
@@ -231,6 +283,17 @@ class EnglishCollateralAuctionHouse(AuctionContract):
         def __repr__(self):
             return f"EnglishCollateralAuctionHouse.StartAuctionLog({pformat(vars(self))})"
 
+    class RestartAuctionLog:
+        def __init__(self, log):
+            args = log['args']
+            self.id = int(args['id'])
+            self.auction_deadline = int(args['auctionDeadline'])
+            self.block = log['blockNumber']
+            self.tx_hash = log['transactionHash'].hex()
+
+        def __repr__(self):
+            return f"EnglishCollateralAuctionHouse.RestartAuctionLog({pformat(vars(self))})"
+
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
         assert isinstance(address, Address)
@@ -276,7 +339,9 @@ class EnglishCollateralAuctionHouse(AuctionContract):
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        return self._bid_from_array(id, self._contract.functions.bids(id).call())
+
+    def _bid_from_array(self, id: int, array: list) -> Bid:
         return EnglishCollateralAuctionHouse.Bid(id=id,
                            bid_amount=Rad(array[0]),
                            amount_to_sell=Wad(array[1]),
@@ -337,6 +402,9 @@ class EnglishCollateralAuctionHouse(AuctionContract):
         elif signature == "0x03af424b0e12d91ea31fe7f2c199fc02c9ede38f9aa1bdc019a8087b41445f7a":
             event_data = get_event_data(codec, self.settle_auction_abi, event)
             return EnglishCollateralAuctionHouse.SettleAuctionLog(event_data)
+        elif signature == "0x10a109258779eb298071adf16637b95f8d7cf00e49595711da10eeb90e6e8e94":
+            event_data = get_event_data(codec, self.restart_auction_abi, event)
+            return EnglishCollateralAuctionHouse.RestartAuctionLog(event_data)
 
     def __repr__(self):
         return f"EnglishCollateralAuctionHouse('{self.address}')"
@@ -414,6 +482,17 @@ class PreSettlementSurplusAuctionHouse(AuctionContract):
         def __repr__(self):
             return f"PreSettlementSurplusAuctionHouse.SettleAuctionLog({pformat(vars(self))})"
 
+    class RestartAuctionLog:
+        def __init__(self, log):
+            args = log['args']
+            self.id = int(args['id'])
+            self.auction_deadline = int(args['auctionDeadline'])
+            self.block = log['blockNumber']
+            self.tx_hash = log['transactionHash'].hex()
+
+        def __repr__(self):
+            return f"PreSettlementSurplusAuctionHouse.RestartAuctionLog({pformat(vars(self))})"
+
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
         assert isinstance(address, Address)
@@ -459,8 +538,9 @@ class PreSettlementSurplusAuctionHouse(AuctionContract):
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        return self._bid_from_array(id, self._contract.functions.bids(id).call())
 
+    def _bid_from_array(self, id: int, array: list) -> Bid:
         return PreSettlementSurplusAuctionHouse.Bid(id=id,
                            bid_amount=Wad(array[0]),
                            amount_to_sell=Rad(array[1]),
@@ -507,6 +587,9 @@ class PreSettlementSurplusAuctionHouse(AuctionContract):
         elif signature == "0x03af424b0e12d91ea31fe7f2c199fc02c9ede38f9aa1bdc019a8087b41445f7a":
             event_data = get_event_data(codec, self.settle_auction_abi, event)
             return PreSettlementSurplusAuctionHouse.SettleAuctionLog(event_data)
+        elif signature == "0x10a109258779eb298071adf16637b95f8d7cf00e49595711da10eeb90e6e8e94":
+            event_data = get_event_data(codec, self.restart_auction_abi, event)
+            return PreSettlementSurplusAuctionHouse.RestartAuctionLog(event_data)
 
     def __repr__(self):
         return f"PreSettlementSurplusAuctionHouse('{self.address}')"
@@ -587,6 +670,17 @@ class DebtAuctionHouse(AuctionContract):
         def __repr__(self):
             return f"DebtAuctionHouse.SettleAuctionLog({pformat(vars(self))})"
 
+    class RestartAuctionLog:
+        def __init__(self, log):
+            args = log['args']
+            self.id = int(args['id'])
+            self.auction_deadline = int(args['auctionDeadline'])
+            self.block = log['blockNumber']
+            self.tx_hash = log['transactionHash'].hex()
+
+        def __repr__(self):
+            return f"DebtAuctionHouse.RestartAuctionLog({pformat(vars(self))})"
+
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
         assert isinstance(address, Address)
@@ -634,8 +728,9 @@ class DebtAuctionHouse(AuctionContract):
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        return self._bid_from_array(id, self._contract.functions.bids(id).call())
 
+    def _bid_from_array(self, id: int, array: list) -> Bid:
         return DebtAuctionHouse.Bid(id=id,
                            bid_amount=Rad(array[0]),
                            amount_to_sell=Wad(array[1]),
@@ -683,6 +778,9 @@ class DebtAuctionHouse(AuctionContract):
         elif signature == "0xef063949eb6ef5abef19139d9c75a558424ffa759302cfe445f8d2d327376fe4":
             event_data = get_event_data(codec, self.settle_auction_abi, event)
             return DebtAuctionHouse.SettleAuctionLog(event_data)
+        elif signature == "0x10a109258779eb298071adf16637b95f8d7cf00e49595711da10eeb90e6e8e94":
+            event_data = get_event_data(codec, self.restart_auction_abi, event)
+            return DebtAuctionHouse.RestartAuctionLog(event_data)
 
     def __repr__(self):
         return f"DebtAuctionHouse('{self.address}')"
@@ -841,8 +939,9 @@ class FixedDiscountCollateralAuctionHouse(AuctionContract):
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        return self._bid_from_array(id, self._contract.functions.bids(id).call())
 
+    def _bid_from_array(self, id: int, array: list) -> Bid:
         return FixedDiscountCollateralAuctionHouse.Bid(id=id,
                            raised_amount=Rad(array[0]),
                            sold_amount=Wad(array[1]),
@@ -957,9 +1056,12 @@ class IncreasingDiscountCollateralAuctionHouse(AuctionContract):
             self.amount_to_sell = Wad(args['amountToSell'])
             self.initial_bid = Rad(args['initialBid'])
             self.amount_to_raise = Rad(args['amountToRaise'])
+            self.starting_discount = Wad(args['startingDiscount'])
+            self.max_discount = Wad(args['maxDiscount'])
+            self.per_second_discount_update_rate = Ray(args['perSecondDiscountUpdateRate'])
+            self.discount_increase_deadline = int(args['discountIncreaseDeadline'])
             self.forgone_collateral_receiver = Address(args['forgoneCollateralReceiver'])
             self.auction_income_recipient = Address(args['auctionIncomeRecipient'])
-            self.auction_deadline = int(args['auctionDeadline'])
             self.block = log['blockNumber']
             self.tx_hash = log['transactionHash'].hex()
 
@@ -1087,8 +1189,9 @@ class IncreasingDiscountCollateralAuctionHouse(AuctionContract):
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        return self._bid_from_array(id, self._contract.functions.bids(id).call())
 
+    def _bid_from_array(self, id: int, array: list) -> Bid:
         return IncreasingDiscountCollateralAuctionHouse.Bid(id=id,
                            amount_to_sell=Wad(array[0]),
                            amount_to_raise=Rad(array[1]),
@@ -1137,15 +1240,15 @@ class IncreasingDiscountCollateralAuctionHouse(AuctionContract):
     def parse_event(self, event):
         signature = Web3.toHex(event['topics'][0])
         codec = ABICodec(default_registry)
-        if signature == "0xdf7b5cd0ee6547c7389d2ac00ee0c1cd3439542399d6c8c520cc69c7409c0990":
+        if signature == "0xeeef9cc8b762ca3069593e765824d4986b3666db6287f9d6418789eda72cfe37":
             event_data = get_event_data(codec, self.start_auction_abi, event)
-            return FixedDiscountCollateralAuctionHouse.StartAuctionLog(event_data)
+            return IncreasingDiscountCollateralAuctionHouse.StartAuctionLog(event_data)
         elif signature == "0xa4a1133e32fac37643a1fe1db4631daadb462c8662ae16004e67f0b8bb608383":
             event_data = get_event_data(codec, self.buy_collateral_abi, event)
-            return FixedDiscountCollateralAuctionHouse.BuyCollateralLog(event_data)
+            return IncreasingDiscountCollateralAuctionHouse.BuyCollateralLog(event_data)
         elif signature == "0xef063949eb6ef5abef19139d9c75a558424ffa759302cfe445f8d2d327376fe4":
             event_data = get_event_data(codec, self.settle_auction_abi, event)
-            return FixedDiscountCollateralAuctionHouse.SettleAuctionLog(event_data)
+            return IncreasingDiscountCollateralAuctionHouse.SettleAuctionLog(event_data)
 
     def __repr__(self):
         return f"IncreasingDiscountCollateralAuctionHouse('{self.address}')"
@@ -1227,6 +1330,18 @@ class StakedTokenAuctionHouse(AuctionContract):
         def __repr__(self):
             return f"StakedTokenAuctionHouse.SettleAuctionLog({pformat(vars(self))})"
 
+    class RestartAuctionLog:
+        def __init__(self, log):
+            args = log['args']
+            self.id = int(args['id'])
+            self.min_bid = Wad(args['minBid'])
+            self.auction_deadline = int(args['auctionDeadline'])
+            self.block = log['blockNumber']
+            self.tx_hash = log['transactionHash'].hex()
+
+        def __repr__(self):
+            return f"StakedTokenAuctionHouse.RestartAuctionLog({pformat(vars(self))})"
+
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
         assert isinstance(address, Address)
@@ -1277,8 +1392,9 @@ class StakedTokenAuctionHouse(AuctionContract):
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        return self._bid_from_array(id, self._contract.functions.bids(id).call())
 
+    def _bid_from_array(self, id: int, array: list) -> Bid:
         return StakedTokenAuctionHouse.Bid(id=id,
                            bid_amount=Rad(array[0]),
                            amount_to_sell=Wad(array[1]),
@@ -1327,6 +1443,9 @@ class StakedTokenAuctionHouse(AuctionContract):
         elif signature == "0xef063949eb6ef5abef19139d9c75a558424ffa759302cfe445f8d2d327376fe4":
             event_data = get_event_data(codec, self.settle_auction_abi, event)
             return StakedTokenAuctionHouse.SettleAuctionLog(event_data)
+        elif signature == "0x52926b7e2fb12434af05e0b5e28d2b857fc6a23d92f7d7b8ebc6ec6b0fb4419e":
+            event_data = get_event_data(codec, self.restart_auction_abi, event)
+            return StakedTokenAuctionHouse.RestartAuctionLog(event_data)
 
     def __repr__(self):
         return f"StakedTokenAuctionHouse('{self.address}')"
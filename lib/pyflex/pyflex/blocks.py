@@ -0,0 +1,146 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+from weakref import WeakKeyDictionary
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+
+class BlockCache:
+    """Bounded LRU cache of block headers, shared by everything using the same `Web3` instance.
+
+    Headers are looked up by number or hash. The `latest` header is served from the cache only when it was
+    observed by the block watcher (see :py:class:`pyflex.lifecycle.Lifecycle`) less than `latest_ttl` seconds ago,
+    so callers processing a block all see the same head without asking the node for it again.
+    When no block watcher is running, `latest` is always read from the node. The default `latest_ttl` is well below
+    the 12 second block time, so a head the watcher missed is not served for a whole block.
+
+    Attributes:
+        web3: An instance of `Web` from `web3.py`.
+        size: Maximum number of headers kept.
+        latest_ttl: Number of seconds an observed head is served as `latest`.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, web3: Web3, size: int = 1024, latest_ttl: float = 4.0):
+        assert isinstance(web3, Web3)
+        assert isinstance(size, int)
+        assert size > 0
+        assert isinstance(latest_ttl, (int, float))
+
+        self.web3 = web3
+        self.size = size
+        self.latest_ttl = latest_ttl
+        self._by_number = OrderedDict()
+        self._by_hash = {}
+        self._latest = None
+        self._latest_observed_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_block(self, block_identifier: Union[int, str, bytes] = 'latest'):
+        """Returns the header of a block, reading it from the node only if it is not cached.
+
+        Args:
+            block_identifier: Block number, block hash or `latest`; other identifiers are always read from the node.
+        """
+        with self._lock:
+            block = self._lookup(block_identifier)
+        if block is not None:
+            return block
+
+        block = self.web3.eth.getBlock(block_identifier)
+        # A `latest` which was not observed by the block watcher is cached by number and hash, but not served as `latest`
+        if isinstance(block_identifier, int) or self._is_hash(block_identifier) or block_identifier == 'latest':
+            with self._lock:
+                self._store(block)
+        return block
+
+    def block_number(self) -> int:
+        return self.get_block('latest')['number']
+
+    def block_time(self, block_identifier: Union[int, str, bytes] = 'latest') -> int:
+        return self.get_block(block_identifier)['timestamp']
+
+    def observe(self, block):
+        """Records a new head received by the block watcher."""
+        with self._lock:
+            parent = self._by_number.get(block['number'] - 1)
+            if parent is not None and parent['hash'] != block['parentHash']:
+                self.logger.debug(f"Block #{block['number']} does not extend the cached chain; clearing block cache")
+                self._by_number.clear()
+                self._by_hash.clear()
+            # Headers above a new head were replaced by a reorg
+            for number in [number for number in self._by_number if number > block['number']]:
+                self._by_hash.pop(self._by_number.pop(number)['hash'], None)
+
+            self._store(block)
+            self._latest = block
+            self._latest_observed_at = time.monotonic()
+
+    def _lookup(self, block_identifier) -> Optional[dict]:
+        if block_identifier == 'latest':
+            if self._latest is not None and time.monotonic() - self._latest_observed_at < self.latest_ttl:
+                return self._latest
+            return None
+
+        if isinstance(block_identifier, int):
+            block = self._by_number.get(block_identifier)
+        elif self._is_hash(block_identifier):
+            block = self._by_hash.get(HexBytes(block_identifier))
+        else:
+            return None
+
+        if block is not None:
+            self._by_number.move_to_end(block['number'])
+        return block
+
+    def _store(self, block):
+        replaced = self._by_number.pop(block['number'], None)
+        if replaced is not None:
+            self._by_hash.pop(replaced['hash'], None)
+        self._by_number[block['number']] = block
+        self._by_hash[HexBytes(block['hash'])] = block
+
+        while len(self._by_number) > self.size:
+            _, evicted = self._by_number.popitem(last=False)
+            self._by_hash.pop(evicted['hash'], None)
+
+    @staticmethod
+    def _is_hash(block_identifier) -> bool:
+        if isinstance(block_identifier, (bytes, bytearray)):
+            return len(block_identifier) == 32
+        return isinstance(block_identifier, str) and block_identifier.startswith('0x') and len(block_identifier) == 66
+
+
+block_caches = WeakKeyDictionary()
+block_caches_lock = threading.Lock()
+
+
+def block_cache(web3: Web3) -> BlockCache:
+    """Returns the block cache shared by all users of `web3`."""
+    assert isinstance(web3, Web3)
+
+    with block_caches_lock:
+        if web3 not in block_caches:
+            block_caches[web3] = BlockCache(web3)
+        return block_caches[web3]
@@ -16,6 +16,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
+import threading
+from collections import deque
 from typing import Optional
 from web3 import Web3
 
@@ -202,3 +204,50 @@ class GeometricGasPrice(GasPrice):
             result = min(result, self.max_price)
 
         return math.ceil(result)
+
+
+class GasLimits:
+    """Gas limits learned from the receipts of past transactions, so repeated calls need not estimate gas.
+
+    Gas used by successful transactions is remembered separately for each contract function. Once a function has been
+    seen `min_samples` times, its limit is the most gas any of the last `samples` transactions used, multiplied
+    by `margin`. A failed transaction makes the function unknown again, so its gas is estimated until it is learned
+    anew.
+
+    Args:
+        margin: Multiplier applied to the most gas used, defaults to 1.25.
+        samples: Number of recent transactions remembered for each function, defaults to 8.
+        min_samples: Number of transactions to see before a limit is offered, defaults to 3.
+    """
+    def __init__(self, margin: float = 1.25, samples: int = 8, min_samples: int = 3):
+        assert isinstance(margin, (int, float))
+        assert isinstance(samples, int)
+        assert isinstance(min_samples, int)
+        assert margin >= 1
+        assert 0 < min_samples <= samples
+
+        self.margin = margin
+        self.samples = samples
+        self.min_samples = min_samples
+        self._gas_used = {}
+        self._lock = threading.Lock()
+
+    def limit(self, key) -> Optional[int]:
+        """Returns the gas limit learned for `key`, or `None` if gas has to be estimated"""
+        with self._lock:
+            gas_used = self._gas_used.get(key)
+            if gas_used is None or len(gas_used) < self.min_samples:
+                return None
+            return math.ceil(max(gas_used) * self.margin)
+
+    def learn(self, key, gas_used: int):
+        """Remembers the gas used by a successful transaction"""
+        assert isinstance(gas_used, int)
+
+        with self._lock:
+            self._gas_used.setdefault(key, deque(maxlen=self.samples)).append(gas_used)
+
+    def forget(self, key):
+        """Forgets what was learned about `key`, i.e. after a transaction failed or ran out of gas"""
+        with self._lock:
+            self._gas_used.pop(key, None)
@@ -18,9 +18,10 @@
 
 import logging
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pprint import pformat
-from typing import Optional, List, Union
+from typing import Optional, List, Tuple, Union
 
 from hexbytes import HexBytes
 from web3 import Web3
@@ -32,6 +33,7 @@ from eth_abi.registry import registry as default_registry
 
 from pyflex import Address, Contract, Transact
 from pyflex.approval import directly, approve_safe_modification_directly
+from pyflex.blocks import block_cache
 from pyflex.auctions import PreSettlementSurplusAuctionHouse
 from pyflex.auctions import FixedDiscountCollateralAuctionHouse, EnglishCollateralAuctionHouse
 from pyflex.auctions import IncreasingDiscountCollateralAuctionHouse, DebtAuctionHouse
@@ -405,6 +407,66 @@ class SAFEEngine(Contract):
         def __repr__(self):
             return f"LogModifySAFECollateralization({pformat(vars(self))})"
 
+    # This information is read from the `TransferSAFECollateralAndDebt` event emitted from `SAFEEngine.transferSAFECollateralAndDebt`
+    class LogTransferSAFECollateralAndDebt:
+        def __init__(self, log):
+            self.collateral_type = CollateralType.fromBytes(log['args']['collateralType']).name
+            self.src = Address(log['args']['src'])
+            self.dst = Address(log['args']['dst'])
+            self.delta_collateral = Wad(log['args']['deltaCollateral'])
+            self.delta_debt = Wad(log['args']['deltaDebt'])
+            self.src_locked_collateral = Wad(log['args']['srcLockedCollateral'])
+            self.src_generated_debt = Wad(log['args']['srcGeneratedDebt'])
+            self.dst_locked_collateral = Wad(log['args']['dstLockedCollateral'])
+            self.dst_generated_debt = Wad(log['args']['dstGeneratedDebt'])
+            self.raw = log
+
+        @classmethod
+        def from_event(cls, event: dict):
+
+            topics = event.get('topics')
+            if topics and topics[0] == HexBytes('0x4b49cc19514005253f36d0517c21b92404f50cc0d9e0c070af00b96e296b0835'):
+                log_abi = [abi for abi in SAFEEngine.abi if abi.get('name') == 'TransferSAFECollateralAndDebt'][0]
+                codec = ABICodec(default_registry)
+                event_data = get_event_data(codec, log_abi, event)
+                return SAFEEngine.LogTransferSAFECollateralAndDebt(event_data)
+
+        def __eq__(self, other):
+            assert isinstance(other, SAFEEngine.LogTransferSAFECollateralAndDebt)
+            return self.__dict__ == other.__dict__
+
+        def __repr__(self):
+            return f"LogTransferSAFECollateralAndDebt({pformat(vars(self))})"
+
+    # This information is read from the `ConfiscateSAFECollateralAndDebt` event emitted from `SAFEEngine.confiscateSAFECollateralAndDebt`
+    class LogConfiscateSAFECollateralAndDebt:
+        def __init__(self, log):
+            self.collateral_type = CollateralType.fromBytes(log['args']['collateralType']).name
+            self.safe = Address(log['args']['safe'])
+            self.collateral_counterparty = Address(log['args']['collateralCounterparty'])
+            self.debt_counterparty = Address(log['args']['debtCounterparty'])
+            self.delta_collateral = Wad(log['args']['deltaCollateral'])
+            self.delta_debt = Wad(log['args']['deltaDebt'])
+            self.global_unbacked_debt = Rad(log['args']['globalUnbackedDebt'])
+            self.raw = log
+
+        @classmethod
+        def from_event(cls, event: dict):
+
+            topics = event.get('topics')
+            if topics and topics[0] == HexBytes('0x9bef7b734be54aaed05e906c2ccf923767f44a93d136b674e212ce858a6d031c'):
+                log_abi = [abi for abi in SAFEEngine.abi if abi.get('name') == 'ConfiscateSAFECollateralAndDebt'][0]
+                codec = ABICodec(default_registry)
+                event_data = get_event_data(codec, log_abi, event)
+                return SAFEEngine.LogConfiscateSAFECollateralAndDebt(event_data)
+
+        def __eq__(self, other):
+            assert isinstance(other, SAFEEngine.LogConfiscateSAFECollateralAndDebt)
+            return self.__dict__ == other.__dict__
+
+        def __repr__(self):
+            return f"LogConfiscateSAFECollateralAndDebt({pformat(vars(self))})"
+
     abi = Contract._load_abi(__name__, 'abi/SAFEEngine.abi')
     bin = Contract._load_bin(__name__, 'abi/SAFEEngine.bin')
 
@@ -474,6 +536,41 @@ class SAFEEngine(Contract):
         (locked_collateral, generated_debt) = self._contract.functions.safes(collateral_type.toBytes(), address.address).call()
         return SAFE(address, collateral_type, Wad(locked_collateral), Wad(generated_debt))
 
+    def safes_batch(self, collateral_type: CollateralType, addresses: List[Address], block_identifier='latest',
+                    batch_size=500, parallelism=4) -> List[SAFE]:
+        """Reads many SAFEs at once, as a number of batched requests sent in parallel.
+
+        Args:
+            collateral_type: Identifies the type of collateral.
+            addresses: SAFE addresses.
+            block_identifier: Block at which SAFEs should be read; `latest` reads every batch at the current block.
+            batch_size: Number of SAFEs to read per request.
+            parallelism: Maximum number of requests in flight.
+        Returns:
+            SAFEs in the order of `addresses`.
+        """
+        assert isinstance(collateral_type, CollateralType)
+        assert isinstance(addresses, list)
+        assert batch_size > 0
+        assert parallelism > 0
+
+        if len(addresses) == 0:
+            return []
+        if block_identifier == 'latest':
+            block_identifier = self.web3.eth.blockNumber
+
+        def read_batch(batch: List[Address]) -> list:
+            return self._batch_call(self._contract, 'safes',
+                                    [[collateral_type.toBytes(), address.address] for address in batch],
+                                    block_identifier, batch_size)
+
+        batches = [addresses[start:start+batch_size] for start in range(0, len(addresses), batch_size)]
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            results = [result for batch_results in executor.map(read_batch, batches) for result in batch_results]
+
+        return [SAFE(address, collateral_type, Wad(locked_collateral), Wad(generated_debt))
+                for address, (locked_collateral, generated_debt) in zip(addresses, results)]
+
     def global_debt(self) -> Rad:
         return Rad(self._contract.functions.globalDebt().call())
 
@@ -646,6 +743,29 @@ class SAFEEngine(Contract):
             List of past `LogModifySAFECollateralization` events represented as 
             :py:class:`pyflex.gf.SAFEEngine.LogModifySAFECollateralization` class.
         """
+        return self._past_safe_logs(from_block, to_block, collateral_type, chunk_size,
+                                    [SAFEEngine.LogModifySAFECollateralization])
+
+    def past_safe_events(self, from_block: int, to_block: int = None, collateral_type: CollateralType = None,
+                         chunk_size=20000) -> list:
+        """Synchronously retrieve every event which sets the state of a safe, in the order they were emitted.
+         Args:
+            from_block: Oldest Ethereum block to retrieve the events from.
+            to_block: Optional newest Ethereum block to retrieve the events from, defaults to current block
+            collateral_type: Optionally filter events by collateral_type.name
+            chunk_size: Number of blocks to fetch from chain at one time, for performance tuning
+         Returns:
+            List of past :py:class:`pyflex.gf.SAFEEngine.LogModifySAFECollateralization`,
+            :py:class:`pyflex.gf.SAFEEngine.LogTransferSAFECollateralAndDebt` and
+            :py:class:`pyflex.gf.SAFEEngine.LogConfiscateSAFECollateralAndDebt` events.
+        """
+        return self._past_safe_logs(from_block, to_block, collateral_type, chunk_size,
+                                    [SAFEEngine.LogModifySAFECollateralization,
+                                     SAFEEngine.LogTransferSAFECollateralAndDebt,
+                                     SAFEEngine.LogConfiscateSAFECollateralAndDebt])
+
+    def _past_safe_logs(self, from_block: int, to_block: Optional[int], collateral_type: Optional[CollateralType],
+                        chunk_size: int, log_classes: list) -> list:
         current_block = self._contract.web3.eth.blockNumber
         assert isinstance(from_block, int)
         assert from_block < current_block
@@ -654,10 +774,19 @@ class SAFEEngine(Contract):
         else:
             assert isinstance(to_block, int)
             assert to_block >= from_block
-            assert to_block <= current_block
+            # A head read from a block cache, or from another node behind a load balancer, may be ahead of this one
+            if to_block > current_block:
+                logger.debug(f"Node is at block {current_block}, not reading safe logs up to block {to_block}")
+                to_block = current_block
         assert isinstance(collateral_type, CollateralType) or collateral_type is None
         assert chunk_size > 0
 
+        def parse(log):
+            for log_class in log_classes:
+                event = log_class.from_event(log)
+                if event is not None:
+                    return event
+
         logger.debug(f"Consumer requested safe modification data from block {from_block} to {to_block}")
         start = from_block
         end = None
@@ -679,7 +808,7 @@ class SAFEEngine(Contract):
             logger.debug(f"Found {len(logs)} total logs from block {start} to {end}")
             logger.debug(logs)
 
-            log_modifications = list(map(lambda l: SAFEEngine.LogModifySAFECollateralization.from_event(l), logs))
+            log_modifications = list(map(parse, logs))
 
             log_modifications = [l for l in log_modifications if l is not None]
 
@@ -807,6 +936,48 @@ class AccountingEngine(Contract):
     Ref. <https://github.com/reflexer-labs/geb/blob/master/src/AccountingEngine.sol>
     """
 
+    # This information is read from the `PushDebtToQueue` event emitted from `AccountingEngine.pushDebtToQueue`
+    class LogPushDebtToQueue:
+        def __init__(self, log):
+            self.timestamp = int(log['args']['timestamp'])
+            self.debt_queue_block = Rad(log['args']['debtQueueBlock'])
+            self.total_queued_debt = Rad(log['args']['totalQueuedDebt'])
+            self.raw = log
+
+        @classmethod
+        def from_event(cls, event: dict):
+
+            topics = event.get('topics')
+            if topics and topics[0] == HexBytes('0x1833b2803878de6a92dfb6a19b452e31ec63baad0fd2e1e341e0dce55e4ed207'):
+                log_abi = [abi for abi in AccountingEngine.abi if abi.get('name') == 'PushDebtToQueue'][0]
+                codec = ABICodec(default_registry)
+                event_data = get_event_data(codec, log_abi, event)
+                return AccountingEngine.LogPushDebtToQueue(event_data)
+
+        def __repr__(self):
+            return f"LogPushDebtToQueue({pformat(vars(self))})"
+
+    # This information is read from the `PopDebtFromQueue` event emitted from `AccountingEngine.popDebtFromQueue`
+    class LogPopDebtFromQueue:
+        def __init__(self, log):
+            self.timestamp = int(log['args']['timestamp'])
+            self.debt_queue_block = Rad(log['args']['debtQueueBlock'])
+            self.total_queued_debt = Rad(log['args']['totalQueuedDebt'])
+            self.raw = log
+
+        @classmethod
+        def from_event(cls, event: dict):
+
+            topics = event.get('topics')
+            if topics and topics[0] == HexBytes('0x2a88971df34f4b7d590e86d77e5db54859c030b27c51e944a3d9e1d2bc6dbb41'):
+                log_abi = [abi for abi in AccountingEngine.abi if abi.get('name') == 'PopDebtFromQueue'][0]
+                codec = ABICodec(default_registry)
+                event_data = get_event_data(codec, log_abi, event)
+                return AccountingEngine.LogPopDebtFromQueue(event_data)
+
+        def __repr__(self):
+            return f"LogPopDebtFromQueue({pformat(vars(self))})"
+
     abi = Contract._load_abi(__name__, 'abi/AccountingEngine.abi')
     bin = Contract._load_bin(__name__, 'abi/AccountingEngine.bin')
 
@@ -853,6 +1024,42 @@ class AccountingEngine(Contract):
     def debt_queue_of(self, block_time: int) -> Rad:
         return Rad(self._contract.functions.debtQueue(block_time).call())
 
+    def past_debt_queue_events(self, from_block: int, to_block: int, chunk_size=20000) -> list:
+        """Synchronously retrieve events which push debt to or pop debt from the queue, oldest first.
+
+        Args:
+            from_block: Oldest Ethereum block to retrieve the events from.
+            to_block: Newest Ethereum block to retrieve the events from.
+            chunk_size: Number of blocks to fetch from chain at one time, for performance tuning
+        Returns:
+            List of :py:class:`pyflex.gf.AccountingEngine.LogPushDebtToQueue` and
+            :py:class:`pyflex.gf.AccountingEngine.LogPopDebtFromQueue` events.
+        """
+        assert isinstance(from_block, int)
+        assert isinstance(to_block, int)
+        assert from_block <= to_block
+        assert chunk_size > 0
+
+        def parse(log):
+            return AccountingEngine.LogPushDebtToQueue.from_event(log) or \
+                   AccountingEngine.LogPopDebtFromQueue.from_event(log)
+
+        start = from_block
+        events = []
+        while start <= to_block:
+            end = min(to_block, start + chunk_size)
+            filter_params = {
+                'address': self.address.address,
+                'fromBlock': start,
+                'toBlock': end
+            }
+
+            logs = self.web3.eth.getLogs(filter_params)
+            events.extend(map(parse, logs))
+            start = end + 1
+
+        return list(filter(lambda l: l is not None, events))
+
     def total_on_auction_debt(self) -> Rad:
         return Rad(self._contract.functions.totalOnAuctionDebt().call())
 
@@ -992,7 +1199,7 @@ class LiquidationEngine(Contract):
                 return LiquidationEngine.LogLiquidate(event_data)
 
         def block_time(self, web3: Web3):
-            return web3.eth.getBlock(self.raw['blockNumber'])['timestamp']
+            return block_cache(web3).block_time(self.raw['blockNumber'])
 
         def __eq__(self, other):
             assert isinstance(other, LiquidationEngine.LogLiquidate)
@@ -1044,33 +1251,63 @@ class LiquidationEngine(Contract):
         assert isinstance(collateral_type, CollateralType)
         assert isinstance(safe, SAFE)
 
+        return len(self.can_liquidate_many(collateral_type, [safe], refresh_safe_status)) == 1
+
+    def can_liquidate_many(self, collateral_type: CollateralType, safes: List[SAFE],
+                           refresh_safe_status: bool = True) -> List[Tuple[SAFE, Wad, Wad]]:
+        """ Determine which of many safes can be liquidated, reading limits and penalties only once.
+
+        Safes are evaluated in order as if each liquidatable one were liquidated before the next, so coins put on
+        auction by earlier liquidations reduce the room left for later ones.
+
+        Args:
+            collateral_type: CollateralType
+            safes: Safes to check
+            refresh_safe_status: Whether to read the collateral type and safes from the chain first
+        Returns:
+            Liquidatable safes, each with the `delta_debt` and `delta_collateral` its liquidation would confiscate
+        """
+        assert isinstance(collateral_type, CollateralType)
+        assert isinstance(safes, list)
+
         if refresh_safe_status == True:
             collateral_type = self.safe_engine.collateral_type(collateral_type.name)
-            safe = self.safe_engine.safe(collateral_type, safe.address)
+            safes = self.safe_engine.safes_batch(collateral_type, [safe.address for safe in safes])
 
         rate = collateral_type.accumulated_rate
 
         # Collateral value should be less than the product of our stablecoin debt and the debt multiplier
-        is_critical = (Ray(safe.locked_collateral) * collateral_type.liquidation_price) < Ray(safe.generated_debt) * rate
-        if not is_critical:
-            return False
+        critical = [safe for safe in safes
+                    if (Ray(safe.locked_collateral) * collateral_type.liquidation_price) < Ray(safe.generated_debt) * rate]
+        if len(critical) == 0:
+            return []
 
-        # Ensure there's room
         on_auction_system_coin_limit: Rad = self.on_auction_system_coin_limit()
         current_on_auction_system_coins: Rad = self.current_on_auction_system_coins()
-        room: Rad = on_auction_system_coin_limit - current_on_auction_system_coins
-        if current_on_auction_system_coins >= on_auction_system_coin_limit:
-            logger.debug(f"liquidating {safe.address} would exceed maximum system coin out for liquidation")
-            return False
-        if room < collateral_type.debt_floor:
-            return False
-
-        # Prevent null auction (collateral_type.liquidation_quantity [Rad],
-        # collateral_type.accumulated_rate [Ray], collateral_type.liquidation_penalty [Wad])
-        delta_debt: Wad = min(safe.generated_debt, Wad(min(self.liquidation_quantity(collateral_type), room) / Rad(rate) / Rad(self.liquidation_penalty(collateral_type))))
-        delta_collateral: Wad = min(safe.locked_collateral, safe.locked_collateral * delta_debt / safe.generated_debt)
-
-        return delta_debt > Wad(0) and delta_collateral > Wad(0)
+        (_, liquidation_penalty, liquidation_quantity) = self._contract.functions.collateralTypes(collateral_type.toBytes()).call()
+        liquidation_penalty = Wad(liquidation_penalty)
+        liquidation_quantity = Rad(liquidation_quantity)
+
+        liquidatable = []
+        for safe in critical:
+            # Ensure there's room
+            room: Rad = on_auction_system_coin_limit - current_on_auction_system_coins
+            if current_on_auction_system_coins >= on_auction_system_coin_limit:
+                logger.debug(f"liquidating {safe.address} would exceed maximum system coin out for liquidation")
+                break
+            if room < collateral_type.debt_floor:
+                break
+
+            # Prevent null auction (collateral_type.liquidation_quantity [Rad],
+            # collateral_type.accumulated_rate [Ray], collateral_type.liquidation_penalty [Wad])
+            delta_debt: Wad = min(safe.generated_debt, Wad(min(liquidation_quantity, room) / Rad(rate) / Rad(liquidation_penalty)))
+            delta_collateral: Wad = min(safe.locked_collateral, safe.locked_collateral * delta_debt / safe.generated_debt)
+
+            if delta_debt > Wad(0) and delta_collateral > Wad(0):
+                liquidatable.append((safe, delta_debt, delta_collateral))
+                current_on_auction_system_coins += Rad(delta_debt) * Rad(rate) * Rad(liquidation_penalty)
+
+        return liquidatable
 
     def liquidate_safe(self, collateral_type: CollateralType, safe: SAFE) -> Transact:
         """ Initiate liquidation of a SAFE, starting a collateral auction
@@ -27,6 +27,7 @@ from web3 import Web3
 from web3.exceptions import BlockNotFound, BlockNumberOutofRange
 
 from pyflex import register_filter_thread, any_filter_thread_present, stop_all_filter_threads, all_filter_threads_alive
+from pyflex.blocks import block_cache
 from pyflex.util import AsyncCallback
 
 NUM_GETBLOCK_ATTEMPTS = 3
@@ -331,11 +332,13 @@ class Lifecycle:
     def _start_watching_blocks(self):
         def new_block_callback(block_hash):
             self._last_block_time = datetime.datetime.now(tz=pytz.UTC)
-            block = self.web3.eth.getBlock(block_hash)
+            block = block_cache(self.web3).get_block(block_hash)
             block_number = block['number']
             if not self.web3.eth.syncing:
                 max_block_number = self.web3.eth.blockNumber
                 if block_number >= max_block_number:
+                    block_cache(self.web3).observe(block)
+
                     def on_start():
                         self.logger.debug(f"Processing block #{block_number} ({block_hash.hex()})")
 
@@ -0,0 +1,327 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+from hexbytes import HexBytes
+from web3 import Web3, HTTPProvider
+from web3._utils.method_formatters import receipt_formatter
+from web3._utils.request import make_post_request
+from web3.datastructures import AttributeDict
+from web3.exceptions import TransactionNotFound
+
+from pyflex.blocks import block_cache
+
+
+class TransactionTracker:
+    """Polls the node on behalf of all transactions in flight from the same `Web3` instance.
+
+    Account nonces and transaction receipts are read at most once per block: the first transaction asking for them
+    in a new block reads them for everybody. Receipts of all transactions being watched are read together, as a
+    JSON-RPC batch when the node accepts one.
+
+    Attributes:
+        web3: An instance of `Web` from `web3.py`.
+        poll_interval: Minimum number of seconds between checks for a new block.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, web3: Web3, poll_interval: float = 0.25):
+        assert isinstance(web3, Web3)
+        assert isinstance(poll_interval, (int, float))
+
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._block_number = None
+        self._block_checked_at = 0.0
+        self._counts = {}
+        self._counts_block = None
+        self._receipts = {}
+        self._receipts_block = None
+        self._watched = set()
+
+    def block_number(self) -> int:
+        """Returns the latest block number, checking for a new block at most once per `poll_interval`"""
+        with self._lock:
+            if self._block_number is None or time.monotonic() - self._block_checked_at >= self.poll_interval:
+                self._block_number = block_cache(self.web3).block_number()
+                self._block_checked_at = time.monotonic()
+            return self._block_number
+
+    def transaction_count(self, account: str) -> int:
+        """Returns the number of transactions from `account` mined as of the latest block"""
+        assert isinstance(account, str)
+
+        with self._lock:
+            block_number = self.block_number()
+            if self._counts_block != block_number:
+                self._counts = {}
+                self._counts_block = block_number
+            if account not in self._counts:
+                self._counts[account] = self.web3.eth.getTransactionCount(account)
+            return self._counts[account]
+
+    def receipt(self, tx_hash, refresh: bool = False) -> Optional[AttributeDict]:
+        """Returns the receipt of a mined transaction, or `None` if it has not been mined.
+
+        The transaction is watched until `forget` is called, and its receipt read along with those of all other
+        watched transactions.
+
+        Args:
+            tx_hash: Hash of the transaction.
+            refresh: Read the receipt again even if it was found missing in the latest block.
+        """
+        tx_hash = HexBytes(tx_hash)
+        with self._lock:
+            self._watched.add(tx_hash)
+            block_number = self.block_number()
+            if self._receipts_block != block_number:
+                self._receipts = {}
+                self._receipts_block = block_number
+            elif refresh and self._receipts.get(tx_hash, False) is None:
+                del self._receipts[tx_hash]
+
+            if tx_hash not in self._receipts:
+                missing = [watched for watched in self._watched if watched not in self._receipts]
+                self._receipts.update(self._read_receipts(missing))
+            return self._receipts.get(tx_hash)
+
+    def forget(self, tx_hashes: List):
+        """Stops watching transactions which are no longer in flight"""
+        assert isinstance(tx_hashes, list)
+
+        with self._lock:
+            self._watched.difference_update(HexBytes(tx_hash) for tx_hash in tx_hashes)
+
+    def _read_receipts(self, tx_hashes: List[HexBytes]) -> Dict[HexBytes, Optional[AttributeDict]]:
+        receipts = self._read_receipts_batch(tx_hashes)
+        if receipts is not None:
+            return receipts
+
+        receipts = {}
+        for tx_hash in tx_hashes:
+            try:
+                receipts[tx_hash] = self.web3.eth.getTransactionReceipt(tx_hash)
+            except (TransactionNotFound, ValueError, KeyError):
+                receipts[tx_hash] = None
+        return receipts
+
+    def _read_receipts_batch(self, tx_hashes: List[HexBytes]) -> Optional[Dict[HexBytes, Optional[AttributeDict]]]:
+        provider = self.web3.manager.provider
+        if not isinstance(provider, HTTPProvider) or len(tx_hashes) < 2:
+            return None
+
+        payload = [{'jsonrpc': '2.0', 'method': 'eth_getTransactionReceipt', 'params': [tx_hash.hex()], 'id': index}
+                   for index, tx_hash in enumerate(tx_hashes)]
+        try:
+            response = json.loads(make_post_request(provider.endpoint_uri, json.dumps(payload).encode('utf-8'),
+                                                    **dict(provider.get_request_kwargs())))
+        except Exception as e:
+            self.logger.debug(f"Batched receipt request failed: {e}")
+            return None
+        if not isinstance(response, list):
+            self.logger.debug(f"Node rejected JSON-RPC batch: {response}")
+            return None
+
+        results = {item.get('id'): item for item in response}
+        receipts = {}
+        for index, tx_hash in enumerate(tx_hashes):
+            result = results.get(index, {}).get('result')
+            receipts[tx_hash] = AttributeDict.recursive(receipt_formatter(result)) if result else None
+        return receipts
+
+
+class NonceManager:
+    """Hands out nonces for all transactions sent from the same `Web3` instance without asking the node each time.
+
+    The next nonce of each account is read from the node once, when the account sends its first transaction.
+    Nonces are then allocated locally and held by their transactions until they finish. Once per block the
+    allocations are reconciled with the number of transactions mined from the account: nonces the chain has
+    already used are retired, and nonces which are neither mined nor held by a transaction in flight (because
+    sending failed or the transaction was dropped) are handed out again before any new nonce. Transactions
+    holding a nonce can ask whether the node has dropped them, so they send themselves again.
+
+    Attributes:
+        web3: An instance of `Web` from `web3.py`.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, web3: Web3):
+        assert isinstance(web3, Web3)
+
+        self.web3 = web3
+        self._lock = threading.RLock()
+        self._first = {}
+        self._next = {}
+        self._held = {}
+        self._reconciled = {}
+        self._gaps = {}
+        self._dropped_checks = {}
+
+    def allocate(self, account: str, seed: Callable[[], int]) -> int:
+        """Allocates a nonce to a new transaction from `account`.
+
+        Args:
+            account: Address the transaction is sent from.
+            seed: Reads the next nonce of `account` from the node; only called for the first allocation.
+        """
+        assert isinstance(account, str)
+        assert callable(seed)
+
+        with self._lock:
+            if account not in self._next:
+                self._first[account] = self._next[account] = seed()
+                self._held.setdefault(account, {})
+                self.logger.debug(f"Nonces for {account} will be allocated starting from {self._next[account]}")
+
+            gaps = self._reconcile(account)
+            if gaps:
+                nonce = gaps.pop(0)
+                self.logger.info(f"Reusing nonce={nonce} of {account} which was not mined")
+            else:
+                nonce = self._next[account]
+                self._next[account] = nonce + 1
+            self.hold(account, nonce)
+            return nonce
+
+    def hold(self, account: str, nonce: int):
+        """Marks `nonce` as used by a transaction in flight, i.e. a replacement taking over its nonce"""
+        assert isinstance(account, str)
+        assert isinstance(nonce, int)
+
+        with self._lock:
+            held = self._held.setdefault(account, {})
+            held[nonce] = held.get(nonce, 0) + 1
+
+    def release(self, account: str, nonce: int):
+        """Called when a transaction holding `nonce` finishes, whether it has been mined or not"""
+        assert isinstance(account, str)
+        assert isinstance(nonce, int)
+
+        with self._lock:
+            held = self._held.get(account, {})
+            if nonce in held:
+                held[nonce] -= 1
+                if held[nonce] == 0:
+                    del held[nonce]
+                    self._dropped_checks.pop((account, nonce), None)
+            # Gaps are otherwise only worked out once per block, so the freed nonce would not be reused until the next
+            self._gaps.pop(account, None)
+
+    def dropped(self, account: str, nonce: int, tx_hashes: List) -> bool:
+        """Tells whether the node has dropped all transactions sent with a held `nonce`, so it will never be mined.
+
+        It is the case when `nonce` has not been mined yet, and none of `tx_hashes` is known to the node any more.
+        The node is asked at most once per block, and not before a block has passed since the first question,
+        so transactions which have just been sent have time to reach it.
+
+        Args:
+            account: Address the transactions were sent from.
+            nonce: Nonce the transactions were sent with.
+            tx_hashes: Hashes of all transactions sent with `nonce`.
+        """
+        assert isinstance(account, str)
+        assert isinstance(nonce, int)
+        assert isinstance(tx_hashes, list)
+
+        if len(tx_hashes) == 0:
+            return False
+
+        tracker = transaction_tracker(self.web3)
+        block_number = tracker.block_number()
+        with self._lock:
+            checked_at = self._dropped_checks.get((account, nonce))
+            self._dropped_checks[(account, nonce)] = block_number
+            if checked_at is None or checked_at == block_number:
+                return False
+
+        if tracker.transaction_count(account) > nonce:
+            return False
+
+        for tx_hash in tx_hashes:
+            try:
+                if self.web3.eth.getTransaction(HexBytes(tx_hash)) is not None:
+                    return False
+            except TransactionNotFound:
+                pass
+
+        self.logger.warning(f"Node no longer knows of any transaction from {account} with nonce={nonce}")
+        return True
+
+    def reset(self, account: str):
+        """Forgets the nonces of `account`, so the next allocation reads it from the node again.
+
+        Used when the node rejects a nonce, i.e. when another process has sent transactions from `account`.
+        """
+        assert isinstance(account, str)
+
+        with self._lock:
+            self._first.pop(account, None)
+            self._next.pop(account, None)
+            self._reconciled.pop(account, None)
+            self._gaps.pop(account, None)
+            self._dropped_checks = {key: value for key, value in self._dropped_checks.items() if key[0] != account}
+
+    def _reconcile(self, account: str) -> List[int]:
+        tracker = transaction_tracker(self.web3)
+        block_number = tracker.block_number()
+        if self._reconciled.get(account) == block_number and account in self._gaps:
+            return self._gaps[account]
+
+        mined = tracker.transaction_count(account)
+        if mined > self._next[account]:
+            self.logger.debug(f"Nonce of {account} advanced to {mined} outside of this process")
+            self._next[account] = mined
+        # Nonces below the one read from the node may belong to transactions sent by other processes
+        self._gaps[account] = [nonce for nonce in range(max(mined, self._first[account]), self._next[account])
+                               if nonce not in self._held[account]]
+        self._reconciled[account] = block_number
+        return self._gaps[account]
+
+
+transaction_trackers = WeakKeyDictionary()
+transaction_trackers_lock = threading.Lock()
+
+
+def transaction_tracker(web3: Web3) -> TransactionTracker:
+    """Returns the transaction tracker shared by all users of `web3`."""
+    assert isinstance(web3, Web3)
+
+    with transaction_trackers_lock:
+        if web3 not in transaction_trackers:
+            transaction_trackers[web3] = TransactionTracker(web3)
+        return transaction_trackers[web3]
+
+
+nonce_managers = WeakKeyDictionary()
+nonce_managers_lock = threading.Lock()
+
+
+def nonce_manager(web3: Web3) -> NonceManager:
+    """Returns the nonce manager shared by all users of `web3`."""
+    assert isinstance(web3, Web3)
+
+    with nonce_managers_lock:
+        if web3 not in nonce_managers:
+            nonce_managers[web3] = NonceManager(web3)
+        return nonce_managers[web3]
@@ -16,6 +16,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import concurrent.futures
+import functools
 import logging
 import threading
 
@@ -43,14 +45,113 @@ def http_response_summary(response) -> str:
     return f"{response.status_code} {response.reason} ({text})"
 
 
-# CAUTION: Used by Transact class, this breaks applications running their own asyncio event loop.
-def synchronize(futures) -> list:
-    if len(futures) > 0:
-        loop = asyncio.new_event_loop()
+class AsyncExecutor:
+    """Runs coroutines on a single asyncio event loop, owned by a long-lived thread of its own.
+
+    Coroutines can be submitted from any thread. The loop thread is started by the first submission and then runs
+    for the life of the process. Blocking calls made by coroutines, such as JSON-RPC requests, should go through
+    `run_blocking` so they do not hold up every other coroutine on the loop.
+    """
+    logger = logging.getLogger()
+    thread_name = 'pyflex-async-executor'
+
+    def __init__(self, blocking_workers: int = 32):
+        assert isinstance(blocking_workers, int)
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pending = 0
+        self.blocking_executor = concurrent.futures.ThreadPoolExecutor(max_workers=blocking_workers,
+                                                                       thread_name_prefix=f"{self.thread_name}-rpc")
+
+    def submit(self, coroutine) -> concurrent.futures.Future:
+        """Schedules a coroutine on the event loop and returns a future of its result."""
+        assert asyncio.iscoroutine(coroutine)
+
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, args=(self._loop,), name=self.thread_name, daemon=True)
+                self._thread.start()
+            self._pending += 1
+            future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+        future.add_done_callback(self._done)
+        return future
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted coroutines which have not finished yet."""
+        with self._lock:
+            return self._pending
+
+    def owns(self, thread: threading.Thread) -> bool:
+        """Tells whether a thread is the loop thread or one of the blocking call workers of an executor."""
+        assert isinstance(thread, threading.Thread)
+
+        return thread.name.startswith(self.thread_name)
+
+    def run(self, coroutines: list) -> list:
+        """Runs coroutines concurrently on the event loop and waits for all of their results."""
+        assert isinstance(coroutines, list)
+
+        async def gather():
+            return await asyncio.gather(*coroutines)
+
+        if threading.current_thread() is self._thread:
+            # Blocking the event loop on itself would never return, so wait on a loop of its own instead
+            outcome = {}
+
+            def run_on_own_loop():
+                loop = asyncio.new_event_loop()
+                try:
+                    outcome['result'] = loop.run_until_complete(gather())
+                except BaseException as e:
+                    outcome['error'] = e
+                finally:
+                    loop.close()
+
+            thread = threading.Thread(target=run_on_own_loop)
+            thread.start()
+            thread.join()
+            if 'error' in outcome:
+                raise outcome['error']
+            return outcome['result']
+
+        return self.submit(gather()).result()
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    @staticmethod
+    def _run(loop):
+        asyncio.set_event_loop(loop)
         try:
-            return loop.run_until_complete(asyncio.gather(*futures, loop=loop))
+            loop.run_forever()
         finally:
             loop.close()
+
+
+async_executor = AsyncExecutor()
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Runs a blocking call, such as a JSON-RPC request, on a worker thread and waits for its result.
+
+    The event loop keeps running other coroutines in the meantime.
+    """
+    assert callable(function)
+
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(async_executor.blocking_executor, functools.partial(function, *args, **kwargs))
+
+
+def synchronize(futures) -> list:
+    """Runs coroutines on the shared `async_executor` loop and waits for their results."""
+    if len(futures) > 0:
+        return async_executor.run(futures)
     else:
         return []
 
@@ -917,6 +917,8 @@ class TestIncreasingDiscountCollateralAuctionHouse:
         assert current_bid.amount_to_raise > Rad(0)
         assert current_bid.raised_amount == Rad(0)
         assert current_bid.sold_amount == Wad(0)
+        batched_bid = increasing_collateral_auction_house.bids_batch([auction_id])[0]
+        assert vars(batched_bid) == vars(current_bid)
 
         log = increasing_collateral_auction_house.past_logs(1)[0]
         assert isinstance(log, IncreasingDiscountCollateralAuctionHouse.StartAuctionLog)
@@ -924,7 +926,7 @@ class TestIncreasingDiscountCollateralAuctionHouse:
         assert log.initial_bid == Rad(0)
         assert log.amount_to_sell == current_bid.amount_to_sell
         assert log.amount_to_raise == current_bid.amount_to_raise
-        assert log.auction_deadline == current_bid.auction_deadline
+        assert log.discount_increase_deadline == current_bid.discount_increase_deadline
         assert log.forgone_collateral_receiver == deployment_address
         assert log.auction_income_recipient == geb.accounting_engine.address
 
@@ -0,0 +1,151 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import Mock
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from pyflex.blocks import BlockCache, block_cache
+
+
+def header(number: int, fork: int = 0) -> dict:
+    return {'number': number,
+            'hash': HexBytes((number * 100 + fork).to_bytes(32, 'big')),
+            'parentHash': HexBytes(((number - 1) * 100 + fork).to_bytes(32, 'big')),
+            'timestamp': 1000 + number}
+
+
+def mocked_web3(head: int) -> Web3:
+    web3 = Mock(spec=Web3)
+    web3.eth = Mock()
+
+    def get_block(block_identifier):
+        if block_identifier == 'latest':
+            return header(head)
+        if isinstance(block_identifier, bytes):
+            return header(int.from_bytes(block_identifier, 'big') // 100, int.from_bytes(block_identifier, 'big') % 100)
+        return header(block_identifier)
+
+    web3.eth.getBlock.side_effect = get_block
+    return web3
+
+
+class TestBlockCache:
+    def test_caches_headers_by_number_and_hash(self):
+        # given
+        web3 = mocked_web3(head=10)
+        cache = BlockCache(web3)
+
+        # when
+        assert cache.block_time(5) == 1005
+        assert cache.get_block(5) == header(5)
+        assert cache.get_block(header(5)['hash']) == header(5)
+
+        # then
+        assert web3.eth.getBlock.call_count == 1
+
+    def test_serves_latest_only_when_observed(self):
+        # given
+        web3 = mocked_web3(head=10)
+        cache = BlockCache(web3)
+
+        # then
+        assert cache.block_number() == 10
+        assert cache.block_number() == 10
+        assert web3.eth.getBlock.call_count == 2
+
+        # when
+        cache.observe(header(11))
+
+        # then
+        assert cache.block_number() == 11
+        assert cache.get_block(11) == header(11)
+        assert web3.eth.getBlock.call_count == 2
+
+    def test_latest_expires(self):
+        # given
+        web3 = mocked_web3(head=12)
+        cache = BlockCache(web3, latest_ttl=0)
+
+        # when
+        cache.observe(header(11))
+
+        # then
+        assert cache.block_number() == 12
+
+    def test_latest_expires_within_a_block_by_default(self):
+        # given
+        web3 = mocked_web3(head=12)
+        cache = BlockCache(web3)
+
+        # then
+        assert cache.latest_ttl < 12
+
+    def test_evicts_least_recently_used(self):
+        # given
+        web3 = mocked_web3(head=10)
+        cache = BlockCache(web3, size=2)
+        cache.get_block(1)
+        cache.get_block(2)
+        cache.get_block(1)
+
+        # when
+        cache.get_block(3)
+
+        # then
+        cache.get_block(1)
+        assert web3.eth.getBlock.call_count == 3
+        cache.get_block(2)
+        assert web3.eth.getBlock.call_count == 4
+
+    def test_drops_headers_replaced_by_reorg(self):
+        # given
+        web3 = mocked_web3(head=10)
+        cache = BlockCache(web3)
+        for number in range(7, 11):
+            cache.observe(header(number))
+
+        # when a block from another fork becomes head
+        fork_head = dict(header(9, fork=1), parentHash=header(8)['hash'])
+        cache.observe(fork_head)
+
+        # then
+        assert cache.get_block(9) == fork_head
+        assert cache.get_block(8) == header(8)
+        assert web3.eth.getBlock.call_count == 0
+        assert cache.get_block(header(10)['hash']) == header(10)
+        assert web3.eth.getBlock.call_count == 1
+
+    def test_clears_cache_when_head_does_not_extend_it(self):
+        # given
+        web3 = mocked_web3(head=10)
+        cache = BlockCache(web3)
+        for number in range(7, 10):
+            cache.observe(header(number))
+
+        # when
+        cache.observe(header(10, fork=1))
+
+        # then
+        cache.get_block(8)
+        assert web3.eth.getBlock.call_count == 1
+
+    def test_shared_per_web3(self):
+        web3 = mocked_web3(head=10)
+        assert block_cache(web3) is block_cache(web3)
+        assert block_cache(web3) is not block_cache(mocked_web3(head=10))
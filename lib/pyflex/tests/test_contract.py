@@ -0,0 +1,106 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from unittest.mock import patch
+
+import pytest
+from eth_abi import encode_abi
+from web3 import HTTPProvider, Web3
+
+from pyflex import Contract
+
+ABI = [{'type': 'function', 'name': 'bids', 'stateMutability': 'view',
+        'inputs': [{'name': 'id', 'type': 'uint256'}],
+        'outputs': [{'name': 'amount', 'type': 'uint256'}, {'name': 'bidder', 'type': 'address'}]}]
+BIDDER = '0x' + '11' * 20
+
+
+def encoded(id: int) -> str:
+    return '0x' + encode_abi(['uint256', 'address'], [id * 10, BIDDER]).hex()
+
+
+class TestBatchCall:
+    def setup_method(self):
+        self.web3 = Web3(HTTPProvider('http://localhost:8555'))
+        self.contract = self.web3.eth.contract(address=Web3.toChecksumAddress('0x' + '22' * 20), abi=ABI)
+
+    def batch_call(self, ids: list) -> list:
+        return Contract()._batch_call(self.contract, 'bids', [[id] for id in ids])
+
+    def response(self, results: dict) -> bytes:
+        def post(endpoint_uri, data, **kwargs):
+            payload = json.loads(data)
+            return json.dumps([results[item['id']](item) for item in reversed(payload)]).encode('utf-8')
+        return post
+
+    def test_should_order_results_by_id(self):
+        # given
+        def result(id):
+            return lambda item: {'jsonrpc': '2.0', 'id': item['id'], 'result': encoded(id)}
+
+        # when
+        with patch('pyflex.make_post_request', side_effect=self.response({0: result(1), 1: result(2), 2: result(3)})):
+            results = self.batch_call([1, 2, 3])
+
+        # then
+        assert results == [[10, BIDDER], [20, BIDDER], [30, BIDDER]]
+
+    def test_should_call_failed_entries_on_their_own(self):
+        # given
+        def result(item):
+            return {'jsonrpc': '2.0', 'id': item['id'], 'result': encoded(1)}
+
+        def error(item):
+            return {'jsonrpc': '2.0', 'id': item['id'], 'error': {'code': -32000, 'message': 'header not found'}}
+
+        # when
+        with patch('pyflex.make_post_request', side_effect=self.response({0: result, 1: error})), \
+                patch.object(self.web3.eth, 'call', return_value=bytes.fromhex(encoded(2)[2:])) as call:
+            results = self.batch_call([1, 2])
+
+        # then
+        assert results == [[10, BIDDER], [20, BIDDER]]
+        assert call.call_count == 1
+        assert call.call_args[0][0]['data'] == self.contract.encodeABI(fn_name='bids', args=[2])
+
+    def test_should_raise_when_a_failed_entry_fails_again(self):
+        # given
+        def error(item):
+            return {'jsonrpc': '2.0', 'id': item['id'], 'error': {'code': 3, 'message': 'execution reverted'}}
+
+        # when
+        with patch('pyflex.make_post_request', side_effect=self.response({0: error})), \
+                patch.object(self.web3.eth, 'call', side_effect=ValueError('execution reverted')):
+            # then
+            with pytest.raises(ValueError):
+                self.batch_call([1])
+
+    def test_should_call_one_by_one_when_node_rejects_batches(self):
+        # given
+        rejection = json.dumps({'jsonrpc': '2.0', 'id': None,
+                                'error': {'code': -32600, 'message': 'batch requests are not supported'}})
+
+        # when
+        with patch('pyflex.make_post_request', return_value=rejection.encode('utf-8')), \
+                patch.object(self.web3.eth, 'call', side_effect=lambda call, block_identifier:
+                             bytes.fromhex(encoded(int(call['data'][-64:], 16))[2:])) as call:
+            results = self.batch_call([1, 2])
+
+        # then
+        assert results == [[10, BIDDER], [20, BIDDER]]
+        assert call.call_count == 2
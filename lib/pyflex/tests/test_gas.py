@@ -17,7 +17,7 @@
 
 import pytest
 
-from pyflex.gas import DefaultGasPrice, FixedGasPrice, GasPrice, GeometricGasPrice, IncreasingGasPrice
+from pyflex.gas import DefaultGasPrice, FixedGasPrice, GasLimits, GasPrice, GeometricGasPrice, IncreasingGasPrice
 
 
 class TestGasPrice:
@@ -209,3 +209,29 @@ class TestGeometricGasPrice:
 
         with pytest.raises(AssertionError):
             GeometricGasPrice(1000, 60, 1.125, -1)
+
+
+class TestGasLimits:
+    def test_should_not_offer_a_limit_until_learned(self):
+        gas_limits = GasLimits(margin=1.5, samples=4, min_samples=2)
+        assert gas_limits.limit('buy') is None
+
+        gas_limits.learn('buy', 100000)
+        assert gas_limits.limit('buy') is None
+
+        gas_limits.learn('buy', 80000)
+        assert gas_limits.limit('buy') == 150000
+        assert gas_limits.limit('sell') is None
+
+    def test_should_only_remember_recent_transactions(self):
+        gas_limits = GasLimits(margin=1, samples=2, min_samples=1)
+        gas_limits.learn('buy', 100000)
+        gas_limits.learn('buy', 80000)
+        gas_limits.learn('buy', 90000)
+        assert gas_limits.limit('buy') == 90000
+
+    def test_should_estimate_again_after_forgetting(self):
+        gas_limits = GasLimits(min_samples=1)
+        gas_limits.learn('buy', 100000)
+        gas_limits.forget('buy')
+        assert gas_limits.limit('buy') is None
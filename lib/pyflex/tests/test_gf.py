@@ -210,6 +210,11 @@ def liquidate(web3: Web3, geb: GfDeployment, our_address: Address):
 
     # Liquidate the SAFE
     assert geb.liquidation_engine.can_liquidate(collateral.collateral_type, SAFE(our_address))
+    [(safe, delta_debt, delta_collateral)] = geb.liquidation_engine.can_liquidate_many(collateral.collateral_type,
+                                                                                       [SAFE(our_address)])
+    assert safe.address == our_address
+    assert Wad(0) < delta_debt <= safe.generated_debt
+    assert Wad(0) < delta_collateral <= safe.locked_collateral
 
     assert geb.liquidation_engine.liquidate_safe(collateral.collateral_type, SAFE(our_address)).transact()
 
@@ -353,6 +358,18 @@ class TestSAFEEngine:
         safe_from_bytes = safe.fromBytes(safe_bytes)
         assert safe_from_bytes.address == safe.address
 
+    def test_safes_batch(self, geb, our_address, other_address):
+        collateral_type = geb.collaterals['ETH-A'].collateral_type
+        addresses = [our_address, other_address]
+
+        safes = geb.safe_engine.safes_batch(collateral_type, addresses, batch_size=1, parallelism=2)
+
+        assert [safe.address for safe in safes] == addresses
+        for safe in safes:
+            expected = geb.safe_engine.safe(collateral_type, safe.address)
+            assert safe.locked_collateral == expected.locked_collateral
+            assert safe.generated_debt == expected.generated_debt
+
     def test_modify_safe_collateralization_noop(self, geb, our_address):
         # given
         collateral = geb.collaterals['ETH-A']
@@ -533,6 +550,7 @@ class TestSAFEEngine:
         assert collateral.adapter.join(our_address, Wad.from_number(60)).transact()
         assert geb.safe_engine.modify_safe_collateralization(collateral.collateral_type, our_address, Wad.from_number(60), Wad.from_number(20)).transact()
         safe_before = geb.safe_engine.safe(collateral.collateral_type, other_address)
+        from_block = geb.web3.eth.blockNumber
 
         # when
         assert geb.safe_engine.transfer_safe_collateral_and_debt(collateral.collateral_type, our_address, other_address, Wad.from_number(3), Wad.from_number(20)).transact()
@@ -542,6 +560,15 @@ class TestSAFEEngine:
         assert safe_before.locked_collateral + Wad.from_number(3) == safe_after.locked_collateral
         assert safe_before.generated_debt + Wad.from_number(20) == safe_after.generated_debt
 
+        # and
+        events = geb.safe_engine.past_safe_events(from_block, collateral_type=collateral.collateral_type)
+        assert len(events) == 1
+        assert isinstance(events[0], SAFEEngine.LogTransferSAFECollateralAndDebt)
+        assert events[0].src == our_address
+        assert events[0].dst == other_address
+        assert events[0].dst_locked_collateral == safe_after.locked_collateral
+        assert events[0].dst_generated_debt == safe_after.generated_debt
+
         # rollback
         cleanup_safe(geb, collateral, our_address)
 
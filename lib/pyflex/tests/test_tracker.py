@@ -0,0 +1,226 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import Mock
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from pyflex.tracker import NonceManager, TransactionTracker, transaction_tracker
+
+
+def mocked_web3(head: list, mined: dict) -> Web3:
+    web3 = Mock(spec=Web3)
+    web3.eth = Mock()
+    web3.manager = Mock()
+
+    def get_receipt(tx_hash):
+        if HexBytes(tx_hash) not in mined:
+            raise TransactionNotFound(tx_hash)
+        return mined[HexBytes(tx_hash)]
+
+    web3.eth.getBlock.side_effect = lambda block_identifier: {'number': head[0],
+                                                              'hash': HexBytes(head[0].to_bytes(32, 'big')),
+                                                              'timestamp': 1000 + head[0]}
+    web3.eth.getTransactionCount.side_effect = lambda account: head[0]
+    web3.eth.getTransactionReceipt.side_effect = get_receipt
+    return web3
+
+
+class TestTransactionTracker:
+    def test_reads_transaction_count_once_per_block(self):
+        # given
+        head = [10]
+        web3 = mocked_web3(head, {})
+        tracker = TransactionTracker(web3, poll_interval=0)
+
+        # when
+        assert tracker.transaction_count('0x01') == 10
+        assert tracker.transaction_count('0x01') == 10
+
+        # then
+        assert web3.eth.getTransactionCount.call_count == 1
+
+        # when
+        head[0] = 11
+
+        # then
+        assert tracker.transaction_count('0x01') == 11
+        assert web3.eth.getTransactionCount.call_count == 2
+
+    def test_reads_receipts_of_all_watched_transactions_together(self):
+        # given
+        mined = {}
+        head = [10]
+        web3 = mocked_web3(head, mined)
+        tracker = TransactionTracker(web3, poll_interval=0)
+        first, second = HexBytes('0x' + '01' * 32), HexBytes('0x' + '02' * 32)
+        assert tracker.receipt(first) is None
+        assert tracker.receipt(second) is None
+        assert web3.eth.getTransactionReceipt.call_count == 2
+
+        # when
+        mined[first] = {'status': 1}
+        head[0] = 11
+
+        # then
+        assert tracker.receipt(first) == {'status': 1}
+        assert tracker.receipt(second) is None
+        assert web3.eth.getTransactionReceipt.call_count == 4
+
+    def test_forgotten_transactions_are_no_longer_read(self):
+        # given
+        head = [10]
+        web3 = mocked_web3(head, {})
+        tracker = TransactionTracker(web3, poll_interval=0)
+        first, second = HexBytes('0x' + '01' * 32), HexBytes('0x' + '02' * 32)
+        tracker.receipt(first)
+        tracker.receipt(second)
+
+        # when
+        tracker.forget([second])
+        head[0] = 11
+        tracker.receipt(first)
+
+        # then
+        assert web3.eth.getTransactionReceipt.call_count == 3
+
+    def test_refresh_reads_missing_receipt_again(self):
+        # given
+        web3 = mocked_web3([10], {})
+        tracker = TransactionTracker(web3, poll_interval=0)
+        tx_hash = HexBytes('0x' + '01' * 32)
+        tracker.receipt(tx_hash)
+
+        # when
+        tracker.receipt(tx_hash)
+        tracker.receipt(tx_hash, refresh=True)
+
+        # then
+        assert web3.eth.getTransactionReceipt.call_count == 2
+
+
+class TestNonceManager:
+    def test_allocates_nonces_without_asking_the_node(self):
+        # given
+        web3 = mocked_web3([10], {})
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        seed = Mock(return_value=10)
+
+        # when
+        nonces = [manager.allocate('0x01', seed) for _ in range(3)]
+
+        # then
+        assert nonces == [10, 11, 12]
+        assert seed.call_count == 1
+        assert web3.eth.getTransactionCount.call_count == 1
+
+    def test_reuses_nonces_which_were_released_before_being_mined(self):
+        # given
+        head = [10]
+        web3 = mocked_web3(head, {})
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        nonces = [manager.allocate('0x01', lambda: 10) for _ in range(3)]
+
+        # when
+        manager.release('0x01', nonces[1])
+        head[0] = 11
+
+        # then
+        assert manager.allocate('0x01', lambda: 10) == 11
+        assert manager.allocate('0x01', lambda: 10) == 13
+
+    def test_replacements_keep_their_nonce_held(self):
+        # given
+        head = [10]
+        web3 = mocked_web3(head, {})
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        nonce = manager.allocate('0x01', lambda: 10)
+        manager.hold('0x01', nonce)
+
+        # when
+        manager.release('0x01', nonce)
+        head[0] = 11
+
+        # then
+        assert manager.allocate('0x01', lambda: 10) == 11
+
+    def test_follows_the_chain_when_it_moves_ahead(self):
+        # given
+        head = [10]
+        web3 = mocked_web3(head, {})
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        assert manager.allocate('0x01', lambda: 10) == 10
+
+        # when
+        head[0] = 15
+
+        # then
+        assert manager.allocate('0x01', lambda: 10) == 15
+
+    def test_reset_reads_the_nonce_from_the_node_again(self):
+        # given
+        web3 = mocked_web3([10], {})
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        assert manager.allocate('0x01', lambda: 10) == 10
+
+        # when
+        manager.reset('0x01')
+
+        # then
+        assert manager.allocate('0x01', lambda: 20) == 20
+
+    def test_reuses_a_released_nonce_within_the_same_block(self):
+        # given
+        web3 = mocked_web3([10], {})
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        nonces = [manager.allocate('0x01', lambda: 10) for _ in range(3)]
+
+        # when
+        manager.release('0x01', nonces[1])
+
+        # then
+        assert manager.allocate('0x01', lambda: 10) == 11
+        assert manager.allocate('0x01', lambda: 10) == 13
+
+    def test_tells_when_the_node_has_dropped_a_transaction(self):
+        # given
+        head = [10]
+        web3 = mocked_web3(head, {})
+        web3.eth.getTransactionCount.side_effect = lambda account: 10
+        web3.eth.getTransaction.side_effect = lambda tx_hash: {'hash': tx_hash}
+        manager = NonceManager(web3)
+        transaction_tracker(web3).poll_interval = 0
+        nonce = manager.allocate('0x01', lambda: 10)
+        assert not manager.dropped('0x01', nonce, [b'\x01'])
+        head[0] = 11
+        assert not manager.dropped('0x01', nonce, [b'\x01'])
+
+        # when
+        web3.eth.getTransaction.side_effect = TransactionNotFound('gone')
+        head[0] = 12
+
+        # then
+        assert manager.dropped('0x01', nonce, [b'\x01'])
+        assert not manager.dropped('0x01', nonce, [b'\x01'])
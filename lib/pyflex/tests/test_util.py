@@ -16,6 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import threading
 import time
 from unittest.mock import Mock, call
 
@@ -23,7 +24,7 @@ import pytest
 from web3 import Web3
 
 from pyflex import Address
-from pyflex.util import synchronize, int_to_bytes32, bytes_to_int, bytes_to_hexstring, hexstring_to_bytes, \
+from pyflex.util import AsyncExecutor, run_blocking, synchronize, int_to_bytes32, bytes_to_int, bytes_to_hexstring, hexstring_to_bytes, \
     AsyncCallback, chain
 
 
@@ -120,6 +121,62 @@ def test_synchronize_should_pass_exceptions():
         synchronize([async_return(1), async_exception(), async_return(3)])
 
 
+def test_synchronize_should_reuse_one_event_loop_thread():
+    # given
+    async def loop_and_thread():
+        await asyncio.sleep(0.1)
+        return asyncio.get_event_loop(), threading.current_thread()
+
+    # when
+    results = synchronize([loop_and_thread(), loop_and_thread()])
+
+    # then
+    assert results[0] == results[1]
+    assert results[0][1] is not threading.current_thread()
+
+
+def test_async_executor_should_keep_one_loop_thread():
+    # given
+    executor = AsyncExecutor()
+
+    async def current_thread():
+        return threading.current_thread()
+
+    # when
+    first = executor.submit(current_thread()).result()
+    time.sleep(0.2)
+    second = executor.submit(current_thread()).result()
+
+    # then
+    assert first is second
+    assert first.is_alive()
+
+
+def test_run_blocking_should_not_block_the_loop():
+    # given
+    started = threading.Event()
+
+    async def blocked():
+        return await run_blocking(lambda: started.wait(5) and threading.current_thread())
+
+    async def unblock():
+        started.set()
+        return threading.current_thread()
+
+    # when
+    blocking_thread, loop_thread = synchronize([blocked(), unblock()])
+
+    # then
+    assert blocking_thread is not loop_thread
+
+
+def test_synchronize_should_work_from_a_coroutine_on_the_executor():
+    async def nested():
+        return synchronize([async_return(1)])
+
+    assert synchronize([nested()]) == [[1]]
+
+
 def test_int_to_bytes32():
     assert int_to_bytes32(0) == bytes([0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
                                        0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
@@ -1,7 +1,17 @@
 #!/usr/bin/env bash
+# Bids on every collateral auction the keeper sends a status for.
+# Each auction id is echoed back, so the model also works as a shared process (see --model-processes).
 
-while true; do
-  echo "{}" 
-  sleep 120
-done
+while read -r line; do
+  # A shared model process is told when an auction is no longer tracked
+  case "$line" in
+    *'"terminate"'*) continue ;;
+  esac
 
+  id=$(echo "$line" | sed -n 's/.*"id": *"\{0,1\}\([0-9][0-9]*\)"\{0,1\}.*/\1/p')
+  if [ -n "$id" ]; then
+    echo "{\"id\": \"$id\"}"
+  else
+    echo "{}"
+  fi
+done
@@ -3,6 +3,7 @@
 
 import sys
 import os
+import time
 import json
 import requests
 from pyflex.deployment import GfDeployment
@@ -21,11 +22,14 @@ Sample auction input:
 {'id': '1', 'bid_amount': '3.000000000000000000000000000000000000000000000', 'amount_to_sell': '439.000000000000000000', 'block_time': 1652104620, 'auction_deadline': 1652363564, 'price': '0.006833712984054669', 'bid_decrease': '1.030000000000000000', 'high_bidder': '0x6073E8FE874B53732b5DdD469a2De4047f33C64B', 'debt_auction_house': '0x6AcE594C5A421E468c13715AD62A183200C320a6'}
 """
 
-current_flx_usd_price = get_price()
 
 web3 = Web3(HTTPProvider(os.environ['ETH_RPC_URL']))
 geb = GfDeployment.from_node(web3, 'rai')
-redemption_price = geb.oracle_relayer.redemption_price()
+
+# A shared model process (see --model-processes) serves auctions for the keeper's whole life,
+# so prices are read again once they are older than this many seconds
+PRICE_TTL = 60
+prices_read_at = 0
 
 # FLX Price to bid
 MAXIMUM_FLX_MULTIPLIER = 0.90  # Buy FLX for 90% of current price
@@ -38,6 +42,15 @@ MY_BID_DECREASE = 1.03
 for auction_input in sys.stdin:
     auction_state = json.loads(auction_input)
 
+    # A shared model process (see --model-processes) is told when an auction is no longer tracked
+    if auction_state.get('terminate'):
+        continue
+
+    if time.time() - prices_read_at >= PRICE_TTL:
+        current_flx_usd_price = get_price()
+        redemption_price = geb.oracle_relayer.redemption_price()
+        prices_read_at = time.time()
+
     # If we are already the high bidder, do nothing
     if auction_state['high_bidder'] == os.environ['KEEPER_ADDRESS']:
         continue
@@ -61,8 +74,8 @@ for auction_input in sys.stdin:
     # Try our bid increase first
     # If price is too low, then try minimum bid increase
     if my_bid_price <= Wad.from_number(MAXIMUM_FLX_MULTIPLIER * current_flx_usd_price):
-        bid = {'price': str(my_bid_price)}
+        bid = {'id': auction_state['id'], 'price': str(my_bid_price)}
         print(json.dumps(bid), flush=True)
     elif min_bid_price <= Wad.from_number(MAXIMUM_FLX_MULTIPLIER * current_flx_usd_price):
-        bid = {'price': str(min_bid_price)}
+        bid = {'id': auction_state['id'], 'price': str(min_bid_price)}
         print(json.dumps(bid), flush=True)
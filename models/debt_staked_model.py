@@ -3,6 +3,7 @@
 
 import sys
 import os
+import time
 import json
 import requests
 from pyflex.deployment import GfDeployment
@@ -20,10 +21,13 @@ Sample auction input:
 {'id': '9', 'bid_amount': '0.000000000000000000000000001000000000000000000', 'amount_to_sell': '0.500000000000000000', 'block_time': 1656444608, 'auction_deadline': 1656440892, 'price': '0.000000000000000000', 'bid_increase': '1.050000000000000000', 'high_bidder': '0x0000000000000000000000000000000000000000', 'staked_token_auction_house': '0x63e5455824F23e1a0d6157F4C6f400A782Ab9eF1'}
 """
 
-current_flx_usd_price = get_price()
 web3 = Web3(HTTPProvider(os.environ['ETH_RPC_URL']))
 geb = GfDeployment.from_node(web3, 'rai')
-redemption_price = geb.oracle_relayer.redemption_price()
+
+# A shared model process (see --model-processes) serves auctions for the keeper's whole life,
+# so prices are read again once they are older than this many seconds
+PRICE_TTL = 60
+prices_read_at = 0
 
 #print(f"{current_flx_usd_price=}, {redemption_price=}")
 # Determines FLX Price to bid
@@ -38,6 +42,15 @@ MY_BID_INCREASE = 1.10
 for auction_input in sys.stdin:
     auction_state = json.loads(auction_input)
 
+    # A shared model process (see --model-processes) is told when an auction is no longer tracked
+    if auction_state.get('terminate'):
+        continue
+
+    if time.time() - prices_read_at >= PRICE_TTL:
+        current_flx_usd_price = get_price()
+        redemption_price = geb.oracle_relayer.redemption_price()
+        prices_read_at = time.time()
+
     # If we are already the high bidder, do nothing
     if auction_state['high_bidder'] == os.environ['KEEPER_ADDRESS']:
         continue
@@ -67,9 +80,9 @@ for auction_input in sys.stdin:
     # If price is too high, going above MAXIMUM_FLX_MULTIPLIER,  then try minimum bid increase
     if my_bid_price <= Wad.from_number(MAXIMUM_FLX_MULTIPLIER * current_flx_usd_price):
         #print(f"{my_bid_amount=}, {my_bid_price=}")
-        bid = {'price': str(my_bid_price)}
+        bid = {'id': auction_state['id'], 'price': str(my_bid_price)}
         print(json.dumps(bid), flush=True)
     elif min_bid_price <= Wad.from_number(MAXIMUM_FLX_MULTIPLIER * current_flx_usd_price):
         #print(f"{min_bid_amount=}, {min_bid_price=}")
-        bid = {'price': str(min_bid_price)}
+        bid = {'id': auction_state['id'], 'price': str(min_bid_price)}
         print(json.dumps(bid), flush=True)
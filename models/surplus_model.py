@@ -9,6 +9,7 @@ Sample auction input:
 
 import sys
 import os
+import time
 import json
 import requests
 from pyflex.deployment import GfDeployment
@@ -20,11 +21,14 @@ def get_price():
     return resp.json()['reflexer-ungovernance-token']['usd']
 
 
-current_flx_usd_price = get_price()
 
 web3 = Web3(HTTPProvider(os.environ['ETH_RPC_URL']))
 geb = GfDeployment.from_node(web3, 'rai')
-redemption_price = float(geb.oracle_relayer.redemption_price())
+
+# A shared model process (see --model-processes) serves auctions for the keeper's whole life,
+# so prices are read again once they are older than this many seconds
+PRICE_TTL = 60
+prices_read_at = 0
 
 # FLX Price to bid
 STARTING_FLX_MULTIPLIER = 1.50 # Sell FLX for 150% of current price
@@ -39,6 +43,15 @@ MY_BID_INCREASE = 1.03
 for auction_input in sys.stdin:
     auction_state = json.loads(auction_input)
 
+    # A shared model process (see --model-processes) is told when an auction is no longer tracked
+    if auction_state.get('terminate'):
+        continue
+
+    if time.time() - prices_read_at >= PRICE_TTL:
+        current_flx_usd_price = get_price()
+        redemption_price = float(geb.oracle_relayer.redemption_price())
+        prices_read_at = time.time()
+
     # If we are already the high bidder, do nothing
     if auction_state['high_bidder'] == os.environ['KEEPER_ADDRESS']:
         continue
@@ -47,7 +60,7 @@ for auction_input in sys.stdin:
     MY_BID_INCREASE = max(MY_BID_INCREASE, float(auction_state['bid_increase']))
     # No bids yet, so bid with high, starting multiplier
     if float(auction_state['bid_amount']) == 0:
-        bid = {'price': str(STARTING_FLX_MULTIPLIER * current_flx_usd_price)}
+        bid = {'id': auction_state['id'], 'price': str(STARTING_FLX_MULTIPLIER * current_flx_usd_price)}
         print(json.dumps(bid), flush=True)
     else:
         # Bid price using `MY_BID_INCREASE`
@@ -61,8 +74,8 @@ for auction_input in sys.stdin:
         # Try our bid increase first
         # If price is too low, then try minimum bid increase
         if my_bid_price >= MINIMUM_FLX_MULTIPLIER * current_flx_usd_price:
-            bid = {'price': str(my_bid_price)}
+            bid = {'id': auction_state['id'], 'price': str(my_bid_price)}
             print(json.dumps(bid), flush=True)
         elif min_bid_price >= MINIMUM_FLX_MULTIPLIER * current_flx_usd_price:
-            bid = {'price': str(min_bid_price)}
+            bid = {'id': auction_state['id'], 'price': str(min_bid_price)}
             print(json.dumps(bid), flush=True)
@@ -28,6 +28,7 @@ from web3 import Web3
 
 
 from pyflex import Receipt, Transact
+from pyflex.util import async_executor
 
 
 def args(arguments: str) -> list:
@@ -61,7 +62,8 @@ def time_travel_by(web3: Web3, seconds: int):
 
 def wait_for_other_threads(max_secs=60):
     started = datetime.now()
-    while threading.active_count() > 1:
+    while async_executor.pending > 0 or \
+            len([thread for thread in threading.enumerate() if not async_executor.owns(thread)]) > 1:
         if (datetime.now() - started).total_seconds() > max_secs:
             raise TimeoutError("Worker threads took too long to complete")
         time.sleep(0.5)
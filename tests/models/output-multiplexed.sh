@@ -0,0 +1,9 @@
+#!/bin/bash
+
+while IFS= read -r line; do
+  if [[ "$line" == *'"terminate"'* ]]; then
+    continue
+  fi
+  id=$(printf '%s' "$line" | sed -n 's/.*"id": "\([0-9]*\)".*/\1/p')
+  printf '{"id": "%s", "price": "%s.0"}\n' "$id" "$id"
+done
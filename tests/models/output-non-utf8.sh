@@ -0,0 +1,7 @@
+#!/bin/bash
+
+printf '\xff\xfe\n' >&2
+printf '{"key": "\xff"}\n'
+printf '{"key": "value1"}\n'
+
+sleep 1000
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+printf '{"key": "val'
+sleep 0.5
+printf 'ue1"}\n{"key": "value2"}\n'
+
+sleep 1000
@@ -0,0 +1,69 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from mock import MagicMock
+
+from auction_keeper.accounts import AccountPool
+from pyflex import Address, Transact
+from pyflex.util import synchronize
+
+
+class TestAccountPool:
+    def setup_method(self):
+        self.first = Address('0x0000000000000000000000000000000000000001')
+        self.second = Address('0x0000000000000000000000000000000000000002')
+        self.pool = AccountPool([self.first, self.second])
+
+    @staticmethod
+    def transact(result=None) -> Transact:
+        transact = MagicMock(spec=Transact)
+
+        async def transact_async(**kwargs):
+            transact.kwargs = kwargs
+            return result
+
+        transact.transact_async = transact_async
+        return transact
+
+    def test_spreads_transactions_across_accounts(self):
+        # when
+        first_account = self.pool.account_for()
+        self.pool.transact_async(self.transact(), first_account).close()
+
+        # then
+        assert first_account == self.first
+        assert self.pool.account_for() == self.second
+
+    def test_keeps_related_transactions_on_one_account(self):
+        # given
+        self.pool.transact_async(self.transact(), self.pool.account_for(1), 1).close()
+
+        # then
+        assert self.pool.account_for(1) == self.first
+        assert self.pool.account_for(2) == self.second
+
+    def test_sends_from_the_account_and_releases_it(self):
+        # given
+        transact = self.transact(result=True)
+
+        # when
+        assert synchronize([self.pool.transact_async(transact, self.second, 1, gas_price=1)]) == [True]
+
+        # then
+        assert transact.kwargs == {'from_address': self.second, 'gas_price': 1}
+        assert self.pool.in_flight[self.second] == 0
+        assert 1 not in self.pool.bound
@@ -0,0 +1,88 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hexbytes import HexBytes
+from mock import MagicMock
+from web3 import Web3
+
+from auction_keeper.auction_history import AuctionHistory
+from pyflex.auctions import AuctionContract
+
+
+class StartAuctionLog:
+    def __init__(self, id: int):
+        self.id = id
+
+
+class BuyCollateralLog(StartAuctionLog):
+    pass
+
+
+class SettleAuctionLog(StartAuctionLog):
+    pass
+
+
+class TestAuctionHistory:
+    def setup_method(self):
+        self.web3 = MagicMock(spec=Web3)
+        self.web3.eth = MagicMock()
+        self.web3.eth.getBlock.side_effect = self.get_block
+        self.contract = MagicMock(spec=AuctionContract)
+
+    def get_block(self, block_identifier):
+        assert block_identifier == 'latest'
+        return {'number': self.block_number, 'hash': HexBytes(self.block_number.to_bytes(32, 'big'))}
+
+    def test_tracks_started_auctions_until_settled(self):
+        # given
+        self.block_number = 100
+        self.contract.past_logs_in_block_range.return_value = [StartAuctionLog(1), StartAuctionLog(2),
+                                                               BuyCollateralLog(1), SettleAuctionLog(1),
+                                                               StartAuctionLog(3)]
+        history = AuctionHistory(self.web3, self.contract, from_block=10)
+
+        # then
+        assert history.get_auctions() == [2, 3]
+        self.contract.past_logs_in_block_range.assert_called_once_with(10, 100, 20000)
+
+    def test_reads_only_new_blocks(self):
+        # given
+        self.block_number = 100
+        self.contract.past_logs_in_block_range.return_value = [StartAuctionLog(1)]
+        history = AuctionHistory(self.web3, self.contract, from_block=10)
+        assert history.get_auctions() == [1]
+
+        # when
+        self.block_number = 101
+        self.contract.past_logs_in_block_range.return_value = [StartAuctionLog(1), SettleAuctionLog(1)]
+
+        # then
+        assert history.get_auctions() == []
+        self.contract.past_logs_in_block_range.assert_called_with(100 - AuctionHistory.cache_lookback, 101, 20000)
+
+    def test_remove_auction(self):
+        # given
+        self.block_number = 100
+        self.contract.past_logs_in_block_range.return_value = [StartAuctionLog(4)]
+        history = AuctionHistory(self.web3, self.contract, from_block=10)
+        assert history.get_auctions() == [4]
+
+        # when
+        history.remove_auction(4)
+
+        # then
+        assert history.active == set()
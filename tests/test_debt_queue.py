@@ -0,0 +1,126 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hexbytes import HexBytes
+from mock import MagicMock
+from web3 import Web3
+
+from auction_keeper.debt_queue import DebtQueue
+from pyflex.gf import AccountingEngine
+from pyflex.numeric import Rad
+
+
+class PushLog(AccountingEngine.LogPushDebtToQueue):
+    def __init__(self, timestamp: int, debt_queue_block: Rad):
+        self.timestamp = timestamp
+        self.debt_queue_block = debt_queue_block
+
+
+class PopLog(AccountingEngine.LogPopDebtFromQueue):
+    def __init__(self, popped_at: int, popped: Rad):
+        # Pops are logged with the time of the pop and the amount popped from the queue entry
+        self.timestamp = popped_at
+        self.debt_queue_block = popped
+
+
+class TestDebtQueue:
+    def setup_method(self):
+        self.web3 = MagicMock(spec=Web3)
+        self.web3.eth = MagicMock()
+        self.web3.eth.getBlock.side_effect = self.get_block
+        self.accounting_engine = MagicMock(spec=AccountingEngine)
+        self.onchain = {}
+        self.accounting_engine.debt_queue_of.side_effect = lambda timestamp: self.onchain.get(timestamp, Rad(0))
+
+    def get_block(self, block_identifier):
+        assert block_identifier == 'latest'
+        return {'number': self.block_number, 'hash': HexBytes(self.block_number.to_bytes(32, 'big'))}
+
+    def test_tracks_queued_debt_from_pushes(self):
+        # given
+        self.block_number = 100
+        self.accounting_engine.past_debt_queue_events.return_value = [
+            PushLog(1000, Rad.from_number(50)), PushLog(2000, Rad.from_number(20)),
+            PushLog(2000, Rad.from_number(70)), PopLog(2500, Rad.from_number(50))]
+        debt_queue = DebtQueue(self.web3, self.accounting_engine, from_block=10)
+
+        # then pops do not add entries at the time they happened
+        assert debt_queue.get_queue() == {1000: Rad.from_number(50), 2000: Rad.from_number(70)}
+        self.accounting_engine.past_debt_queue_events.assert_called_once_with(10, 100, 20000)
+
+    def test_poppable_reads_only_new_blocks(self):
+        # given
+        self.block_number = 100
+        self.onchain = {1000: Rad.from_number(5), 3000: Rad.from_number(5)}
+        self.accounting_engine.past_debt_queue_events.return_value = [
+            PushLog(3000, Rad.from_number(5)), PushLog(1000, Rad.from_number(5))]
+        debt_queue = DebtQueue(self.web3, self.accounting_engine, from_block=10)
+        assert debt_queue.poppable(pop_debt_delay=500, now=1600) == [1000]
+
+        # when
+        self.block_number = 101
+        del self.onchain[1000]
+        self.accounting_engine.past_debt_queue_events.return_value = [PopLog(3400, Rad.from_number(5))]
+
+        # then
+        assert debt_queue.poppable(pop_debt_delay=500, now=3500) == [3000]
+        self.accounting_engine.past_debt_queue_events.assert_called_with(100 - DebtQueue.cache_lookback, 101, 20000)
+
+    def test_drops_debt_popped_by_someone_else(self):
+        # given
+        self.block_number = 100
+        self.onchain = {1000: Rad.from_number(5), 2000: Rad.from_number(5)}
+        self.accounting_engine.past_debt_queue_events.return_value = [
+            PushLog(1000, Rad.from_number(5)), PushLog(2000, Rad.from_number(5))]
+        debt_queue = DebtQueue(self.web3, self.accounting_engine, from_block=10)
+
+        # when
+        del self.onchain[1000]
+
+        # then
+        assert debt_queue.poppable(pop_debt_delay=0, now=3000) == [2000]
+        assert debt_queue.queue == {2000: Rad.from_number(5)}
+
+    def test_confirm_drops_entries_no_longer_queued(self):
+        # given
+        self.block_number = 100
+        self.onchain = {1000: Rad.from_number(5)}
+        self.accounting_engine.past_debt_queue_events.return_value = [PushLog(1000, Rad.from_number(5))]
+        debt_queue = DebtQueue(self.web3, self.accounting_engine, from_block=10)
+        assert debt_queue.poppable(pop_debt_delay=0, now=1000) == [1000]
+        assert debt_queue.confirm(1000)
+
+        # when the push is reorged out
+        self.onchain = {}
+
+        # then
+        assert not debt_queue.confirm(1000)
+        assert debt_queue.queue == {}
+
+    def test_remove(self):
+        # given
+        self.block_number = 100
+        self.onchain = {1000: Rad.from_number(5)}
+        self.accounting_engine.past_debt_queue_events.return_value = [PushLog(1000, Rad.from_number(5))]
+        debt_queue = DebtQueue(self.web3, self.accounting_engine, from_block=10)
+        assert debt_queue.poppable(pop_debt_delay=0, now=1000) == [1000]
+
+        # when
+        debt_queue.remove(1000)
+
+        # then
+        assert debt_queue.queue == {}
@@ -0,0 +1,227 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import pytest
+from mock import MagicMock
+
+from auction_keeper.logic import Auction
+from auction_keeper.model import MultiplexedModelFactory, Parameters, PluginModel, PluginModelFactory, Stance, Status
+from pyflex import Address
+from pyflex.numeric import Wad, Rad
+
+
+def discount_model(parameters: Parameters):
+    def model(status: Status):
+        if status.bid_amount is None:
+            return None
+        return Stance(price=Wad(status.bid_amount) / Wad(status.amount_to_sell) * Wad.from_number(0.9), gas_price=None)
+    return model
+
+
+def broken_model(parameters: Parameters):
+    def model(status: Status):
+        raise ValueError("broken")
+    return model
+
+
+class TestPluginModel:
+    def setup_method(self):
+        self.house = Address('0x0000000000000000000000000000000000000001')
+        self.parameters = Parameters(collateral_auction_house=None, surplus_auction_house=None,
+                                     debt_auction_house=self.house, staked_token_auction_house=None, id=3)
+
+    def status(self, bid_amount):
+        return Status(id=3, collateral_auction_house=None, surplus_auction_house=None, debt_auction_house=self.house,
+                      staked_token_auction_house=None, bid_amount=bid_amount, amount_to_sell=Wad.from_number(10),
+                      amount_to_raise=None, sold_amount=None, raised_amount=None, bid_increase=None,
+                      bid_decrease=Wad.from_number(1.05), high_bidder=None, block_time=100, bid_expiry=None,
+                      auction_deadline=200, price=None)
+
+    def test_should_return_stance_from_module(self):
+        # given
+        model = PluginModelFactory("tests.test_model:discount_model").create_model(self.parameters)
+        assert isinstance(model, PluginModel)
+        assert model.get_stance() is None
+
+        # when
+        model.send_status(self.status(Rad.from_number(20)))
+
+        # then
+        assert model.get_stance() == Stance(price=Wad.from_number(1.8), gas_price=None)
+
+    def test_should_keep_stance_when_model_returns_none_or_fails(self):
+        # given
+        model = PluginModelFactory("tests.test_model:discount_model").create_model(self.parameters)
+        model.send_status(self.status(Rad.from_number(20)))
+
+        # when
+        model.send_status(self.status(None))
+
+        # then
+        assert model.get_stance() == Stance(price=Wad.from_number(1.8), gas_price=None)
+
+        # when
+        model = PluginModelFactory("tests.test_model:broken_model").create_model(self.parameters)
+        model.send_status(self.status(Rad.from_number(20)))
+
+        # then
+        assert model.get_stance() is None
+
+    def test_should_signal_new_stance(self):
+        # given
+        model = PluginModelFactory("tests.test_model:discount_model").create_model(self.parameters)
+        callback = MagicMock()
+        model.on_stance(callback)
+
+        # when
+        model.send_status(self.status(None))
+        # then
+        callback.assert_not_called()
+
+        # when
+        model.send_status(self.status(Rad.from_number(20)))
+        # then
+        callback.assert_called_once()
+
+    def test_should_stop_feeding_model_on_terminate(self):
+        # given
+        model = PluginModelFactory("tests.test_model:discount_model").create_model(self.parameters)
+
+        # when
+        model.terminate()
+        model.send_status(self.status(Rad.from_number(20)))
+
+        # then
+        assert model.get_stance() is None
+
+    def test_should_reject_malformed_spec(self):
+        with pytest.raises(RuntimeError):
+            PluginModelFactory("tests.test_model")
+        with pytest.raises(AttributeError):
+            PluginModelFactory("tests.test_model:missing")
+
+
+class TestMultiplexedModel:
+    def setup_method(self):
+        self.house = Address('0x0000000000000000000000000000000000000001')
+        self.factory = MultiplexedModelFactory("./tests/models/output-multiplexed.sh", 2)
+
+    def teardown_method(self):
+        self.factory.terminate()
+
+    def parameters(self, id):
+        return Parameters(collateral_auction_house=None, surplus_auction_house=None,
+                          debt_auction_house=self.house, staked_token_auction_house=None, id=id)
+
+    def status(self, id):
+        return Status(id=id, collateral_auction_house=None, surplus_auction_house=None, debt_auction_house=self.house,
+                      staked_token_auction_house=None, bid_amount=Rad.from_number(20), amount_to_sell=Wad.from_number(10),
+                      amount_to_raise=None, sold_amount=None, raised_amount=None, bid_increase=None,
+                      bid_decrease=Wad.from_number(1.05), high_bidder=None, block_time=100, bid_expiry=None,
+                      auction_deadline=200, price=None)
+
+    @pytest.mark.timeout(15)
+    def test_should_route_output_to_auctions(self):
+        # given
+        models = {id: self.factory.create_model(self.parameters(id)) for id in [1, 2, 3]}
+        assert len(list(filter(None, self.factory._processes))) == 2
+
+        signalled = []
+        for id, model in models.items():
+            model.on_stance(lambda id=id: signalled.append(id))
+
+        # when
+        for id, model in models.items():
+            model.send_status(self.status(id))
+
+        # then
+        while len(signalled) < 3:
+            time.sleep(0.1)
+        assert sorted(signalled) == [1, 2, 3]
+        for id, model in models.items():
+            assert model.get_stance() is not None
+            assert model.get_stance() == Stance(price=Wad.from_number(id), gas_price=None)
+
+        # when
+        models[1].terminate()
+
+        # then
+        assert models[1].get_stance() is None
+        assert models[3].get_stance() == Stance(price=Wad.from_number(3), gas_price=None)
+
+    @pytest.mark.timeout(15)
+    def test_should_not_restart_a_stopped_process_to_release_an_auction(self):
+        # given
+        model = self.factory.create_model(self.parameters(1))
+        process = self.factory._processes[1]
+        process.stop()
+        while process.running:
+            time.sleep(0.1)
+
+        # when
+        model.terminate()
+
+        # then
+        assert not process.running
+
+
+class TestStatus:
+    def status(self, bid_amount, block_time):
+        return Status(id=1, collateral_auction_house=None, surplus_auction_house=Address('0x0000000000000000000000000000000000000001'),
+                      debt_auction_house=None, staked_token_auction_house=None, bid_amount=bid_amount,
+                      amount_to_sell=Rad.from_number(10), amount_to_raise=None, bid_increase=Wad.from_number(1.05),
+                      bid_decrease=None, high_bidder=None, block_time=block_time, bid_expiry=None,
+                      auction_deadline=200, price=None)
+
+    def test_equality_and_state(self):
+        assert self.status(Wad.from_number(2), 100) == self.status(Wad.from_number(2), 100)
+        assert hash(self.status(Wad.from_number(2), 100)) == hash(self.status(Wad.from_number(2), 100))
+        assert not self.status(Wad.from_number(2), 100) == self.status(Wad.from_number(3), 100)
+
+        assert self.status(Wad.from_number(2), 100).same_state(self.status(Wad.from_number(2), 160))
+        assert not self.status(Wad.from_number(2), 100).same_state(self.status(Wad.from_number(3), 100))
+        assert not self.status(Wad.from_number(2), 100).same_state(self.status(None, 100))
+        assert not self.status(Wad.from_number(2), 100).same_state(None)
+
+    def test_should_feed_model_state_changes_with_colliding_hashes(self):
+        # given bids whose hashes collide, as int hashes are reduced modulo 2**61-1
+        model = MagicMock()
+        auction = Auction(1, model)
+        assert hash(Wad(1)) == hash(Wad(1 + 2**61 - 1))
+
+        # when
+        assert auction.feed_model(self.status(Wad(1), 100))
+
+        # then
+        assert auction.feed_model(self.status(Wad(1 + 2**61 - 1), 101))
+        assert model.send_status.call_count == 2
+
+    def test_should_feed_model_only_changes_and_heartbeats(self):
+        # given
+        model = MagicMock()
+        auction = Auction(1, model)
+
+        # when
+        assert auction.feed_model(self.status(Wad.from_number(2), 100), heartbeat=60)
+        # then
+        assert not auction.feed_model(self.status(Wad.from_number(2), 130), heartbeat=60)
+        assert auction.feed_model(self.status(Wad.from_number(3), 140), heartbeat=60)
+        assert not auction.feed_model(self.status(Wad.from_number(3), 199), heartbeat=60)
+        assert auction.feed_model(self.status(Wad.from_number(3), 200), heartbeat=60)
+        assert not auction.feed_model(self.status(Wad.from_number(3), 1000))
+        assert model.send_status.call_count == 3
@@ -111,6 +111,77 @@ class TestProcess:
         process.stop()
         while process.running:
             time.sleep(0.1)
+    @pytest.mark.timeout(15)
+    def test_should_signal_output_as_it_arrives(self):
+        received = threading.Event()
+        process = Process("./tests/models/output-echo.sh")
+        process.on_output(lambda data: received.set())
+        process.start()
+
+        process.write({'key': 'value'})
+        received.wait()
+        assert process.read() == {'key': 'value'}
+
+        process.stop()
+        while process.running:
+            time.sleep(0.1)
+
+    @pytest.mark.timeout(15)
+    def test_should_read_json_documents_split_across_reads(self):
+        process = Process("./tests/models/output-split.sh")
+        process.start()
+
+        while process.read() != {'key': 'value1'}:
+            time.sleep(0.1)
+
+        while process.read() != {'key': 'value2'}:
+            time.sleep(0.1)
+
+        process.stop()
+        while process.running:
+            time.sleep(0.1)
+
+    @pytest.mark.timeout(15)
+    def test_should_survive_output_which_is_not_utf8(self):
+        process = Process("./tests/models/output-non-utf8.sh")
+        process.start()
+
+        while process.read() != {'key': 'value1'}:
+            time.sleep(0.1)
+
+        # The driver still serves processes started afterwards
+        echo = Process("./tests/models/output-echo.sh")
+        echo.start()
+        echo.write({'key': 'value'})
+        while echo.read() != {'key': 'value'}:
+            time.sleep(0.1)
+
+        for running in [process, echo]:
+            running.stop()
+            while running.running:
+                time.sleep(0.1)
+
+    @pytest.mark.timeout(15)
+    def test_should_share_one_thread_between_processes(self):
+        threads = threading.active_count()
+        processes = [Process("./tests/models/output-echo.sh") for _ in range(10)]
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.write({'key': 'value'})
+        for process in processes:
+            while process.read() != {'key': 'value'}:
+                time.sleep(0.1)
+
+        assert threading.active_count() <= threads + 1
+
+        for process in processes:
+            process.stop()
+        for process in processes:
+            while process.running:
+                time.sleep(0.1)
+
     # no timeout
     def test_should_read_long_json_documents(self):
         process = Process("./tests/models/output-long.sh")
@@ -0,0 +1,195 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hexbytes import HexBytes
+from mock import MagicMock
+from web3 import Web3
+
+from auction_keeper.safe_history import SAFEHistory
+from auction_keeper.safe_index import SAFEIndex
+from pyflex import Address
+from pyflex.deployment import GfDeployment
+from pyflex.gf import CollateralType, SAFE, SAFEEngine
+from pyflex.numeric import Wad, Ray
+
+
+def make_safe(n: int, collateral_type: CollateralType, locked_collateral: Wad, generated_debt: Wad) -> SAFE:
+    return SAFE(Address('0x' + hex(n)[2:].zfill(40)), collateral_type, locked_collateral, generated_debt)
+
+
+class TestSAFEHistory:
+    def setup_method(self):
+        self.collateral_type = CollateralType('ETH-A', accumulated_rate=Ray.from_number(1.05),
+                                              liquidation_price=Ray.from_number(200))
+        self.history = SAFEHistory(MagicMock(spec=Web3), MagicMock(spec=GfDeployment), self.collateral_type,
+                                   from_block=1, graph_endpoints=None)
+
+    def cache(self, safes: list):
+        self.history.cache.update({safe.address: safe for safe in safes})
+        self.history._update_order([safe.address for safe in safes])
+
+    def test_critical_safes(self):
+        # given
+        healthy = make_safe(1, self.collateral_type, Wad.from_number(10), Wad.from_number(1000))
+        critical = make_safe(2, self.collateral_type, Wad.from_number(5), Wad.from_number(1000))
+        empty = make_safe(3, self.collateral_type, Wad(0), Wad(0))
+        self.cache([healthy, critical, empty])
+
+        # then
+        assert self.history.critical_safes(self.collateral_type) == [critical]
+
+    def test_critical_safes_follow_price_and_safe_changes(self):
+        # given safes becoming critical below a liquidation price of 100, 200, ..., 2000
+        safes = [make_safe(n, self.collateral_type, Wad.from_number(10), Wad.from_number(n * 1000 / 1.05))
+                 for n in range(1, 21)]
+        self.cache(safes)
+        self.collateral_type.liquidation_price = Ray.from_number(2001)
+        assert self.history.critical_safes(self.collateral_type) == []
+
+        # when the liquidation price drops
+        self.collateral_type.liquidation_price = Ray.from_number(1450)
+
+        # then
+        assert self.history.critical_safes(self.collateral_type) == safes[14:]
+
+        # when a critical safe adds collateral, and a healthy one draws debt
+        topped_up = make_safe(20, self.collateral_type, Wad.from_number(100), safes[19].generated_debt)
+        drawn = make_safe(2, self.collateral_type, Wad.from_number(10), Wad.from_number(19000))
+        self.cache([topped_up, drawn])
+
+        # then
+        assert self.history.critical_safes(self.collateral_type) == safes[14:19] + [drawn]
+
+    def test_critical_safes_includes_boundary(self):
+        # given collateral worth exactly its debt, and 1 wei of debt more or less
+        debt = Wad(Ray.from_number(2000) / Ray.from_number(1.05))
+        at_boundary = make_safe(1, self.collateral_type, Wad.from_number(10), debt)
+        above = make_safe(2, self.collateral_type, Wad.from_number(10), debt + Wad(1))
+        below = make_safe(3, self.collateral_type, Wad.from_number(10), debt - Wad(1))
+        self.cache([at_boundary, above, below])
+
+        # when
+        candidates = self.history.critical_safes(self.collateral_type)
+
+        # then the screen never drops a critical safe
+        assert above in candidates
+        for safe in [at_boundary, above, below]:
+            is_critical = Ray(safe.locked_collateral) * self.collateral_type.liquidation_price < \
+                          Ray(safe.generated_debt) * self.collateral_type.accumulated_rate
+            assert not is_critical or safe in candidates
+
+    def test_resumes_from_index(self, tmp_path):
+        # given an index checkpointed at block 100
+        web3 = MagicMock(spec=Web3)
+        web3.eth = MagicMock()
+        web3.eth.getBlock.side_effect = lambda block_identifier: {
+            'number': 105 if block_identifier == 'latest' else block_identifier, 'hash': HexBytes('0xaa')}
+        geb = MagicMock(spec=GfDeployment)
+        geb.safe_engine = MagicMock()
+        index = SAFEIndex(str(tmp_path / 'safes.db'), 1, Address('0x' + '11' * 20), self.collateral_type)
+        safe = make_safe(1, self.collateral_type, Wad.from_number(10), Wad.from_number(1000))
+        index.save(100, 88, '0xaa', [safe])
+
+        # when
+        history = SAFEHistory(web3, geb, self.collateral_type, from_block=1, graph_endpoints=None, index=index)
+        geb.safe_engine.past_safe_events.return_value = []
+        geb.safe_engine.safes_batch.return_value = [safe]
+        history.get_safes()
+
+        # then events are read from the checkpoint, and indexed safes are read once
+        geb.safe_engine.past_safe_events.assert_called_once_with(from_block=100 - SAFEHistory.cache_lookback,
+                                                                 to_block=105, collateral_type=self.collateral_type)
+        assert geb.safe_engine.safes_batch.call_args[0][1] == [safe.address]
+        assert history.get_safes() == {safe.address: safe}
+        assert geb.safe_engine.safes_batch.call_args[0][1] == []
+        assert index.load(lambda block_number: '0xaa')[0] == 105
+
+    def test_reads_safes_again_when_their_events_are_reorged_out(self):
+        # given a safe modified by an event in block 100
+        hashes = {100: HexBytes('0x01')}
+        web3 = MagicMock(spec=Web3)
+        web3.eth = MagicMock()
+        web3.eth.getBlock.side_effect = lambda block_identifier: {
+            'number': 105 if block_identifier == 'latest' else block_identifier,
+            'hash': hashes.get(block_identifier, HexBytes('0xaa'))}
+        geb = MagicMock(spec=GfDeployment)
+        geb.safe_engine = MagicMock()
+        safe = make_safe(1, self.collateral_type, Wad.from_number(10), Wad.from_number(1000))
+        event = MagicMock(spec=SAFEEngine.LogModifySAFECollateralization)
+        event.safe = safe.address
+        event.locked_collateral = Wad.from_number(20)
+        event.generated_debt = safe.generated_debt
+        event.raw = {'blockNumber': 100, 'blockHash': HexBytes('0x01')}
+        history = SAFEHistory(web3, geb, self.collateral_type, from_block=100, graph_endpoints=None)
+        geb.safe_engine.past_safe_events.return_value = [event]
+        geb.safe_engine.safes_batch.return_value = []
+        assert history.get_safes()[safe.address].locked_collateral == Wad.from_number(20)
+
+        # when block 100 is replaced by one without the event
+        hashes[100] = HexBytes('0x02')
+        geb.safe_engine.past_safe_events.return_value = []
+        geb.safe_engine.safes_batch.return_value = [safe]
+
+        # then the safe is read from the chain again
+        assert history.get_safes()[safe.address] == safe
+        assert geb.safe_engine.safes_batch.call_args[0][1] == [safe.address]
+        assert history.touched_blocks == {}
+
+
+class TestSAFEIndex:
+    def setup_method(self):
+        self.collateral_type = CollateralType('ETH-A')
+        self.safe_engine = Address('0x' + '11' * 20)
+        self.hashes = {88: '0xaa'}
+
+    def index(self, path, chain_id=1, collateral_type=None) -> SAFEIndex:
+        return SAFEIndex(str(path), chain_id, self.safe_engine, collateral_type or self.collateral_type)
+
+    def test_resumes_from_checkpoint(self, tmp_path):
+        # given
+        path = tmp_path / 'safes.db'
+        safe = make_safe(1, self.collateral_type, Wad(2 ** 200), Wad.from_number(1000))
+        self.index(path).save(100, 88, '0xaa', [safe])
+        self.index(path).save(101, 89, '0xbb', [])
+
+        # when
+        self.hashes[89] = '0xbb'
+        block_number, safes = self.index(path).load(self.hashes.get)
+
+        # then
+        assert block_number == 101
+        assert safes == {safe.address: safe}
+
+    def test_rejects_index_for_another_collateral_or_chain(self, tmp_path):
+        # given
+        path = tmp_path / 'safes.db'
+        self.index(path).save(100, 88, '0xaa', [make_safe(1, self.collateral_type, Wad(1), Wad(1))])
+
+        # then
+        assert self.index(path, chain_id=5).load(self.hashes.get) is None
+        assert self.index(path).load(self.hashes.get) is None
+
+    def test_rejects_index_after_reorg(self, tmp_path):
+        # given
+        path = tmp_path / 'safes.db'
+        self.index(path).save(100, 88, '0xaa', [make_safe(1, self.collateral_type, Wad(1), Wad(1))])
+
+        # when
+        self.hashes[88] = '0xcc'
+
+        # then
+        assert self.index(path).load(self.hashes.get) is None
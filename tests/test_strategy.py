@@ -0,0 +1,76 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2021 Reflexer Labs
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hexbytes import HexBytes
+from mock import MagicMock
+from web3 import Web3
+
+from auction_keeper.strategy import DebtAuctionStrategy
+from pyflex import Address
+from pyflex.auctions import DebtAuctionHouse
+from pyflex.numeric import Wad, Ray, Rad
+
+
+class TestAuctionSnapshot:
+    def setup_method(self):
+        self.block_number = 100
+        self.web3 = MagicMock(spec=Web3)
+        self.web3.eth = MagicMock()
+        self.web3.eth.getBlock.side_effect = self.get_block
+
+        self.house = MagicMock(spec=DebtAuctionHouse)
+        self.house.web3 = self.web3
+        self.house.address = Address('0x0000000000000000000000000000000000000001')
+        self.house.bid_decrease.return_value = Wad.from_number(1.05)
+        self.house.bids_batch.side_effect = self.bids_batch
+
+        self.geb = MagicMock()
+        self.geb.oracle_relayer.redemption_price.return_value = Ray.from_number(3)
+        self.strategy = DebtAuctionStrategy(self.house, self.geb)
+
+    def get_block(self, block_identifier):
+        assert block_identifier == 'latest'
+        return {'number': self.block_number, 'hash': HexBytes(self.block_number.to_bytes(32, 'big')),
+                'timestamp': self.block_number * 10}
+
+    def bids_batch(self, ids, block_identifier):
+        assert block_identifier == self.block_number
+        return [DebtAuctionHouse.Bid(id=id, bid_amount=Rad.from_number(100), amount_to_sell=Wad.from_number(50),
+                                     high_bidder=Address('0x0000000000000000000000000000000000000002'),
+                                     bid_expiry=0, auction_deadline=2000) for id in ids]
+
+    def test_should_read_each_auction_once_per_block(self):
+        # given
+        inputs = self.strategy.get_inputs([1, 2])
+        assert inputs[1].block_time == 1000
+
+        # when
+        self.strategy.get_input(2)
+        self.strategy.bid(1, Wad.from_number(7))
+        self.strategy.bid(3, Wad.from_number(7))
+
+        # then
+        assert [call[0][0] for call in self.house.bids_batch.call_args_list] == [[1, 2], [3]]
+        self.geb.oracle_relayer.redemption_price.assert_called_once()
+
+        # when
+        self.block_number = 101
+        self.strategy.get_input(1)
+
+        # then
+        assert self.house.bids_batch.call_args_list[-1][0][0] == [1]
+        assert self.geb.oracle_relayer.redemption_price.call_count == 2